@@ -0,0 +1,69 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리(app)를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from psycopg2.extras import execute_values
+
+from utils import utils
+
+
+# queue.articles: 큐에 추가된 적이 있는 기사의 (oid, aid) 전체 목록 (연도와 상관없이 default DB에 하나)
+# queue.article_sections: 기사가 목록에 나온 sid1, sid2, date (여러 섹션에 나온 기사는 한번만 큐에 넣고, 섹션은 여기에 기록)
+
+
+
+def register(cur, year, links):
+    """기사 링크를 전역 기사 목록(queue.articles)에 등록하고, 처음 보는 기사의 링크만 반환한다
+    - 중복 확인은 INSERT ... ON CONFLICT 한 문장으로 함 (이미 있는 기사는 RETURNING에 나오지 않음)
+    - 다른 컨테이너와 동시에 등록해도 ON CONFLICT로 한쪽만 새 기사로 처리됨 (cur의 트랜잭션이 끝날 때까지 행 잠금)
+    - 기사 url이 아닌 링크는 그대로 반환함 (url 중복 확인만 함)
+
+    Args:
+        cur(psycopg2 cursor): default DB의 psql.transaction 커서
+        year(int): 큐의 연도
+        links(list): 링크 리스트
+
+    Returns:
+        list: 큐에 새로 넣을 링크 리스트 (같은 기사는 처음 나온 url 하나만)
+        dict: {(oid, aid): url} 링크의 기사 키 전체 (섹션 기록용)
+    """
+    keys = {}  # {(oid, aid): url}
+    other_links = []
+    for link in links:
+        key = utils.get_article_key(link)
+        if key is None:
+            other_links.append(link)
+        elif key not in keys:
+            keys[key] = link
+
+    # 모든 기사를 한번에 등록 (이미 있는 기사는 RETURNING에서 빠짐)
+    # - 키 순서대로 넣어야 같은 기사를 등록하는 다른 컨테이너와 (oid, aid) 잠금 순서가 같아 교착되지 않음
+    new_keys = []
+    if keys:
+        query = """
+        INSERT INTO queue.articles (oid, aid, year, url) VALUES %s
+            ON CONFLICT (oid, aid) DO NOTHING
+            RETURNING oid, aid;"""
+        rows = [(oid, aid, year, keys[(oid, aid)]) for oid, aid in sorted(keys)]
+        new_keys = execute_values(cur, query, rows, page_size=len(rows), fetch=True)
+
+    new_links = [keys[(oid, aid)] for oid, aid in new_keys] + other_links
+    return new_links, keys
+
+
+def add_sections(cur, keys, sid1, sid2, date):
+    """기사가 sid1, sid2, date 목록에 나왔다는 것을 기록 (이미 큐에 있는 기사도 기록)
+
+    Args:
+        cur(psycopg2 cursor): default DB의 psql.transaction 커서
+        keys(dict or list): (oid, aid) 목록 (register의 두번째 반환값)
+    """
+    rows = [(oid, aid, sid1, sid2, date) for oid, aid in sorted(keys)]  # register와 같은 잠금 순서
+    if not rows:
+        return
+
+    query = """
+    INSERT INTO queue.article_sections (oid, aid, sid1, sid2, date) VALUES %s
+        ON CONFLICT (oid, aid, sid1, sid2) DO NOTHING;"""
+    execute_values(cur, query, rows, page_size=1000)
@@ -0,0 +1,138 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리(app)를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+from psycopg2.extras import execute_values
+
+from db import psql, shard
+
+
+# queue.backlog: 연도-sid1-sid2별 미수집(is_scraped = false) 큐 개수
+# - 연도별 queue.news_{year}와 같은 DB(샤드)에 있으며, 큐 추가/수집 완료와 같은 트랜잭션에서 증감함
+# - COUNT(*) 대신 이 테이블을 조회하여 수집 대상 연도를 고름
+
+
+
+def add(cur, year, counts):
+    """큐에 추가된 개수만큼 미수집 개수를 늘린다 (queue.news_{year} insert와 같은 트랜잭션의 cur로 호출)
+
+    Args:
+        cur(psycopg2 cursor): psql.transaction의 커서 (해당 연도의 샤드)
+        year(int): 연도
+        counts(dict): {(sid1, sid2): 추가된 개수}
+    """
+    rows = [(year, sid1, sid2, n) for (sid1, sid2), n in counts.items() if n]
+    if not rows:
+        return
+
+    query = """
+    INSERT INTO queue.backlog (year, sid1, sid2, unscraped, updated) VALUES %s
+        ON CONFLICT (year, sid1, sid2) DO UPDATE
+        SET unscraped = queue.backlog.unscraped + EXCLUDED.unscraped, updated = now();"""
+    execute_values(cur, query, rows, template="(%s, %s, %s, %s, now())")
+
+
+def _set_scraped_query(year, source):
+    """is_scraped를 true로 변경 & queue.backlog 차감 쿼리 (source: news_year_id, scraped 컬럼을 가진 v라는 이름의 FROM 항목)
+    - 이미 수집된 행은 변경하지 않으므로, 다른 컨테이너가 먼저 수집한 행은 중복으로 차감되지 않음
+    - 실제로 변경된 news_year_id를 반환함
+    """
+    return f"""
+    WITH changed AS (
+        UPDATE queue.news_{year} AS q
+            SET is_scraped = true, scraped = v.scraped::timestamp, claimed_by = NULL, lease_expires = NULL
+            FROM {source}
+            WHERE q.news_year_id = v.news_year_id AND q.is_scraped = false
+            RETURNING q.news_year_id, q.sid1, q.sid2
+    ), counts AS (
+        SELECT sid1, sid2, COUNT(*) AS n FROM changed GROUP BY sid1, sid2
+    ), updated AS (
+        UPDATE queue.backlog AS b SET unscraped = b.unscraped - counts.n, updated = now()
+            FROM counts WHERE b.year = {int(year)} AND b.sid1 = counts.sid1 AND b.sid2 = counts.sid2
+    )
+    SELECT news_year_id FROM changed;"""
+
+
+def set_scraped_from(cur, year, source_table):
+    """source_table(스테이징 테이블 등)에 있는 행들을 수집 완료 처리하고, 그만큼 미수집 개수를 차감한다
+
+    Args:
+        cur(psycopg2 cursor): psql.transaction의 커서 (해당 연도의 샤드)
+        year(int): 연도
+        source_table(str): news_year_id, scraped 컬럼을 가진 테이블명
+
+    Returns:
+        list: 실제로 수집 완료 처리된 news_year_id 리스트 (이미 수집된 행 제외)
+    """
+    cur.execute(_set_scraped_query(year, f"{source_table} AS v"))
+    return [r[0] for r in cur.fetchall()]
+
+
+def rebuild(year, target_db=None):
+    """queue.news_{year}의 미수집 개수를 다시 세어 queue.backlog를 덮어쓴다
+    - 처음 적용할 때(upgrade_table), 샤드 이동 후(migrate_shard), 개수가 의심될 때 실행
+    - 다시 세는 동안 큐 추가/수집 완료가 끼어들지 않도록 테이블을 SHARE 모드로 잠금
+        - 읽기(SELECT)만 가능하고, 큐 추가, 수집 완료뿐 아니라 수집 대상 선점(UPDATE ... FOR UPDATE SKIP LOCKED)도
+          전체 테이블 COUNT(*)가 끝날 때까지 기다림 (해당 연도를 수집하는 컨테이너가 잠시 멈춤)
+
+    Args:
+        year(int): 연도
+        target_db(str): 연도 테이블이 있는 DB별칭 | Default: None (info.years의 해당 연도 샤드)
+
+    Returns:
+        int: 해당 연도 전체 미수집 개수
+    """
+    target_db = target_db or shard.get_shard(year)
+
+    with psql.transaction(target_db) as cur:
+        cur.execute(f"LOCK TABLE queue.news_{year} IN SHARE MODE;")
+        cur.execute("DELETE FROM queue.backlog WHERE year = %s;", (year,))
+        query = f"""
+        INSERT INTO queue.backlog (year, sid1, sid2, unscraped, updated)
+            SELECT %s, sid1, sid2, COUNT(*), now() FROM queue.news_{year}
+                WHERE is_scraped = false
+                GROUP BY sid1, sid2;"""
+        cur.execute(query, (year,))
+        cur.execute("SELECT COALESCE(SUM(unscraped), 0) FROM queue.backlog WHERE year = %s;", (year,))
+        return cur.fetchone()[0]
+
+
+def _group_by_shard(years):
+    """연도 리스트를 샤드(DB별칭)별로 나눈다 - {DB별칭: [year, ...]}"""
+    years_by_shard = {}
+    for year in years:
+        years_by_shard.setdefault(shard.get_shard(year), []).append(year)
+    return years_by_shard
+
+
+def get_unscraped_count(year):
+    """해당 연도의 미수집 큐 개수 (queue.backlog 조회)
+
+    Args:
+        year(int): 연도
+
+    Returns:
+        int: 미수집 개수
+    """
+    query = "SELECT COALESCE(SUM(unscraped), 0) FROM queue.backlog WHERE year = %s;"
+    raw = psql.query_select(query, (year,), fetchone=True, target_db=shard.get_shard(year), read_only=True)
+    return raw[0]
+
+
+def get_target_year(years):
+    """미수집 큐가 남아있는 가장 최근 연도를 반환한다 (샤드별 한번의 조회)
+
+    Args:
+        years(list): 대상 연도 리스트
+
+    Returns:
+        int: 대상 연도 (없으면 False)
+    """
+    target_year = False
+    for target_db, shard_years in _group_by_shard(years).items():
+        query = "SELECT MAX(year) FROM queue.backlog WHERE year = ANY(%s) AND unscraped > 0;"
+        year = psql.query_select(query, (shard_years,), fetchone=True, target_db=target_db, read_only=True)[0]
+        if year is not None and (not target_year or year > target_year):
+            target_year = year
+    return target_year
@@ -41,21 +41,50 @@ def initialize_info_sids():
     # TODO: 세계 섹션 추가
 
 
+# info.config 기본값 (key, value)
+DEFAULT_CONFIG = [
+    ("user_agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"),  # user_agent
+    ("news_batch_size", "100"),  # news_batch_size
+    ("date_pages_baseline_days", "1"),  # kst_now 기준 며칠 전까지 큐에 추가할지
+    ("queue_date_page_run_n", "20"),  # queue 100번 실행 마다 date_page를 실행할 횟수 (0 ~ 100)
+    ("news_timeout_multiplier", "2"),  # data.news 수집 시 batch_size * n으로 timeout 초 설정할 때 사용할 n
+    ("new_year_shard", "default"),  # 새 연도가 추가될 때 queue.news_{year}, data.news_{year}를 생성할 DB별칭
+    ("http_connect_timeout", "5"),  # 뉴스 페이지 요청 시 연결 timeout(초)
+    ("http_read_timeout", "20"),  # 뉴스 페이지 요청 시 읽기 timeout(초)
+    ("http_request_budget", "30"),  # 페이지 요청 하나에 허용하는 전체 시간(초) (리다이렉트, 본문 수신 포함)
+    ("queue_date_timeout", "600"),  # queue.news 추가 시 날짜 하나에 허용하는 시간(초) (date_page_lease_seconds보다 짧게)
+    ("news_save_timeout", "60"),  # data.news 저장 쿼리 하나에 허용하는 시간(초) (statement_timeout)
+    ("http_pool_maxsize", "10"),  # 호스트별로 유지하는 keep-alive 커넥션 수
+    ("http_version", "1.1"),  # 기사 페이지 요청 시 HTTP 버전 ("2"일 경우 HTTP/2로 배치 내 요청을 동시에 다중화)
+    ("news_host_concurrency", "10"),  # 기사 수집 시 호스트별 동시 요청 수
+    ("news_stream_parse", "0"),  # 1일 경우 기사 본문을 받는 대로 파싱하다가 필드를 모두 찾으면 나머지(댓글, 하단 스크립트)는 받지 않음 (HTTP/1.1에서는 커넥션 재사용 안 됨)
+    ("queue_page_workers", "8"),  # 뉴스 목록 페이지를 동시에 요청하는 스레드 수
+    ("date_page_lease_seconds", "900"),  # 날짜 페이지(queue.date_pages)를 선점한 뒤 다른 컨테이너에 다시 배정되기까지의 시간(초)
+    ("news_flush_size", "10"),  # 수집이 끝난 기사를 배치 중간에 저장하는 단위
+    ("pipeline_claim_size", "50"),  # 파이프라인(run_news_pipeline.py)에서 한번에 선점하는 기사 수
+    ("pipeline_fetch_concurrency", "10"),  # 파이프라인에서 동시에 요청하는 기사 수
+    ("pipeline_parse_workers", "2"),  # 파이프라인에서 동시에 파싱을 맡기는 기사 수 (parse_processes보다 적으면 parse_processes)
+    ("parse_processes", "0"),  # 기사 파싱 프로세스 수 (0: 컨테이너의 CPU 할당량(cgroup)만큼, 1: 프로세스 없이 스레드 하나)
+    ("pipeline_write_concurrency", "1"),  # 파이프라인에서 동시에 저장하는 배치 수 (배치 크기는 news_flush_size)
+    ("pipeline_queue_size", "100"),  # 파이프라인 단계 사이 큐의 최대 길이
+    ("archive_dir", ""),  # 수집한 기사 페이지 원본을 압축해 저장할 디렉토리 (비어 있으면 저장하지 않음, zstandard 필요)
+    ("archive_batch_size", "50"),  # 아카이브에 한번에 압축해서 쓰는 페이지 수
+    ("archive_segment_mb", "256"),  # 아카이브 세그먼트 파일 하나의 최대 크기(MB)
+    ("archive_dict_samples", "300"),  # 아카이브의 zstd 사전을 학습할 때 사용하는 페이지 수 (0: 사전 없이 압축)
+    ("archive_level", "3"),  # 아카이브 zstd 압축 레벨
+    ("news_lease_seconds", "600"),  # 뉴스 수집 대상을 선점한 뒤 다른 컨테이너에 다시 배정되기까지의 시간(초)
+    ("worker_heartbeat_seconds", "10"),  # 컨테이너가 info.workers에 heartbeat, 처리량을 기록하는 주기(초)
+    ("worker_dead_seconds", "60"),  # heartbeat가 이 시간(초) 이상 없으면 reaper가 종료된 컨테이너로 판단
+]
+
+
 def initialize_info_config():
     """config 초기화
-    user_agent, news_batch_size 를 기본으로 추가
+    DEFAULT_CONFIG의 값들을 추가 (이미 있는 key는 유지하므로, 새 key 추가 시 다시 실행해도 됨)
     """
-    key_value = [
-        ("user_agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36"),  # user_agent
-        ("news_batch_size", "100"),  # news_batch_size
-        ("date_pages_baseline_days", "1"),  # kst_now 기준 며칠 전까지 큐에 추가할지
-        ("queue_date_page_run_n", "20"),  # queue 100번 실행 마다 date_page를 실행할 횟수 (0 ~ 100)
-        ("news_timeout_multiplier", "2")  # data.news 수집 시 batch_size * n으로 timeout 초 설정할 때 사용할 n
-    ]
-
     # config 추가
-    for k, v in key_value:
-        query = "INSERT INTO info.config (key, value) VALUES (%s, %s);"
+    for k, v in DEFAULT_CONFIG:
+        query = "INSERT INTO info.config (key, value) VALUES (%s, %s) ON CONFLICT (key) DO NOTHING;"
         psql.query_execute(query, (k, v))
 
 
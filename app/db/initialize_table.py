@@ -21,10 +21,13 @@ def main(first_year=2005, last_year=2023):
 
     # info
     model.create_tables_for_info()
+    model.create_table_workers()
+    model.create_info_notify_triggers()
     print("info 스키마의 테이블 생성")
 
     # queue.date_page
     model.create_table_queue_date_page()
+    model.create_table_articles()
     print("queue.date_page 테이블 생성")
 
     # 연도별 큐, 뉴스 테이블
@@ -0,0 +1,218 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리(app)를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import argparse
+
+from psycopg2.extras import Json, execute_values
+
+from db import psql, model, shard, backlog
+
+
+# 한번에 복사할 행 수
+COPY_BATCH_SIZE = 5000
+
+# 따라잡기 후 남은 변경 행이 이보다 적으면 쓰기를 잠그고 전환함
+CUTOVER_THRESHOLD = 1000
+MAX_CATCH_UP_ROUNDS = 10
+
+# 변경분 조건: 기준 트랜잭션 이후에 추가/수정된 행 (xmin 기준, 32bit xid 순환을 고려해 age로 비교)
+CHANGED_SINCE = "age(xmin) <= age(%s::text::xid)"
+
+
+
+def get_year_tables(year):
+    """연도별 샤드로 이동할 테이블 목록"""
+    return [f"queue.news_{year}", f"data.news_{year}", f"data.news_addition_{year}"]
+
+
+def get_change_marker(source_db):
+    """현재 진행 중인 트랜잭션 중 가장 오래된 xid를 반환한다
+    - 이 시점 이후 커밋되는 추가/수정 행은 모두 xmin이 이 값 이상이 됨 (CHANGED_SINCE로 조회)
+
+    Returns:
+        str: 32bit xid 문자열
+    """
+    query = "SELECT txid_snapshot_xmin(txid_current_snapshot()) %% 4294967296;"
+    return str(psql.query_select(query, fetchone=True, target_db=source_db)[0])
+
+
+def table_exists(table, target_db):
+    """target_db에 테이블이 있는지 확인"""
+    query = "SELECT to_regclass(%s) IS NOT NULL;"
+    return psql.query_select(query, (table,), fetchone=True, target_db=target_db)[0]
+
+
+def get_columns(table, target_db):
+    """테이블의 컬럼명 목록을 순서대로 가져온다"""
+    schema, name = table.split(".")
+    query = """
+    SELECT column_name FROM information_schema.columns
+        WHERE table_schema = %s AND table_name = %s
+        ORDER BY ordinal_position;"""
+    raw = psql.query_select(query, (schema, name), target_db=target_db)
+    return [r[0] for r in raw]
+
+
+def copy_rows(table, source_db, target_db, where=None, params=()):
+    """source_db의 테이블 행을 news_year_id 순서로 나눠 target_db에 복사한다 (upsert)
+    - 원본은 그대로 사용 가능한 상태(온라인)에서 실행하며, 여러번 실행해도 같은 결과가 되도록 upsert 사용
+
+    Args:
+        table(str): 스키마를 포함한 테이블명
+        source_db(str): 원본 DB별칭
+        target_db(str): 대상 DB별칭
+        where(str): 복사할 행의 조건 | Default: None (전체)
+        params(tuple): where절에 들어갈 데이터
+
+    Returns:
+        int: 복사한 행 수
+    """
+    columns = get_columns(table, source_db)
+    column_names = ", ".join(columns)
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c != "news_year_id")
+    where = f"({where})" if where else "TRUE"
+
+    select_query = f"""
+    SELECT {column_names} FROM {table}
+        WHERE {where} AND news_year_id > %s
+        ORDER BY news_year_id LIMIT %s;"""
+    insert_query = f"""
+    INSERT INTO {table} ({column_names}) VALUES %s
+        ON CONFLICT (news_year_id) DO UPDATE SET {updates};"""
+
+    copied = 0
+    last_id = -1
+    while True:
+        rows = psql.query_select(select_query, (*params, last_id, COPY_BATCH_SIZE), target_db=source_db)
+        if not rows:
+            break
+
+        # JSONB 컬럼(dict)은 Json으로 감싸서 넘김
+        rows = [tuple(Json(v) if isinstance(v, dict) else v for v in row) for row in rows]
+        with psql.transaction(target_db) as cur:
+            execute_values(cur, insert_query, rows, page_size=500)
+
+        copied += len(rows)
+        last_id = rows[-1][columns.index("news_year_id")]
+
+    return copied
+
+
+def count_rows(table, target_db):
+    """테이블의 행 수"""
+    return psql.query_select(f"SELECT COUNT(*) FROM {table};", fetchone=True, target_db=target_db)[0]
+
+
+def sync_changes(tables, source_db, target_db, marker):
+    """marker 이후 추가/수정된 행을 다시 복사한다
+
+    Args:
+        tables(list): get_year_tables의 반환값
+        marker(str): get_change_marker의 반환값
+
+    Returns:
+        int: 복사한 행 수
+    """
+    copied = 0
+    for table in tables:
+        copied += copy_rows(table, source_db, target_db, CHANGED_SINCE, (marker,))
+    return copied
+
+
+def migrate_year(year, target_db):
+    """연도 하나의 queue.news_{year}, data.news_{year}, data.news_addition_{year}를 다른 샤드로 이동한다
+    1) 대상 DB에 테이블 생성 후 전체 복사 (원본은 계속 사용 중)
+    2) 복사하는 동안 추가/수정된 행을 반복해서 따라잡기
+    3) 원본 테이블에 쓰기 잠금 > 마지막 동기화 > 행 수 검증 > info.years.shard 변경 > 원본 테이블 이름 변경(_moved)
+        - 이름을 바꿔 두어서, 아직 이전 샤드 정보를 캐시하고 있는 컨테이너는 원본에 쓰지 못하고 에러 후 재시도하게 됨
+        - 원본 데이터는 *_moved 테이블로 남겨 두므로, 확인 후 직접 삭제
+
+    Args:
+        year(int): 이동할 연도
+        target_db(str): 이동할 DB별칭 (config.db.json에 있어야 함)
+
+    Returns:
+        bool: True일 경우 이동 완료, False일 경우 이미 해당 샤드에 있음
+    """
+    source_db = shard.get_shard_map(reload=True).get(year, "default")
+    if source_db == target_db:
+        print(f">> {year} is already on {target_db}")
+        return False
+    tables = get_year_tables(year)
+    print(f">> migrate {year}: {source_db} -> {target_db}")
+
+    # 1) 대상 DB에 테이블 생성
+    model.create_schema(target_db)
+    if not table_exists(f"queue.news_{year}", target_db):
+        model.create_table_queue_news(year, target_db)
+    if not table_exists(f"data.news_{year}", target_db):
+        model.create_table_news(year, target_db)
+    model.create_table_backlog(target_db)
+
+    # 2) 전체 복사
+    marker = get_change_marker(source_db)
+    for table in tables:
+        copied = copy_rows(table, source_db, target_db)
+        print(f">> copied {table}: {copied}")
+
+    # 3) 변경분 따라잡기
+    for i in range(MAX_CATCH_UP_ROUNDS):
+        next_marker = get_change_marker(source_db)
+        copied = sync_changes(tables, source_db, target_db, marker)
+        marker = next_marker
+        print(f">> catch up {i+1}: {copied}")
+        if copied < CUTOVER_THRESHOLD:
+            break
+
+    # 4) 전환 (원본 쓰기 잠금, 읽기는 가능)
+    with psql.transaction(source_db) as source_cur:
+        source_cur.execute(f"LOCK TABLE {', '.join(tables)} IN EXCLUSIVE MODE;")
+
+        copied = sync_changes(tables, source_db, target_db, marker)
+        print(f">> final sync: {copied}")
+
+        # 행 수 검증 (다르면 예외 발생 > 원본 롤백, 샤드 정보 변경 없음)
+        for table in tables:
+            source_count, target_count = count_rows(table, source_db), count_rows(table, target_db)
+            if source_count != target_count:
+                raise RuntimeError(f"row count mismatch on {table}: {source_count} != {target_count}")
+
+        # SERIAL 시퀀스를 원본의 마지막 값 이후로 설정
+        query = f"""
+        SELECT setval(pg_get_serial_sequence('queue.news_{year}', 'news_year_id'),
+                      (SELECT COALESCE(MAX(news_year_id), 0) + 1 FROM queue.news_{year}), false);"""
+        psql.query_select(query, target_db=target_db)
+
+        # 미수집 개수: 대상 DB에서 다시 세고, 원본 DB의 해당 연도 개수는 삭제
+        # (다시 세는 동안 대상 DB의 해당 연도 테이블은 선점/수집 완료가 멈춤 - backlog.rebuild 참고)
+        backlog.rebuild(year, target_db)
+        source_cur.execute("DELETE FROM queue.backlog WHERE year = %s;", (year,))
+
+        # 샤드 정보 변경 (info는 default DB)
+        psql.query_execute("UPDATE info.years SET shard = %s WHERE year = %s;", (target_db, year))
+        shard.invalidate()
+
+        # 원본 테이블 이름 변경
+        for table in tables:
+            source_cur.execute(f"ALTER TABLE {table} RENAME TO {table.split('.')[1]}_moved;")
+
+    print(f">> {year} moved to {target_db} / old tables renamed to *_moved on {source_db}")
+    return True
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="연도별 큐/뉴스 테이블을 다른 샤드(DB별칭)로 온라인 이동")
+    parser.add_argument("year", type=int, help="이동할 연도")
+    parser.add_argument("target_db", help="이동할 DB별칭 (config.db.json)")
+    args = parser.parse_args()
+
+    print("#" * 50)
+    answer = input(f"{args.year} 연도 테이블을 {args.target_db}로 이동할까요?(y/n): ")
+
+    if answer in ["y", "Y"]:
+        migrate_year(args.year, args.target_db)
+
+    print("#" * 50)
@@ -3,22 +3,26 @@ import sys
 # 현재 파일의 상위 디렉토리(app)를 sys.path에 추가
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 
-from db import psql
+from db import psql, shard
 
 
-def create_schema():
-    """스키마 생성"""
+def create_schema(target_db="default"):
+    """스키마 생성
+
+    Args:
+        target_db(str): 스키마를 생성할 DB별칭 (연도별 샤드 DB에도 queue, data 스키마가 필요함)
+    """
     # info 스키마 생성
     query = "CREATE schema IF NOT EXISTS info;"
-    psql.query_execute(query)
+    psql.query_execute(query, target_db=target_db)
 
     # queue 스키마 생성
     query = "CREATE schema IF NOT EXISTS queue;"
-    psql.query_execute(query)
+    psql.query_execute(query, target_db=target_db)
 
     # data 스키마 생성
     query = "CREATE schema IF NOT EXISTS data;"
-    psql.query_execute(query)
+    psql.query_execute(query, target_db=target_db)
 
 
 
@@ -28,7 +32,8 @@ def create_tables_for_info():
     query = """
     CREATE TABLE info.years (
         year INT PRIMARY KEY,
-        dates_queued BOOLEAN
+        dates_queued BOOLEAN,
+        shard TEXT
     );"""
     psql.query_execute(query)
 
@@ -52,8 +57,61 @@ def create_tables_for_info():
 
 
 
-def create_table_queue_news(year):
-    """연도를 받아 해당 연도의 큐 테이블을 생성"""
+def create_info_notify_triggers():
+    """info.config, info.years, info.sids가 변경되면 info_changed 채널로 알림을 보내는 트리거 생성 (다시 실행해도 됨)
+    - 각 컨테이너의 캐시(utils/cache.py)가 알림을 받아 바로 다시 읽음 (payload: 테이블명)
+    """
+    query = """
+    CREATE OR REPLACE FUNCTION info.notify_changed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('info_changed', TG_TABLE_NAME);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;"""
+    psql.query_execute(query)
+
+    for table in ["config", "years", "sids"]:
+        query = f"""
+        DROP TRIGGER IF EXISTS {table}_changed ON info.{table};
+        CREATE TRIGGER {table}_changed AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON info.{table}
+            FOR EACH STATEMENT EXECUTE FUNCTION info.notify_changed();"""
+        psql.query_execute(query)
+
+
+
+def create_table_workers():
+    """info.workers 생성 (이미 있으면 생략)
+    - 실행 중인 컨테이너(worker)가 주기적으로 heartbeat와 처리량을 기록하는 테이블
+    """
+    query = """
+    CREATE TABLE IF NOT EXISTS info.workers (
+        worker_id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        hostname TEXT,
+        pid INT,
+        status TEXT NOT NULL,
+        started TIMESTAMPTZ NOT NULL DEFAULT now(),
+        last_heartbeat TIMESTAMPTZ NOT NULL DEFAULT now(),
+        runs BIGINT NOT NULL DEFAULT 0,
+        items BIGINT NOT NULL DEFAULT 0,
+        errors BIGINT NOT NULL DEFAULT 0,
+        interval_items INT NOT NULL DEFAULT 0,
+        interval_seconds DOUBLE PRECISION,
+        current_target TEXT
+    );"""
+    psql.query_execute(query)
+
+
+
+def create_table_queue_news(year, target_db=None):
+    """연도를 받아 해당 연도의 큐 테이블을 생성
+
+    Args:
+        year(int): 연도
+        target_db(str): 테이블을 생성할 DB별칭 | Default: None (info.years의 해당 연도 샤드)
+    """
+    target_db = target_db or shard.get_shard(year)
+
     # queue.news_{연도} 생성
     query = f"""
     CREATE TABLE queue.news_{year} (
@@ -65,7 +123,92 @@ def create_table_queue_news(year):
         url TEXT NOT NULL,
         is_scraped BOOLEAN NOT NULL,
         added TIMESTAMP,
-        scraped TIMESTAMP
+        scraped TIMESTAMP,
+        claimed_by TEXT,
+        lease_expires TIMESTAMPTZ,
+        -- news_id = year * 100000000 + news_year_id 이므로, 8자리를 넘으면 다음 연도의 news_id와 겹침
+        CONSTRAINT news_{year}_news_year_id_check CHECK (news_year_id < 100000000)
+    );"""
+    psql.query_execute(query, target_db=target_db)
+
+    create_index_queue_news(year, target_db)
+    create_table_backlog(target_db)
+
+
+
+def create_index_queue_news(year, target_db=None):
+    """연도를 받아 해당 연도 큐 테이블의 인덱스를 생성 (이미 있으면 생략)
+    - 미수집 큐만 담는 부분 인덱스로, 수집 대상 선점(claim) 시 전체 테이블을 읽지 않도록 함
+    - url 인덱스로 큐 추가 시 중복 여부를 확인함
+
+    Args:
+        year(int): 연도
+        target_db(str): 인덱스를 생성할 DB별칭 | Default: None (info.years의 해당 연도 샤드)
+    """
+    target_db = target_db or shard.get_shard(year)
+
+    query = f"""
+    CREATE INDEX IF NOT EXISTS news_{year}_to_scrape_idx ON queue.news_{year} (news_year_id)
+        WHERE is_scraped = false AND news_id IS NOT NULL;"""
+    psql.query_execute(query, target_db=target_db)
+
+    # 큐 추가 시 이미 있는 url인지 확인하는 인덱스
+    query = f"CREATE INDEX IF NOT EXISTS news_{year}_url_idx ON queue.news_{year} (url);"
+    psql.query_execute(query, target_db=target_db)
+
+    # 연도-sid별 미수집 개수를 다시 셀 때(backlog.rebuild) 사용하는 부분 인덱스
+    query = f"""
+    CREATE INDEX IF NOT EXISTS news_{year}_backlog_idx ON queue.news_{year} (sid1, sid2)
+        WHERE is_scraped = false;"""
+    psql.query_execute(query, target_db=target_db)
+
+
+
+def create_table_backlog(target_db="default"):
+    """queue.backlog 생성 (이미 있으면 생략)
+    - 연도-sid1-sid2별 미수집 큐 개수, 연도별 큐 테이블이 있는 DB(샤드)마다 생성
+
+    Args:
+        target_db(str): 테이블을 생성할 DB별칭
+    """
+    query = """
+    CREATE TABLE IF NOT EXISTS queue.backlog (
+        year INT NOT NULL,
+        sid1 INT NOT NULL,
+        sid2 INT NOT NULL,
+        unscraped BIGINT NOT NULL,
+        updated TIMESTAMPTZ,
+        PRIMARY KEY (year, sid1, sid2)
+    );"""
+    psql.query_execute(query, target_db=target_db)
+
+
+
+def create_table_articles():
+    """queue.articles, queue.article_sections 생성 (이미 있으면 생략)
+    - 연도, 섹션과 상관없이 기사(oid, aid)를 한번만 큐에 넣기 위한 전역 기사 목록 (default DB)
+    """
+    # queue.articles 생성
+    query = """
+    CREATE TABLE IF NOT EXISTS queue.articles (
+        oid TEXT NOT NULL,
+        aid TEXT NOT NULL,
+        year INT NOT NULL,
+        url TEXT NOT NULL,
+        first_seen TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (oid, aid)
+    );"""
+    psql.query_execute(query)
+
+    # queue.article_sections 생성
+    query = """
+    CREATE TABLE IF NOT EXISTS queue.article_sections (
+        oid TEXT NOT NULL,
+        aid TEXT NOT NULL,
+        sid1 INT NOT NULL,
+        sid2 INT NOT NULL,
+        date TEXT,
+        PRIMARY KEY (oid, aid, sid1, sid2)
     );"""
     psql.query_execute(query)
 
@@ -83,14 +226,35 @@ def create_table_queue_date_page():
         sid2 INT NOT NULL,
         page_added BOOLEAN NOT NULL,
         page_length INT,
-        news_count INT
+        news_count INT,
+        claimed_by TEXT,
+        claimed_at TIMESTAMPTZ,
+        lease_expires TIMESTAMPTZ
     );"""
     psql.query_execute(query)
 
+    create_index_queue_date_page()
+
 
 
-def create_table_news(year):
-    """연도를 받아 해당 연도의 뉴스 테이블을 생성"""
+def create_index_queue_date_page():
+    """date_pages의 미수집 부분 인덱스 생성 (이미 있으면 생략)"""
+    query = """
+    CREATE INDEX IF NOT EXISTS date_pages_to_add_idx ON queue.date_pages (year DESC, date DESC)
+        WHERE page_added = false;"""
+    psql.query_execute(query)
+
+
+
+def create_table_news(year, target_db=None):
+    """연도를 받아 해당 연도의 뉴스 테이블을 생성
+
+    Args:
+        year(int): 연도
+        target_db(str): 테이블을 생성할 DB별칭 | Default: None (info.years의 해당 연도 샤드)
+    """
+    target_db = target_db or shard.get_shard(year)
+
     # data.news_{연도} 생성
     query = f"""
     CREATE TABLE data.news_{year} (
@@ -110,7 +274,7 @@ def create_table_news(year):
         content TEXT,
         categories TEXT[]
     );"""
-    psql.query_execute(query)
+    psql.query_execute(query, target_db=target_db)
 
     # data.news_addition_{연도} 생성
     query = f"""
@@ -120,7 +284,7 @@ def create_table_news(year):
         keys TEXT[],
         values JSONB
     );"""
-    psql.query_execute(query)
+    psql.query_execute(query, target_db=target_db)
 
 
 
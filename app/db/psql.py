@@ -1,6 +1,32 @@
 import psycopg2
+from psycopg2 import extensions, pool
+import io
 import json
 import os
+import datetime
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+
+
+# 커넥션 풀 기본 설정 (config.db.json의 DB별칭마다 덮어쓸 수 있음)
+POOL_MAX_SIZE = 4  # 별칭당 최대 커넥션 수
+POOL_HEALTH_CHECK_INTERVAL = 30  # idle 커넥션을 꺼낼 때 상태를 확인할 기준 시간(초)
+POOL_ACQUIRE_TIMEOUT = 30  # 커넥션이 모두 사용 중일 때 기다리는 최대 시간(초)
+
+# 읽기 전용 복제본(replica) 기본 설정 (config.db.json의 primary 별칭마다 덮어쓸 수 있음)
+REPLICA_MAX_LAG = 30  # 허용하는 복제 지연(초), 초과 시 primary로 보냄
+REPLICA_CHECK_INTERVAL = 10  # 복제본 상태(지연/접속)를 다시 확인하는 주기(초)
+
+# 프로세스 내 캐시
+_config_db_json = None  # config.db.json 내용
+_pools = {}  # {DB별칭: ConnectionPool}
+_pools_pid = os.getpid()  # 풀을 생성한 프로세스 (fork 확인용)
+_pools_lock = threading.Lock()
+_replica_states = {}  # {replica 별칭: (확인한 시간, 사용 가능 여부)}
+_replica_turns = {}  # {primary 별칭: 다음에 사용할 replica 순번} (라운드 로빈)
+_replica_lock = threading.Lock()
 
 
 ############################
@@ -18,7 +44,10 @@ def find_config_db_json():
             "DBNAME": dbname,
             "PORT": port,
             "USER": user,
-            "PASSWORD": password
+            "PASSWORD": password,
+            "POOL_MAX_SIZE": 4,  # (선택) 커넥션 풀 설정, 없으면 psql의 기본값 사용
+            "REPLICAS": ["replica1"],  # (선택) 읽기 전용 쿼리를 보낼 복제본의 DB별칭 목록
+            "REPLICA_MAX_LAG": 30  # (선택) 허용하는 복제 지연(초)
         },
         "DB별칭2": {  # 별칭으로 db를 구분 (postgresql이라던지 몽고용db 등등)
             ...
@@ -53,10 +82,30 @@ def find_config_db_json():
     
 
 
+def load_config_db_json(reload=False):
+    """config.db.json 내용을 불러와 반환한다 (프로세스 내에서 한 번만 읽고 캐시함)
+
+    Args:
+        reload(bool): True일 경우 캐시를 무시하고 파일을 다시 읽는다 | Default: False
+
+    Returns:
+        dict: config.db.json 전체 내용
+    """
+    global _config_db_json
+
+    if _config_db_json is None or reload:
+        config_json = find_config_db_json()
+        with open(config_json, "r") as f:
+            _config_db_json = json.load(f)
+
+    return _config_db_json
+
+
 def connection_info(target_db="default"):
     """해당 명칭의 호스트의 접속 정보를 json파일로부터 가져온다.
     - 단일 DB만 사용할 경우 호스트는 default만 사용한다.
     - 서브 DB가 있을 경우 default 호스트를 유지하고, 서브 DB의 닉네임을 지정해 host를 추가한다.
+    - json 파일은 load_config_db_json에서 캐시하므로 매 호출마다 파일을 다시 읽지 않는다.
 
     Args:
         target_db(str): 접속할 데이터베이스 별칭 (json파일에 저장된 명칭)
@@ -66,12 +115,7 @@ def connection_info(target_db="default"):
         해당 호스트의 접속 정보
         host, dbname, port, user, password
     """
-    # json path 찾아서 불러오기
-    config_json = find_config_db_json()
-    with open(config_json, "r") as f:
-        json_loading = json.load(f)
-
-    db_info = json_loading[target_db]
+    db_info = load_config_db_json()[target_db]
     host = db_info["HOST"]
     port = db_info["PORT"]
     dbname = db_info["DBNAME"]
@@ -82,6 +126,7 @@ def connection_info(target_db="default"):
 
 def create_connection(target_db="default"):
     """connection_info로부터 접속 정보를 받아와 커넥션을 생성해 반환한다.
+    - 풀을 거치지 않는 단독 커넥션이므로, 사용 후 직접 close 해야 한다.
 
     Args:
         target_db(str): 접속할 데이터베이스 별칭 (json파일에 저장된 명칭)
@@ -94,59 +139,465 @@ def create_connection(target_db="default"):
     return connection
 
 
+##################
+### 커넥션 풀 ###
+
+
+class ConnectionPool():
+    """하나의 DB 별칭에 대한 커넥션 풀
+    - 커넥션은 필요할 때 생성하고, 반환된 커넥션은 닫지 않고 재사용한다 (최대 max_size개)
+    - max_size개가 모두 사용 중이면 반환될 때까지 대기한다 (acquire_timeout초 초과 시 PoolError)
+    - idle 상태로 health_check_interval초 이상 지난 커넥션은 꺼낼 때 SELECT 1로 상태를 확인한다
+
+    Attributes:
+        target_db(str): 풀이 사용하는 DB 별칭
+        max_size(int): 풀에서 동시에 열 수 있는 최대 커넥션 수
+        health_check_interval(float): idle 커넥션 상태 확인 주기(초)
+        acquire_timeout(float): 커넥션을 기다리는 최대 시간(초)
+    """
+
+    def __init__(self, target_db="default", max_size=POOL_MAX_SIZE,
+                 health_check_interval=POOL_HEALTH_CHECK_INTERVAL, acquire_timeout=POOL_ACQUIRE_TIMEOUT):
+        self.target_db = target_db
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = []  # [(connection, 반환된 시간), ...]
+        self._size = 0  # 현재 열려있는(사용 중 + idle) 커넥션 수
+        self._cond = threading.Condition()
+        self.closed = False
+
+
+    def _is_healthy(self, conn, idle_since):
+        """idle 커넥션이 사용 가능한 상태인지 확인한다"""
+        if conn.closed:
+            return False
+
+        # 최근에 사용된 커넥션은 확인 생략
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1;")
+            cur.close()
+            conn.rollback()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+        return True
+
+
+    def _discard(self, conn):
+        """커넥션을 닫고 풀의 크기에서 제외한다 (self._cond를 잡은 상태에서 호출)"""
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        self._size -= 1
+        self._cond.notify()
+
+
+    def acquire(self):
+        """풀에서 커넥션을 하나 꺼낸다 (없으면 생성, 최대 개수면 대기)
+
+        Returns:
+            psycopg2 connection: 사용할 커넥션 (사용 후 release로 반환)
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self.closed:
+                        raise pool.PoolError("connection pool is closed")
+
+                    # 1) idle 커넥션 재사용 (상태 확인은 lock 밖에서)
+                    if self._idle:
+                        conn, idle_since = self._idle.pop()
+                        break
+
+                    # 2) 여유가 있으면 새로 생성
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+
+                    # 3) 최대 개수 사용 중 > 반환될 때까지 대기
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise pool.PoolError(f"connection pool exhausted - {self.target_db}")
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                break
+
+            # 상태 확인(SELECT 1)은 네트워크 작업이므로 lock 밖에서 (응답 없는 소켓이 다른 acquire/release를 막지 않도록)
+            if self._is_healthy(conn, idle_since):
+                return conn
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+
+        # 커넥션 생성은 lock 밖에서 (느린 작업이므로)
+        try:
+            return create_connection(self.target_db)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+
+    def release(self, conn, discard=False):
+        """사용한 커넥션을 풀에 반환한다
+
+        Args:
+            conn(psycopg2 connection): acquire로 받은 커넥션
+            discard(bool): True일 경우 재사용하지 않고 닫음 (에러로 상태를 알 수 없는 경우 등)
+        """
+        # 트랜잭션이 남아 있는 상태로 반환되지 않도록 정리
+        if not discard and not conn.closed:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+
+        with self._cond:
+            if discard or conn.closed or self.closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+
+    def close(self):
+        """idle 커넥션을 모두 닫고 풀을 닫는다 (사용 중인 커넥션은 반환될 때 닫힘)"""
+        with self._cond:
+            self.closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+
+
+def get_pool(target_db="default"):
+    """DB 별칭에 해당하는 프로세스 공용 커넥션 풀을 반환한다 (없으면 생성)
+    - 풀 크기 등은 config.db.json의 해당 별칭에 POOL_MAX_SIZE, POOL_HEALTH_CHECK_INTERVAL, POOL_ACQUIRE_TIMEOUT로 지정 가능
+    - fork된 자식 프로세스에서는 부모의 커넥션을 공유하지 않도록 풀을 새로 만든다
+
+    Args:
+        target_db(str): 접속할 데이터베이스 별칭
+
+    Returns:
+        ConnectionPool: 커넥션 풀
+    """
+    global _pools, _pools_pid
+
+    with _pools_lock:
+        # fork된 경우 부모 프로세스의 커넥션은 닫지 않고 버림 (부모가 사용 중인 소켓이므로)
+        if _pools_pid != os.getpid():
+            _pools = {}
+            _pools_pid = os.getpid()
+
+        if target_db not in _pools:
+            db_info = load_config_db_json()[target_db]
+            _pools[target_db] = ConnectionPool(
+                target_db,
+                max_size=int(db_info.get("POOL_MAX_SIZE", POOL_MAX_SIZE)),
+                health_check_interval=float(db_info.get("POOL_HEALTH_CHECK_INTERVAL", POOL_HEALTH_CHECK_INTERVAL)),
+                acquire_timeout=float(db_info.get("POOL_ACQUIRE_TIMEOUT", POOL_ACQUIRE_TIMEOUT)),
+            )
+        return _pools[target_db]
+
+
+def close_pools():
+    """생성된 모든 커넥션 풀을 닫는다 (프로세스 종료 시 자동 실행)"""
+    with _pools_lock:
+        if _pools_pid == os.getpid():
+            for connection_pool in _pools.values():
+                connection_pool.close()
+        _pools.clear()
+
+
+atexit.register(close_pools)
+
+
+@contextmanager
+def connection(target_db="default"):
+    """풀에서 커넥션을 빌려 사용하고 with 블록이 끝나면 반환하는 컨텍스트 매니저
+    - commit은 하지 않으며, 끝나지 않은 트랜잭션은 반환 시 롤백된다
+
+    Args:
+        target_db(str): 접속할 데이터베이스 별칭
+
+    Yields:
+        psycopg2 connection: 풀의 커넥션
+    """
+    connection_pool = get_pool(target_db)
+    conn = connection_pool.acquire()
+    discard = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        # 커넥션 자체의 문제일 수 있으므로 재사용하지 않음
+        discard = True
+        raise
+    finally:
+        connection_pool.release(conn, discard=discard)
+
+
+@contextmanager
+def transaction(target_db="default"):
+    """하나의 커넥션에서 여러 쿼리를 단일 트랜잭션으로 실행하기 위한 컨텍스트 매니저
+    - with 블록이 정상 종료되면 commit, 예외가 발생하면 rollback 후 예외를 그대로 발생시킨다
+
+    eg.
+        with psql.transaction() as cur:
+            cur.execute(query1, data1)
+            cur.execute(query2, data2)
+
+    Args:
+        target_db(str): 접속할 데이터베이스 별칭
+
+    Yields:
+        psycopg2 cursor: 트랜잭션에 속한 커서
+    """
+    with connection(target_db) as conn:
+        cur = conn.cursor()
+        try:
+            yield cur
+            conn.commit()
+        except Exception:
+            # 커넥션이 끊긴 경우 롤백도 실패하므로, 원래 예외를 유지하도록 무시함
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                pass
+            raise
+        finally:
+            cur.close()
+
+
+@contextmanager
+def cursor(target_db="default"):
+    """SELECT 여러 개를 하나의 커넥션에서 실행하기 위한 커서 컨텍스트 매니저 (commit 없음)
+
+    Args:
+        target_db(str): 접속할 데이터베이스 별칭
+
+    Yields:
+        psycopg2 cursor: 커서
+    """
+    with connection(target_db) as conn:
+        cur = conn.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+
+########################
+### 읽기 전용 라우팅 ###
+
+
+def _check_replica(replica_db, max_lag):
+    """복제본에 접속해 복제 지연이 max_lag초 이내인지 확인한다
+    - 받은 WAL을 모두 재생한 상태면 지연 0으로 간주 (primary에 쓰기가 없을 때 지연이 늘어나 보이는 것 방지)
+
+    Returns:
+        bool: 사용 가능 여부
+    """
+    query = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END;"""
+    try:
+        with cursor(replica_db) as cur:
+            cur.execute(query)
+            lag = cur.fetchone()[0]
+    except psycopg2.Error as e:
+        print(f"# replica {replica_db} unavailable - {e}")
+        return False
+
+    if lag > max_lag:
+        print(f"# replica {replica_db} lagging - {lag:.1f}s")
+        return False
+    return True
+
+
+def replica_available(replica_db, max_lag=REPLICA_MAX_LAG):
+    """복제본이 사용 가능한지 반환한다 (REPLICA_CHECK_INTERVAL초 동안 결과를 캐시)
+
+    Args:
+        replica_db(str): 복제본의 DB별칭
+        max_lag(float): 허용하는 복제 지연(초)
+
+    Returns:
+        bool: 사용 가능 여부
+    """
+    now = time.monotonic()
+    checked = _replica_states.get(replica_db)
+    if checked and now - checked[0] < REPLICA_CHECK_INTERVAL:
+        return checked[1]
+
+    available = _check_replica(replica_db, max_lag)
+    _replica_states[replica_db] = (now, available)
+    return available
+
+
+def mark_replica_unavailable(replica_db):
+    """쿼리 실패 등으로 복제본을 다음 확인 시점까지 사용하지 않도록 표시한다"""
+    _replica_states[replica_db] = (time.monotonic(), False)
+
+
+def get_read_target(target_db="default"):
+    """읽기 전용 쿼리를 보낼 DB별칭을 반환한다
+    - config.db.json의 target_db 항목에 REPLICAS가 있으면 복제본 중 하나를 라운드 로빈으로 선택
+    - 복제본이 모두 사용 불가(접속 실패, 지연 초과)이거나 없으면 target_db(primary)를 그대로 반환
+
+    Args:
+        target_db(str): primary DB별칭
+
+    Returns:
+        str: 쿼리를 보낼 DB별칭
+    """
+    db_info = load_config_db_json()[target_db]
+    replicas = db_info.get("REPLICAS", [])
+    if not replicas:
+        return target_db
+    max_lag = float(db_info.get("REPLICA_MAX_LAG", REPLICA_MAX_LAG))
+
+    with _replica_lock:
+        turn = _replica_turns.get(target_db, 0)
+        _replica_turns[target_db] = turn + 1
+
+    for i in range(len(replicas)):
+        replica_db = replicas[(turn + i) % len(replicas)]
+        if replica_available(replica_db, max_lag):
+            return replica_db
+
+    return target_db
+
+
 #################
 ### 쿼리 실행 ###
 
-def query_execute(query, data=()):
+def query_execute(query, data=(), target_db="default"):
     """SELECT를 제외한 쿼리를 실행한다(결과 반환 없음)
     
     Args:
         query(str): 실행할 SQL 쿼리
         data(tuple): 쿼리를 execute할 때 넘겨줄 데이터 (= %s 자리에 들어갈 데이터)
+        target_db(str): 접속할 데이터베이스 별칭 | Default: "default"
     """
-    conn = create_connection()
-    cur = conn.cursor()
-    cur.execute(query, data)
-    conn.commit()
-    conn.close()
+    with transaction(target_db) as cur:
+        cur.execute(query, data)
 
 
-def query_executemany(query, datas=()):
+def query_executemany(query, datas=(), target_db="default"):
     """SELECT를 제외한 쿼리를 executemany로 실행한다(결과 반환 없음)
     
     Args:
         query(str): 실행할 SQL 쿼리
         datas(tuple): 쿼리를 execute할 때 넘겨줄 데이터 (= %s 자리에 들어갈 데이터)
+        target_db(str): 접속할 데이터베이스 별칭 | Default: "default"
     """
-    conn = create_connection()
-    cur = conn.cursor()
-    cur.executemany(query, datas)
-    conn.commit()
-    conn.close()
+    with transaction(target_db) as cur:
+        cur.executemany(query, datas)
 
 
-def query_select(query, data=(), fetchone=False):
+def query_select(query, data=(), fetchone=False, target_db="default", read_only=False):
     """SELECT 쿼리를 실행해 결과를 반환한다
 
     Args:
         query(str): 실행할 SQL 쿼리
         data(tuple): 쿼리를 execute할 때 넘겨줄 데이터
         fetchone(boolean): fetahall이 아닌 fetchone으로 가져올 경우 True로 설정
+        target_db(str): 접속할 데이터베이스 별칭 | Default: "default"
+        read_only(bool): True일 경우 target_db의 복제본(REPLICAS)으로 보냄 | Default: False
+            - 약간의 지연이 있어도 되는 조회(개수, 참조 테이블 등)에만 사용하고, 큐 선점 등은 primary에서 실행
+            - 복제본에서 실패하거나 복제본의 커넥션 풀이 가득 찬 경우 primary에서 다시 실행함
     
     Return:
         list: fetchall()로 가져온 SELECT 쿼리 결과 데이터를 반환함
     """
-    conn = create_connection()
-    cur = conn.cursor()
-    cur.execute(query, data)
-    if fetchone:
-        selected_datas = cur.fetchone()
-    else:
-        selected_datas = cur.fetchall()
-    conn.close()
+    if read_only:
+        read_db = get_read_target(target_db)
+        if read_db != target_db:
+            try:
+                return query_select(query, data, fetchone, target_db=read_db)
+            except pool.PoolError as e:
+                # 복제본 커넥션이 모두 사용 중인 경우 > 복제본은 정상이므로 사용 불가로 표시하지 않고 이번만 primary에서 실행
+                print(f"# replica {read_db} pool busy, fallback to {target_db} - {e}")
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                print(f"# replica {read_db} query failed, fallback to {target_db} - {e}")
+                mark_replica_unavailable(read_db)
+
+    with cursor(target_db) as cur:
+        cur.execute(query, data)
+        if fetchone:
+            selected_datas = cur.fetchone()
+        else:
+            selected_datas = cur.fetchall()
     return selected_datas
 
 
+def _copy_array_item(value):
+    """배열 리터럴({...}) 안의 값 하나를 문자열로 변환"""
+    if value is None:
+        return "NULL"
+    value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{value}"'
+
+
+def _copy_value(value):
+    """COPY text 형식의 값 하나로 변환 (None은 \\N, 탭/줄바꿈/백슬래시는 escape)"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        value = "t" if value else "f"
+    elif isinstance(value, (datetime.datetime, datetime.date)):
+        value = value.isoformat()
+    elif isinstance(value, (list, tuple)):
+        value = "{" + ",".join(_copy_array_item(v) for v in value) + "}"
+    elif isinstance(value, dict):
+        value = json.dumps(value, ensure_ascii=False)
+    else:
+        value = str(value)
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def copy_rows(cur, table, columns, rows):
+    """COPY FROM STDIN으로 rows를 테이블에 한번에 넣는다 (executemany보다 큰 본문이 많은 데이터에서 훨씬 빠름)
+    - 트랜잭션 안의 cur로 호출하므로, 보통 임시(스테이징) 테이블에 넣은 뒤 set 단위 쿼리로 적용함
+
+    Args:
+        cur(psycopg2 cursor): psql.transaction의 커서
+        table(str): 넣을 테이블명
+        columns(list): 컬럼명 리스트 (rows의 순서와 같아야 함)
+        rows(list): tuple in list (TEXT[]는 list, JSONB는 dict로)
+
+    Returns:
+        int: 넣은 행 수
+    """
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(v) for v in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    return cur.rowcount
+
+
 
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리(app)를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import time
+import threading
+
+from db import psql
+from utils import cache
+
+
+# 연도별 샤드 정보를 다시 읽어오는 주기(초)
+# - 샤드 이동(migrate_shard) 후 컨테이너들이 새 샤드를 사용하기까지 걸리는 최대 시간
+# - info.years 변경 알림(utils/cache.py)을 받는 중에는 바로 다시 읽음
+SHARD_MAP_TTL = 30
+
+_shard_map = None  # {year: DB별칭}
+_shard_map_loaded = 0
+_shard_map_lock = threading.Lock()
+
+
+def get_shard_map(reload=False):
+    """info.years의 shard 컬럼으로부터 연도별 DB별칭 매핑을 가져온다
+    - info 스키마는 항상 default DB에 있고, 연도별 queue.news_{year}, data.news_{year}는 shard 컬럼의 DB에 있음
+    - shard가 NULL인 연도는 default DB를 사용함
+    - SHARD_MAP_TTL초 동안 캐시함
+
+    Args:
+        reload(bool): True일 경우 캐시를 무시하고 다시 가져온다
+
+    Returns:
+        dict: {year(int): DB별칭(str)}
+    """
+    global _shard_map, _shard_map_loaded
+
+    with _shard_map_lock:
+        if _shard_map is None or reload or time.monotonic() - _shard_map_loaded > SHARD_MAP_TTL:
+            query = "SELECT year, shard FROM info.years;"
+            raw = psql.query_select(query)
+            _shard_map = {year: shard for year, shard in raw if shard}
+            _shard_map_loaded = time.monotonic()
+        return _shard_map
+
+
+def get_shard(year):
+    """해당 연도의 queue.news_{year}, data.news_{year}가 있는 DB별칭을 반환한다
+
+    Args:
+        year(int): 연도
+
+    Returns:
+        str: config.db.json의 DB별칭 (지정되지 않았으면 "default")
+    """
+    return get_shard_map().get(int(year), "default")
+
+
+def invalidate():
+    """캐시된 샤드 정보를 비운다 (다음 get_shard 호출 시 다시 가져옴)"""
+    global _shard_map
+
+    with _shard_map_lock:
+        _shard_map = None
+
+
+# info.years가 변경되면(알림) 샤드 정보도 다시 읽도록
+cache.reference_cache.subscribe("years", invalidate)
@@ -0,0 +1,108 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리(app)를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import initialize_info
+from db import psql, model, shard, backlog
+
+
+
+def upgrade_info():
+    """info 스키마의 테이블을 현재 model 기준으로 업데이트"""
+    # info.years.shard: 연도별 테이블이 있는 DB별칭
+    query = "ALTER TABLE info.years ADD COLUMN IF NOT EXISTS shard TEXT;"
+    psql.query_execute(query)
+
+    # info.workers: 컨테이너별 heartbeat, 처리량
+    model.create_table_workers()
+
+    # info.config, info.years, info.sids 변경 알림 트리거
+    model.create_info_notify_triggers()
+
+    # 새로 추가된 config 기본값
+    initialize_info.initialize_info_config()
+
+
+def upgrade_queue_date_pages():
+    """queue.date_pages 테이블을 현재 model 기준으로 업데이트"""
+    # 수집 대상 선점(lease) 컬럼
+    query = """
+    ALTER TABLE queue.date_pages
+        ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+        ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ,
+        ADD COLUMN IF NOT EXISTS lease_expires TIMESTAMPTZ;"""
+    psql.query_execute(query)
+
+    # 미수집 부분 인덱스
+    model.create_index_queue_date_page()
+
+    # 전역 기사 목록 (queue.articles, queue.article_sections)
+    model.create_table_articles()
+
+
+def upgrade_queue_news():
+    """연도별 queue.news_{year} 테이블을 현재 model 기준으로 업데이트 (각 연도의 샤드에서 실행)"""
+    years = [r[0] for r in psql.query_select("SELECT year FROM info.years ORDER BY year;")]
+    for year in years:
+        target_db = shard.get_shard(year)
+        exists = psql.query_select("SELECT to_regclass(%s) IS NOT NULL;", (f"queue.news_{year}",),
+                                   fetchone=True, target_db=target_db)[0]
+        if not exists:
+            continue
+
+        # 수집 대상 선점(lease) 컬럼
+        query = f"""
+        ALTER TABLE queue.news_{year}
+            ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+            ADD COLUMN IF NOT EXISTS lease_expires TIMESTAMPTZ;"""
+        psql.query_execute(query, target_db=target_db)
+
+        # news_year_id 범위 (8자리를 넘으면 news_id가 다음 연도와 겹치므로 저장 시 에러가 나도록)
+        query = f"""
+        DO $$ BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint
+                           WHERE conname = 'news_{year}_news_year_id_check' AND conrelid = 'queue.news_{year}'::regclass) THEN
+                ALTER TABLE queue.news_{year}
+                    ADD CONSTRAINT news_{year}_news_year_id_check CHECK (news_year_id < 100000000);
+            END IF;
+        END $$;"""
+        psql.query_execute(query, target_db=target_db)
+
+        # 미수집 큐 부분 인덱스, url 인덱스
+        model.create_index_queue_news(year, target_db)
+
+        # news_id가 없는 행 (큐 저장 시 news_id를 계산하기 전에 추가된 행)
+        query = f"UPDATE queue.news_{year} SET news_id = {year}::bigint * 100000000 + news_year_id WHERE news_id IS NULL;"
+        psql.query_execute(query, target_db=target_db)
+
+        # 미수집 개수 테이블 (upgrade 시 다시 셈, 세는 동안 해당 연도의 선점/수집 완료가 멈춤 - backlog.rebuild 참고)
+        model.create_table_backlog(target_db)
+        unscraped = backlog.rebuild(year, target_db)
+        print(f"queue.backlog {year}: {unscraped}")
+
+
+
+def main():
+    """initialize_table로 이미 생성된 테이블을 현재 코드에 맞게 업데이트한다
+    - 모든 쿼리는 IF NOT EXISTS 등으로 작성하여, 여러번 실행해도 문제가 없도록 함
+    """
+    upgrade_info()
+    print("info 스키마 업데이트")
+    upgrade_queue_date_pages()
+    print("queue.date_pages 테이블 업데이트")
+    upgrade_queue_news()
+    print("queue.news 테이블 업데이트")
+
+
+
+if __name__ == "__main__":
+
+    print("#" * 50)
+    answer = input("테이블을 업데이트할까요?(y/n): ")
+
+    if answer in ["y", "Y"]:
+        main()
+
+    print("테이블 업데이트 완료")
+    print("#" * 50)
@@ -4,7 +4,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 
 import datetime
-from db import psql, model
+from db import psql, model, shard
 from utils import utils
 
 
@@ -80,14 +80,19 @@ def add_year(year):
     if year in years:
         return False
     
-    # 2) 연도 추가하기
-    # info.years에 insert
-    query = "INSERT INTO info.years (year) VALUES (%s);"
-    psql.query_execute(query, (year,))
+    # 2) 연도 추가하기 (새 연도의 테이블을 둘 DB별칭은 info.config의 new_year_shard, 없으면 default)
+    target_db = utils.get_config("new_year_shard", default="default")
+
+    # queue, data 테이블 추가 (info.years보다 먼저, 알림을 받은 다른 컨테이너가 없는 테이블로 가지 않도록)
+    if target_db != "default":
+        model.create_schema(target_db)
+    model.create_table_queue_news(year, target_db)
+    model.create_table_news(year, target_db)
 
-    # queue, data 테이블 추가
-    model.create_table_queue_news(year)
-    model.create_table_news(year)
+    # info.years에 insert
+    query = "INSERT INTO info.years (year, shard) VALUES (%s, %s);"
+    psql.query_execute(query, (year, target_db))
+    shard.invalidate()
 
     return True
 
@@ -0,0 +1,54 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import argparse
+
+from queue_news import list_page
+from scraper_news import benchmark
+from utils import decoding
+
+
+# 저장해 둔 뉴스 목록 페이지로 추출 방식별 속도와 결과(링크, 페이지 목록)를 비교하는 벤치마크
+# eg. (app 디렉토리에서) python -m queue_news.benchmark ./list_pages -n 5
+# - 페이지는 list.naver?mode=LS2D&mid=shm&sid1=..&sid2=..&date=..&page=.. 의 html을 그대로 저장한 파일
+
+
+
+def get_parsers(charset):
+    """비교할 추출 함수 {이름: function(본문 bytes) > dict} (첫번째가 기준, 디코딩 시간 포함)
+
+    Args:
+        charset(str): 저장한 페이지의 인코딩 (응답 헤더의 charset)
+    """
+    stats = decoding.DecodeStats()  # 벤치마크는 공용 통계에 기록하지 않음
+    content_type = f"text/html; charset={charset}"
+    encoding = decoding.normalize_charset(charset)
+    return {
+        "bs4 (text)": lambda content: list_page.parse_list_page_bs4(content.decode(encoding)),
+        "lxml (text)": lambda content: list_page.parse_list_page(content.decode(encoding)),
+        "lxml (bytes)": lambda content: list_page.parse_list_page(content, decoding.resolve_encoding(content, content_type, stats=stats)[0]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="뉴스 목록 페이지 추출 벤치마크")
+    parser.add_argument("paths", nargs="+", help="저장한 목록 페이지 html 파일 또는 디렉토리")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="반복 횟수 (가장 빠른 회차 사용)")
+    parser.add_argument("--charset", default="EUC-KR", help="저장한 페이지의 인코딩 (list.naver 응답 헤더의 charset)")
+    args = parser.parse_args()
+
+    pages = benchmark.load_pages(args.paths)
+    if not pages:
+        print("## no pages")
+        return
+
+    parsers = get_parsers(args.charset)
+    results = benchmark.run_benchmark(pages, parsers, args.repeat)
+    benchmark.print_results(pages, parsers, results, args.repeat)
+
+
+
+if __name__ == "__main__":
+    main()
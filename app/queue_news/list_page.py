@@ -0,0 +1,66 @@
+import re
+
+from lxml import etree
+from bs4 import BeautifulSoup
+from cssselect import HTMLTranslator
+
+from utils import extraction, decoding
+
+
+# 뉴스 목록 페이지(list.naver)에서 사용하는 부분은 #main_content 안의 링크 목록과 페이지 목록(div.paging)뿐이므로,
+# html에서 #main_content가 시작하는 위치부터만 lxml로 파싱함 (앞쪽의 head, 상단 메뉴는 파싱하지 않음)
+_MAIN_CONTENT_START = re.compile(r"""<div\b[^>]*\bid\s*=\s*["']?main_content\b""", re.IGNORECASE)
+_MAIN_CONTENT_START_BYTES = re.compile(_MAIN_CONTENT_START.pattern.encode(), re.IGNORECASE)  # 응답 본문(bytes)용
+
+_translator = HTMLTranslator()
+_LINKS_XPATH = etree.XPath("(//div[@id = 'main_content'])[1]//a")
+_PAGING_LINKS_XPATH = etree.XPath(_translator.css_to_xpath("#main_content > div.paging > a"))
+_PAGING_CURRENT_XPATH = etree.XPath(_translator.css_to_xpath("#main_content > div.paging > strong"))
+
+
+
+def parse_list_page(html, encoding=None):
+    """뉴스 목록 페이지에서 링크 목록과 페이지 목록을 추출한다
+    - 응답 본문(bytes)과 인코딩(decoding.get_body)을 받으면 bytes에서 바로 잘라서 파싱함 (시작 표시는 ASCII이므로 cp949 등에서도 안전)
+
+    Args:
+        html(str or bytes): 목록 페이지 html
+        encoding(str): html이 bytes일 때의 인코딩 | Default: None
+
+    Returns:
+        dict: {"hrefs": #main_content 안의 모든 링크(list, 페이지 순서),
+               "paging": 페이지 목록(div.paging > a)의 텍스트(list),
+               "current": 현재 페이지(div.paging > strong)의 텍스트(str) | None}
+
+    Raises:
+        ValueError: #main_content가 없는 페이지 (에러 페이지 등을 빈 목록으로 처리하지 않도록)
+    """
+    pattern = _MAIN_CONTENT_START_BYTES if isinstance(html, bytes) else _MAIN_CONTENT_START
+    match = pattern.search(html)
+    if match is None:
+        raise ValueError("main_content not found in list page")
+
+    root = extraction.parse_html(html[match.start():], encoding)
+    current = _PAGING_CURRENT_XPATH(root)
+    return {
+        "hrefs": [a.attrib["href"] for a in _LINKS_XPATH(root)],
+        "paging": [extraction.get_text(a) for a in _PAGING_LINKS_XPATH(root)],
+        "current": extraction.get_text(current[0]) if current else None,
+    }
+
+
+def parse_list_page_bs4(html, encoding=None):
+    """parse_list_page의 BeautifulSoup(html.parser) 버전 (이전 방식, 결과 비교 및 벤치마크용)"""
+    if isinstance(html, bytes) and encoding is not None:
+        html = decoding.decode(html, encoding)
+    soup = BeautifulSoup(html, "html.parser")
+    main_content = soup.find("div", id="main_content")
+    if main_content is None:
+        raise ValueError("main_content not found in list page")
+
+    current = soup.select("#main_content > div.paging > strong")
+    return {
+        "hrefs": [tag["href"] for tag in main_content.find_all("a")],
+        "paging": [a.text for a in soup.select("#main_content > div.paging > a")],
+        "current": current[0].text if current else None,
+    }
@@ -9,12 +9,20 @@ import json
 from tqdm import tqdm
 
 from queue_news import news_queue_scraper
-from db import psql
-from utils import utils
+from db import psql, shard, backlog, articles
+from utils import utils, transport, worker, shutdown, decoding
 
 
-def get_target_date_page():
-    """sid1, sid2, date의 조합으로 이뤄진 하나의 타겟을 랜덤으로 가져와 반환한다
+def get_target_date_page(worker_id=None, lease_seconds=None):
+    """sid1, sid2, date의 조합으로 이뤄진 하나의 타겟을 선점(claim)하여 반환한다
+    - FOR UPDATE SKIP LOCKED로 다른 컨테이너가 선점 중인 날짜는 건너뛰므로, 같은 날짜를 동시에 수집하지 않음
+    - 선점한 행은 claimed_by, claimed_at, lease_expires가 설정됨 (수집 중 상태)
+    - lease_expires가 지나도록 완료되지 않은 날짜(컨테이너 종료 등)는 다시 수집 대상이 됨
+    - 최신 연도, 최신 날짜부터 가져옴
+
+    Args:
+        worker_id(str): 선점하는 컨테이너 아이디 | default: None (utils.get_worker_id())
+        lease_seconds(int): 선점 유지 시간(초) | default: None (info.config의 date_page_lease_seconds)
 
     Returns:
         if 존재할 경우:
@@ -24,15 +32,90 @@ def get_target_date_page():
             int: sid2
             str: date (yyyymmdd)
         else 수집할 대상이 없을 경우:
-            tuple: 비어 있는 튜플 반환 (if에서 False)
+            None (if에서 False)
     """
-    query = "SELECT date_queue_id, year, sid1, sid2, date FROM queue.date_pages WHERE page_added = %s ORDER BY RANDOM() LIMIT 1;"
-    result = psql.query_select(query, (False,), fetchone=True)
+    worker_id = worker_id or utils.get_worker_id()
+    if lease_seconds is None:
+        lease_seconds = utils.get_config("date_page_lease_seconds", set_int=True, default=900)
+
+    query = """
+    WITH claimable AS (
+        SELECT date_queue_id FROM queue.date_pages
+            WHERE page_added = false AND (lease_expires IS NULL OR lease_expires < now())
+            ORDER BY year DESC, date DESC LIMIT 1
+            FOR UPDATE SKIP LOCKED
+    )
+    UPDATE queue.date_pages AS d
+        SET claimed_by = %s, claimed_at = now(), lease_expires = now() + make_interval(secs => %s)
+        FROM claimable WHERE d.date_queue_id = claimable.date_queue_id
+        RETURNING d.date_queue_id, d.year, d.sid1, d.sid2, d.date;"""
+    with psql.transaction() as cur:
+        cur.execute(query, (worker_id, lease_seconds))
+        result = cur.fetchone()
     return result
 
 
+def release_date_page(date_queue_id, worker_id=None):
+    """선점한 날짜를 수집하지 못한 경우 선점을 해제하여 바로 다른 컨테이너가 가져갈 수 있도록 한다
+
+    Args:
+        date_queue_id(str): 해제할 date_queue_id
+        worker_id(str): 선점한 컨테이너 아이디 | default: None (utils.get_worker_id())
+    """
+    worker_id = worker_id or utils.get_worker_id()
+    query = """
+    UPDATE queue.date_pages SET claimed_by = NULL, claimed_at = NULL, lease_expires = NULL
+        WHERE date_queue_id = %s AND claimed_by = %s AND page_added = false;"""
+    psql.query_execute(query, (date_queue_id, worker_id))
+
+
+def complete_date_page(date_queue_id, year, sid1, sid2, date, links, max_page, worker_id=None):
+    """선점한 날짜의 링크를 큐에 저장하고 완료 처리한다
+    - date_pages 행을 잠근 채로 선점 여부를 다시 확인하고 저장하므로, 선점이 만료되어 다른 컨테이너가
+      같은 날짜를 먼저 완료했거나 다시 선점한 경우에는 저장하지 않음 (중복 링크 방지)
+
+    Args:
+        date_queue_id(str): 완료할 date_queue_id
+        year(int), sid1(int), sid2(int), date(str), links(list): save_queue_news와 같음
+        max_page(int): 마지막 페이지 (page_length)
+        worker_id(str): 선점한 컨테이너 아이디 | default: None (utils.get_worker_id())
+
+    Returns:
+        bool: True일 경우 저장 후 완료, False일 경우 선점을 잃어 저장하지 않음
+    """
+    worker_id = worker_id or utils.get_worker_id()
+
+    with psql.transaction() as cur:
+        query = """
+        SELECT 1 FROM queue.date_pages
+            WHERE date_queue_id = %s AND claimed_by = %s AND page_added = false
+            FOR UPDATE;"""
+        cur.execute(query, (date_queue_id, worker_id))
+        if cur.fetchone() is None:
+            return False
+
+        # 링크 저장 (연도별 샤드 DB)
+        inserted = save_queue_news(year, sid1, sid2, date, links)
+        print(f">> new links: {inserted} / {len(links)}")
+
+        # queue.date_pages의 page_added, page_length, news_count 업데이트 & 선점 해제
+        query = """
+        UPDATE queue.date_pages
+            SET page_added = %s, page_length = %s, news_count = %s, claimed_by = NULL, lease_expires = NULL
+            WHERE date_queue_id = %s;"""
+        cur.execute(query, (True, max_page, len(links), date_queue_id))
+
+    return True
+
+
 def save_queue_news(year, sid1, sid2, date, links):
     """수집된 링크를 큐에 저장
+    - 같은 기사(oid, aid)는 연도, 섹션, url 형태와 상관없이 한번만 큐에 넣음 (queue.articles로 확인)
+      - 이미 큐에 있는 기사는 나온 섹션만 queue.article_sections에 기록
+    - COPY로 스테이징 테이블에 넣은 뒤 한번의 INSERT ... SELECT로 저장 (단일 트랜잭션)
+    - 이미 큐에 있는 url은 저장하지 않음 (연도 내 url 기준)
+    - news_id는 저장 시 DB에서 news_year_id로 계산함 (연도 4자리 + news_year_id 8자리 = year * 100000000 + news_year_id)
+      - news_year_id가 8자리를 넘으면 다음 연도의 news_id와 겹치므로, 테이블의 CHECK (news_year_id < 100000000)로 저장이 실패함
 
     Args:
         year(int): 수집 대상 날짜의 연도(저장 테이블 구분용)
@@ -40,21 +123,43 @@ def save_queue_news(year, sid1, sid2, date, links):
         sid2(int): 수집 대상 섹션2
         date(str): 수집 대상 날짜 (yyyymmdd)
         links(list): 해당 페이지에서 수집한 뉴스 링크(전체)
-    
+
+    Returns:
+        int: 새로 저장된 링크 수
     """
-    datas = []
     kst_now = utils.get_kst_datetime()
 
-    for link in links:
-        row = (sid1, sid2, date, link, False, kst_now)
-        datas.append(row)
+    query = f"""
+    INSERT INTO queue.news_{year} (news_year_id, news_id, sid1, sid2, date, url, is_scraped, added)
+        SELECT id, {int(year)}::bigint * 100000000 + id, %s, %s, %s, url, false, %s
+        FROM (
+            SELECT nextval(pg_get_serial_sequence('queue.news_{year}', 'news_year_id')) AS id, url
+                FROM (SELECT DISTINCT url FROM queue_stage) AS s
+                WHERE NOT EXISTS (SELECT 1 FROM queue.news_{year} AS q WHERE q.url = s.url)
+        ) AS new_links;"""
+
+    # 기사 목록 등록(default DB) 트랜잭션 안에서 큐를 저장하므로, 큐 저장이 실패하면 기사 목록 등록도 롤백됨
+    with psql.transaction() as article_cur:
+        new_links, keys = articles.register(article_cur, year, links)
+        articles.add_sections(article_cur, keys, sid1, sid2, date)
+
+        # 큐 저장과 미수집 개수(queue.backlog) 증가를 같은 트랜잭션에서 실행
+        with psql.transaction(shard.get_shard(year)) as cur:
+            cur.execute("CREATE TEMP TABLE queue_stage (url TEXT) ON COMMIT DROP;")
+            psql.copy_rows(cur, "queue_stage", ["url"], [(link,) for link in new_links])
+
+            # 같은 연도에 동시에 저장하는 컨테이너끼리 url 중복 확인이 겹치지 않도록 연도별로 순서대로 저장
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (f"queue.news_{year}",))
+            cur.execute(query, (sid1, sid2, date, kst_now))
+            inserted = cur.rowcount
+
+            backlog.add(cur, year, {(sid1, sid2): inserted})
 
-    query = f"INSERT INTO queue.news_{year} (sid1, sid2, date, url, is_scraped, added) VALUES (%s, %s, %s, %s, %s, %s);"
-    psql.query_executemany(query, datas)  # 중복검사 없이 저장
+    return inserted
 
 
 
-def run_queue_scraper(sid1, sid2, date, use_tqdm=False):
+def run_queue_scraper(sid1, sid2, date, use_tqdm=False, date_queue_id=None, worker_id=None):
     """뉴스 큐 스크래퍼를 실행하고 데이터를 DB에 저장한다
 
     Args:
@@ -62,109 +167,75 @@ def run_queue_scraper(sid1, sid2, date, use_tqdm=False):
         sid2(int): 섹션 소분류 아이디
         date(str): 수집할 날짜 (yyyymmdd 형태의 문자열)
         use_tqdm(bool): tqdm 사용 여부
+        date_queue_id(str): 선점한 date_queue_id (있을 경우 complete_date_page로 저장 & 완료 처리) | Default: None
+        worker_id(str): 선점한 컨테이너 아이디 | Default: None (utils.get_worker_id())
 
     Return:
         int: 마지막 페이지 (last_page)
-        int: 전체 링크 수
+        int: 전체 링크 수 (선점을 잃어 저장하지 않은 경우 0)
     """
     # 1) 객체 생성
     scraper = news_queue_scraper.NewsLinksScraper(sid1, sid2, date)
 
     # 2) last_page 확인
-    last_page = scraper.get_last_page(use_tqdm)
-    
-    # use_tqdm=True 시 tqdm 출력
-    if use_tqdm:
-        rep = tqdm(range(1, last_page+1))
-    else:
-        rep = range(1, last_page+1)
+    last_page = scraper.get_last_page()
+    print(f">> last_page: {last_page} / probes: {scraper.last_page_probes}")
         
-    # 3) 페이지별 수집
-    links = []
-    for page in rep:
-        single_page_links = scraper.scrape_links_single_page(page)
-        links.extend(single_page_links)
+    # 3) 페이지별 수집 (동시에 요청, last_page 확인 시 받은 페이지는 다시 받지 않음)
+    links = scraper.scrape_links_pages(range(1, last_page+1), use_tqdm)
         
-    # 4) 중복된 링크 업애기
-    links = list(set(links))  # set 그대로 쓰는게 나을지도 (어차피 for만 돌리니까)
+    # 4) 중복된 링크 업애기 (url 형태가 다른 같은 기사는 저장 시 기사 키로 한번 더 걸러짐)
+    links = list(set(links))
         
     # 5) db에 저장
     year = int(date[:4])
-    save_queue_news(year, sid1, sid2, date, links)
+    if date_queue_id is None:
+        inserted = save_queue_news(year, sid1, sid2, date, links)
+        print(f">> new links: {inserted} / {len(links)}")
+    elif not complete_date_page(date_queue_id, year, sid1, sid2, date, links, last_page, worker_id):
+        print(f">> lease lost - {date_queue_id} / links discarded")
+        return last_page, 0
         
     return last_page, len(links)
 
 
 
-def update_news_id(year):
-    """news_year_id와 연도를 기반으로 news_id를 업데이트
-
-    Arg:
-        year(int): 업데이트 대상 테이블의 연도
-    """
-    # 1) news_id가 없는 news_year_id 받아오기
-    query = f"SELECT news_year_id FROM queue.news_{year} WHERE news_id IS NULL;"
-    raw = psql.query_select(query)
-    news_year_ids = [r[0] for r in raw]
-
-    # 2) 업데이트용 데이터 생성
-    datas = []
-    for news_year_id in news_year_ids:
-        str_id = str(news_year_id)
-
-        if len(str_id) <= 8:  # 8자리까지만 사용할 예정이므로 이렇게
-            str_id = str_id.zfill(8)  # 8자리로 만들고, 왼쪽을 0으로 채우기
-        
-        else:
-            print("news_year_id가 8자리를 넘음")
-            # TODO: 에러 발생하게 추가
-
-        news_id = int(f"{year}{str_id}")  # yyyy + news_year_id[-8:] 형태의 12자리 뉴스 아이디 사용
-        data = (news_id, news_year_id)
-        datas.append(data)
-    
-    # 3) 업데이트
-    query = f"UPDATE queue.news_{year} SET news_id = %s WHERE news_year_id = %s;"
-    psql.query_executemany(query, datas)
-
-
-
-
-def main(run_update_news_id=True):
+def main():
     """스크래퍼 큐 수집 단일로 실행하고 db에 저장
-    ## Note: data.news 수집 시 queue에서 미수집 뽑고 news_id가 None이 아닌 것만 가져오도록
-
-    Args:
-        update_uews_id(bool): news_id 업데이트 실행여부 | Default: True
+    ## Note: news_id는 큐 저장 시 함께 계산되므로 별도로 업데이트하지 않음
     
     Returns:
         bool: True일 경우 수집된 것, False일 경우 모두 수집하여 수집 대상이 없는 것
     
     """
-    # 1) 수집 대상 sid1, sid2, date 가져오기
-    result = get_target_date_page()  # queue.date_pages에서 무작위로 가져옴
+    # 1) 수집 대상 sid1, sid2, date 선점하기 (종료 요청을 받았으면 새로 선점하지 않음)
+    if shutdown.is_requested():
+        print(">> queue.news - shutdown requested, skip claiming")
+        return False
+    worker_id = utils.get_worker_id()
+    result = get_target_date_page(worker_id)  # queue.date_pages에서 최신 날짜부터 선점
     if result:
         # 수집할 대상이 있는 경우
         date_queue_id, year, sid1, sid2, date = result
-        print(f">> queue.news start - id: {date_queue_id}")
+        print(f">> queue.news start - id: {date_queue_id} / worker: {worker_id}")
     else:
-        # 수집할 대상이 없는 경우
-        print(f">> queue.news - theres no not queue.date_pages target / all queue.date_pages added")
+        # 수집할 대상이 없는 경우 (다른 컨테이너가 수집 중인 날짜 제외)
+        print(f">> queue.news - theres no not queue.date_pages target / all queue.date_pages added or claimed")
         return False
 
-    # 2) 수집 실행하고 db에 저장하기
-    max_page, links_count = run_queue_scraper(sid1, sid2, date, use_tqdm=False)
-
-    # 3) news_id 업데이트 실행하기
-    ## 뉴스 아이디가 업데이트되어야 data.news에 저장할 때 news_id가 있으므로, 기본적으로 업데이트하도록
-    print(f">> queue.news - update news id")
-    if run_update_news_id:
-        update_news_id(year)
+    # 2) 수집 실행하고 db에 저장 & queue.date_pages 완료 처리 (page_added, page_length, news_count)
+    # 에러 발생 시 선점을 해제하여 lease 만료를 기다리지 않고 다시 수집되도록 함
+    try:
+        max_page, links_count = run_queue_scraper(sid1, sid2, date, use_tqdm=False,
+                                                  date_queue_id=date_queue_id, worker_id=worker_id)
+    except BaseException:
+        release_date_page(date_queue_id, worker_id)
+        raise
 
-    # 4) queue.date_pages의 page_added, page_length, news_count 업데이트
-    query = "UPDATE queue.date_pages SET page_added = %s, page_length = %s, news_count = %s WHERE date_queue_id = %s;"
-    psql.query_execute(query, (True, max_page, links_count, date_queue_id))
+    worker.record(links_count, target=date_queue_id)
 
     # 출력
     print(f">> queue.news added - {date_queue_id} / max_page: {max_page} / links_count: {links_count}")
-    return True
\ No newline at end of file
+    print(f">> transport - {transport.shared_stats.summary(reset=True)}")
+    print(f">> decoding - {decoding.shared_stats.summary(reset=True)}")
+    return True
@@ -4,12 +4,18 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 
 import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 
-import requests
 from tqdm import tqdm
 from bs4 import BeautifulSoup
 from db import psql
-from utils import utils
+from utils import utils, transport, deadline, decoding
+from queue_news import list_page
+
+
+# 목록 페이지를 동시에 요청하는 스레드 수 기본값 (info.config의 queue_page_workers로 덮어씀)
+QUEUE_PAGE_WORKERS = 8
 
 
 class NewsLinksScraper():
@@ -25,13 +31,21 @@ class NewsLinksScraper():
         user_agent(str): headers에 포함할 User-Agent, 기본값이 존재하고 필요에 따라 객체 초기화 후 덮어써서 사용함
         start_time(float): 객체가 초기화된 시간 (=시작 시간)
         elapsed(float): 소요 시간, start_time - time.time()
+        page_cache(dict): {(sid1, sid2, date, page): (본문 bytes, 인코딩)의 Future} 객체 내에서 같은 페이지를 다시 받지 않도록 메모이제이션
+        parsed_cache(dict): {page: list_page.parse_list_page 결과} 같은 페이지를 다시 파싱하지 않도록 메모이제이션
+        last_page_probes(int): get_last_page에서 마지막 페이지를 찾기 위해 요청한 페이지 수
         
     
     Methods:
         __init__: sid와 날짜를 받고 initialize
+        get_link_page_html: 특정 링크 페이지의 html을 반환함
+        get_link_page_body: 특정 링크 페이지의 본문(bytes)과 인코딩을 반환함 (객체 내에서 페이지당 한 번만 요청)
         get_link_page_soup: 특정 링크 페이지에 req > html > soup 생성하여 반환함
+        get_list_page: 특정 링크 페이지의 링크 목록, 페이지 목록만 빠르게 추출하여 반환함 (list_page.parse_list_page)
         get_last_page: 현재 설정의 링크 페이지의 마지막 숫자를 반환
+        search_last_page: 링크 목록을 비교해 마지막 페이지를 O(log n) 요청으로 탐색
         scrape_single_link_page: 링크 페이지 하나에서 링크를 모두 수집하여 반환
+        scrape_links_pages: 여러 링크 페이지를 스레드 풀로 동시에 수집하여 반환
         run: 위 과정을 차레로 실행하여 특정 날짜의 모든 링크 수집 // 기본적으론 initialize후 run만 실행하는 식으로
         
     """
@@ -52,9 +66,64 @@ class NewsLinksScraper():
         self.user_agent = utils.get_user_agent()
         self.start_time = time.time()
         self.elapsd = 0
+
+        self.page_cache = {}
+        self.parsed_cache = {}
+        self._page_cache_lock = threading.Lock()
+        self.last_page_probes = 0
         
     
     
+    def get_link_page_html(self, page=1):
+        """특정 페이지의 링크 페이지에 접속한 뒤 html을 반환한다. (get_link_page_body를 디코딩한 것)
+
+        Args:
+            page(int): 접속할 페이지의 숫자
+
+        Returns:
+            str: 페이지의 html
+        """
+        return decoding.decode(*self.get_link_page_body(page))
+
+
+    def get_link_page_body(self, page=1):
+        """특정 페이지의 링크 페이지에 접속한 뒤 본문(bytes)과 인코딩을 반환한다.
+        - response.text처럼 str로 디코딩하지 않음 (인코딩은 헤더/meta로 정하고, 전체 본문 검사는 선언이 없을 때만 함)
+        - 객체 안에서 (sid1, sid2, date, page)별로 메모이제이션하여, get_last_page에서 받은 페이지 등을 다시 요청하지 않음
+        - 여러 스레드에서 같은 페이지를 동시에 요청해도 실제 요청은 한 번만 함 (나머지는 결과를 기다림)
+        - 요청이 실패한 경우 캐시에 남기지 않음 (다음 호출 시 다시 요청)
+
+        Args:
+            page(int): 접속할 페이지의 숫자
+
+        Returns:
+            bytes: 페이지의 본문
+            str: 인코딩 (eg. "cp949")
+        """
+        key = (self.sid1, self.sid2, self.date, page)
+        with self._page_cache_lock:
+            future = self.page_cache.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self.page_cache[key] = future
+
+        if is_owner:
+            args = {"mode": "LS2D", "mid": "shm",  # mid는 main content 화면의 구성에 관련, mode는 미확인
+                    "sid1": self.sid1, "sid2": self.sid2,
+                    "date": self.date, "page": page}
+            try:
+                response = transport.get_transport().get("https://news.naver.com/main/list.naver", params=args,
+                                                          headers={"User-Agent": self.user_agent})
+                future.set_result(decoding.get_body(response))
+            except BaseException as e:
+                with self._page_cache_lock:
+                    self.page_cache.pop(key, None)
+                future.set_exception(e)
+
+        return future.result()
+
+
     def get_link_page_soup(self, page=1):
         """특정 페이지의 링크 페이지에 접속한 뒤 soup 객체를 생성하여 반환한다.
         타 메소드에서 반복적으로 사용되는 기능을 뺀 것
@@ -67,29 +136,42 @@ class NewsLinksScraper():
         Returns:
             BeautifulSoup: bs4 객체
         """
-        args = {"mode": "LS2D", "mid": "shm",  # mid는 main content 화면의 구성에 관련, mode는 미확인
-                "sid1": self.sid1, "sid2": self.sid2,
-                "date": self.date, "page": page}
-        response = requests.get("https://news.naver.com/main/list.naver", params=args,
-                            headers={"User-Agent": self.user_agent})
-        soup = BeautifulSoup(response.text, "html.parser")
+        html = self.get_link_page_html(page)
+        soup = BeautifulSoup(html, "html.parser")
         return soup
 
+
+    def get_list_page(self, page=1):
+        """특정 페이지의 링크 페이지에서 링크 목록과 페이지 목록을 추출하여 반환한다.
+        - 전체 soup 대신 #main_content 부분만 lxml로 파싱함 (list_page.parse_list_page, 벤치마크: python -m queue_news.benchmark)
+        - 페이지별로 한 번만 파싱함 (get_last_page에서 파싱한 1페이지 등을 다시 파싱하지 않음)
+
+        Args:
+            page(int): 접속할 페이지의 숫자
+
+        Returns:
+            dict: {"hrefs": 링크 목록, "paging": 페이지 목록 텍스트, "current": 현재 페이지 텍스트}
+        """
+        parsed = self.parsed_cache.get(page)
+        if parsed is None:
+            parsed = list_page.parse_list_page(*self.get_link_page_body(page))
+            self.parsed_cache[page] = parsed
+        return parsed
+
     
-    def get_last_page(self, use_tqdm=False):
+    def get_last_page(self):
         """현재 세팅(sid1, sid2, date)하에서 뉴스 기사 목록의 마지막 페이지를 반환한다.
-        
-        Args:
-            use_tqdm(bool): tqdm을 통한 출력을 실행할 지 여부 | default: False
+        - 탐색에 요청한 페이지 수는 self.last_page_probes에 저장함
             
         Returns:
             int: 마지막 페이지 숫자
         
         MEMO(0612): last_page를 못 불러오는 문제가 생겨서(20210129, 101, 262) if 페이가 10페이지 이하일 경우 별도로 처리하게 수정
         """
+        self.last_page_probes = 1
+
         # 페이지 여러 페이지인지 체크
-        soup = self.get_link_page_soup(1)
-        pages = soup.select("#main_content > div.paging > a")  # 페이지 목록들 가져옴
+        pages = self.get_list_page(1)["paging"]  # 페이지 목록들 가져옴
         
         # Case: 1페이지만 있을 경우 (현재 페이지는 카운트되지 않으므로, 0으로 길이가 잡힘)
         if len(pages) == 0:
@@ -97,43 +179,74 @@ class NewsLinksScraper():
                        
         # Case: 페이지가 10장 이하 > last_page를 현재 페에지에서 맨 마지막으로
         elif len(pages) < 10:  # 현재 페이지(1p)를 제외하므로, 10개 미만(==총 페이지 11페이지 이하)
-            last_page = int(pages[-1].text.strip())  # 페이지수 중 맨 뒤의 것 사용
+            last_page = int(pages[-1].strip())  # 페이지수 중 맨 뒤의 것 사용
         
         # Case: 페이지가 10장 초과 (기존처럼 맨 마지막 페이지로 이동해서 수집)
         else:
             # 접속
             page = 999  # 가능한 큰 페이지 (마지막 페이지로 가도록 하는 것)
-            soup = self.get_link_page_soup(page)
+            current = self.get_list_page(page)["current"]
+            self.last_page_probes += 1
             
             # 현재 페이지(=마지막 페이지) 가져오기
-            if soup.select("#main_content > div.paging > strong"):
-                last_page = soup.select("#main_content > div.paging > strong")[0].text
-                last_page = int(last_page)
+            if current is not None:
+                last_page = int(current)
             
-            # 위 방식으로도 가끔 page 값을 못 가져오는 경우가 있음, 이 경우 한 페이지씩 올라가면서 체크하도록
+            # 위 방식으로도 가끔 page 값을 못 가져오는 경우가 있음, 이 경우 링크 목록을 비교하며 탐색
+            # (1페이지에 10페이지까지의 링크가 있었으므로 10페이지까지는 존재함)
             else:
-                joined_urls = ""
-                
-                if use_tqdm:
-                    pbar = tqdm(range(1, page+1))
-                else:
-                    pbar = range(1, page+1)
-                    
-                for p in pbar:
-                    if use_tqdm:
-                        pbar.set_description("last_page 순차 탐색")
-                    
-                    hrefs = self.scrape_links_single_page(p)
-                    jurls = "\n".join(hrefs)
-                    
-                    if jurls != joined_urls:
-                        joined_urls = jurls
-                    
-                    else:  # 이전과 같을 경우 (해당 페이지 전 페이지가 마지막 페이지임)
-                        last_page = p - 1
-                        break
+                last_page = self.search_last_page(known_page=10, max_page=page)
 
         return last_page
+
+
+    def search_last_page(self, known_page=10, max_page=999):
+        """마지막 페이지를 넘어가면 마지막 페이지와 같은 목록이 나오는 것을 이용해 마지막 페이지를 탐색한다.
+        1) 갤로핑: known_page부터 2배씩 늘리며 p, p-1 페이지의 링크가 같아지는(=p가 마지막 페이지를 넘어간) p를 찾음
+        2) 이진 탐색: 그 사이에서 마지막 페이지의 링크 목록과 같은 가장 작은 페이지를 찾음
+        - 요청 수는 O(log n), 요청한 페이지는 메모이제이션되어 이후 수집 시 재사용됨
+        - 요청한 페이지 수는 self.last_page_probes에 더함
+
+        Args:
+            known_page(int): 존재하는 것이 확실한 페이지
+            max_page(int): 탐색할 최대 페이지
+
+        Returns:
+            int: 마지막 페이지 숫자 (max_page까지 반복되지 않으면 max_page)
+        """
+        probed = set()
+
+        def page_links(p):
+            probed.add(p)
+            return tuple(self.scrape_links_single_page(p))
+
+        # 1) 갤로핑
+        lo = known_page  # 마지막 페이지 이하인 것이 확실한 페이지
+        hi = None  # 마지막 페이지를 넘어간 것이 확실한 페이지
+        while lo < max_page:
+            p = min(lo * 2, max_page)
+            if page_links(p) == page_links(p - 1):
+                hi = p
+                break
+            lo = p
+
+        if hi is None:
+            self.last_page_probes += len(probed)
+            print(f"# last_page not found until {max_page} - {self.sid1}-{self.sid2}-{self.date}")
+            return max_page
+
+        # 2) 이진 탐색 (lo <= last_page <= hi - 1)
+        last_links = page_links(hi)
+        hi = hi - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if page_links(mid) == last_links:
+                hi = mid
+            else:
+                lo = mid + 1
+
+        self.last_page_probes += len(probed)
+        return lo
         
     
     def scrape_links_single_page(self, page=1):
@@ -147,15 +260,36 @@ class NewsLinksScraper():
             list: 해당 섹션 소분류 페이지에서 main_content 내에 속하는 모든 sid1이 일치하는 링크의 목록
                 eg. ["url with sid1", "url with sid1", ...]
         """
-        # soup 객체 생성
-        soup = self.get_link_page_soup(page)
-        
-        # main_content의 내용만 가져오기
-        main_content = soup.find("div", id="main_content")
-
-        # 링크만 가져와서 필터링
-        hrefs = [tag["href"] for tag in main_content.find_all("a")]
+        # main_content의 링크만 가져와서 필터링
+        hrefs = self.get_list_page(page)["hrefs"]
         hrefs = [href for href in hrefs if f"sid={self.sid1}" in href]  # sid가 sid1으로 잡히는 것 같음 (소분류는 args 내에는 없음)
         
         return hrefs
 
+
+    def scrape_links_pages(self, pages, use_tqdm=False):
+        """여러 페이지의 링크를 스레드 풀로 동시에 수집한다
+        - 동시 요청 수는 info.config의 queue_page_workers
+        - 이미 받은 페이지(get_last_page 등)는 메모이제이션된 html을 사용함
+
+        Args:
+            pages(iterable): 수집할 페이지 숫자들
+            use_tqdm(bool): tqdm 사용 여부
+
+        Returns:
+            list: pages 순서대로 각 페이지의 링크 목록을 이어붙인 목록
+        """
+        pages = list(pages)
+        workers = utils.get_config("queue_page_workers", set_int=True, default=QUEUE_PAGE_WORKERS)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # 스레드에도 호출한 쪽의 Deadline 적용 (만료 후에는 남은 페이지를 요청하지 않음)
+            results = executor.map(deadline.wrap(self.scrape_links_single_page), pages)
+            if use_tqdm:
+                results = tqdm(results, total=len(pages))
+
+            hrefs = []
+            for single_page_hrefs in results:
+                hrefs.extend(single_page_hrefs)
+
+        return hrefs
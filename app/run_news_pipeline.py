@@ -0,0 +1,38 @@
+import traceback
+
+from scraper_news import pipeline
+
+from utils import worker, shutdown, archive
+
+
+
+def main():
+    """뉴스 수집 파이프라인(claim > fetch > parse > write)을 계속 실행 (SIGTERM을 받으면 선점한 기사를 처리하고 종료)
+    - run_news_scraper.py(배치 단위 실행) 대신 사용 (eg. news 이미지로 `python run_news_pipeline.py`)
+    """
+    shutdown.install()
+    # info.workers에 등록, heartbeat 시작 (종료된 컨테이너의 선점은 run_reaper.py가 해제함)
+    worker.start_worker("news")
+
+    while not shutdown.is_requested():
+        try:
+            pipeline.NewsPipeline().run()
+
+        # 에러 발생 시 (단계 안의 에러는 각 단계에서 처리하므로, 파이프라인 자체가 멈춘 경우)
+        except Exception as e:
+            worker.record(errors=1)
+            print("-" * 60)
+            print("Error on - news pipeline")
+            print("-" * 30)
+            print(traceback.format_exc())
+            print("-" * 60)
+            shutdown.wait(10)
+
+    archive.close_archive()  # 아카이브에 모아둔 페이지 저장
+    worker.stop_worker()
+    print("> Shutdown")
+
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,20 @@ import time
 
 from scraper_news import main as scraper_news
 
-from utils import utils, timeout
+from utils import utils, deadline, worker, shutdown, archive
 from db import psql
 
 
-# batch_size * news_timeout_multiplier 만큼을 timeout seconds 로 설정 / 윈도우에서는 사용불가
-@timeout.timeout(seconds= utils.get_config("news_timeout_multiplier", True) * utils.get_config("news_batch_size", True) )
+def get_timeout_seconds():
+    """batch_size * news_timeout_multiplier 만큼을 배치 예산(초)으로 설정 (실행마다 현재 설정 사용)"""
+    return utils.get_config("news_timeout_multiplier", True) * utils.get_config("news_batch_size", True)
+
+
 def single_run():
-    """단일 실행, timeout 및 예외처리 포함"""
+    """단일 실행, timeout 및 예외처리 포함
+    - 배치 예산(Deadline)은 요청/파싱을 시작할 때마다 확인하므로 DB 저장 도중에는 중단되지 않음
+    - 예산을 넘기면 수집한 기사까지 저장한 뒤 DeadlineExceeded(TimeoutError)를 그대로 발생
+    """
     flag = "Start"
     start = time.time()
 
@@ -19,8 +25,13 @@ def single_run():
     try:
         # 실행
         flag = "news scraper"
-        success = scraper_news.main()
+        with deadline.scope(get_timeout_seconds(), name="news batch"):
+            success = scraper_news.main()
 
+    # 배치 예산 초과 시 > main에서 timeout으로 처리
+    except deadline.DeadlineExceeded:
+        worker.record(errors=1)
+        raise
 
     # 에러 발생 시
     except Exception as e:
@@ -28,6 +39,7 @@ def single_run():
         error_traceback = traceback.format_exc()
 
         # TODO: 에러 로깅
+        worker.record(errors=1)
 
         # 에러 출력
         print("-" * 60)
@@ -36,8 +48,8 @@ def single_run():
         print(error_traceback)
         print("-" * 60)
 
-        # 에러 발생 시 10초 sleep
-        time.sleep(10)
+        # 에러 발생 시 10초 sleep (종료 요청 시 바로 반환)
+        shutdown.wait(10)
 
         return False
 
@@ -56,13 +68,16 @@ def single_run():
 
 
 def main():
-    """timeout 핸들링하여 반복 실행"""
+    """timeout 핸들링하여 반복 실행 (SIGTERM을 받으면 진행 중인 배치를 저장하고 종료)"""
     # TODO: 수집 시작 시 로깅
+    shutdown.install()
+    # info.workers에 등록, heartbeat 시작 (종료된 컨테이너의 선점은 run_reaper.py가 해제함)
+    worker.start_worker("news")
 
     # 반복실행
     n = 1
     timeout_i = 1
-    while True:
+    while not shutdown.is_requested():
         try:
             print(f"> {n}th run")
             single_run()
@@ -75,6 +90,9 @@ def main():
             print("-" * 60)
             timeout_i += 1
 
+    archive.close_archive()  # 아카이브에 모아둔 페이지 저장
+    worker.stop_worker()
+    print("> Shutdown")
 
 
 if __name__ == "__main__":
@@ -5,10 +5,14 @@ import time
 from queue_date_pages import main as queue_date_pages
 from queue_news import main as queue_news
 
-from utils import utils, timeout
+from utils import utils, deadline, worker, shutdown
 from db import psql
 
 
+# 날짜 하나(queue.news 추가)에 허용하는 시간(초) 기본값 (info.config의 queue_date_timeout으로 덮어씀)
+QUEUE_DATE_TIMEOUT = 600
+
+
 def single_run():
     """단일 실행, 예외처리 포함"""
     flag = "Start"
@@ -33,7 +37,10 @@ def single_run():
         # 3) queue_news 단일 실행 (date_pages에서 하나만 무작위로 가져와서 실행하는 것)
         print("> Start queue news - single date_page")
         flag = "queue.news"
-        success = queue_news.main()
+        # 날짜 하나의 예산 (선점 lease가 만료되기 전에 끝나도록, 목록 페이지 요청을 시작할 때마다 확인)
+        queue_date_timeout = utils.get_config("queue_date_timeout", set_int=True, default=QUEUE_DATE_TIMEOUT)
+        with deadline.scope(queue_date_timeout, name="queue date"):
+            success = queue_news.main()
 
     # 에러 발생 시
     except Exception as e:
@@ -41,6 +48,7 @@ def single_run():
         error_traceback = traceback.format_exc()
 
         # TODO: 에러 로깅
+        worker.record(errors=1)
 
         # 에러 출력
         print("-" * 60)
@@ -65,18 +73,24 @@ def single_run():
 
 
 def main():
-    """반복하여 실행"""
+    """반복하여 실행 (SIGTERM을 받으면 진행 중인 날짜를 마치고 종료)"""
     # TODO: 수집 시작 시 로깅
+    shutdown.install()
+    # info.workers에 등록, heartbeat 시작 (종료된 컨테이너의 선점은 run_reaper.py가 해제함)
+    worker.start_worker("queue")
 
     # 반복실행
     n = 1
-    while True:
+    while not shutdown.is_requested():
         print(f"> {n}th run")
         single_run()
-        time.sleep(5) # 5초 슬립하면서 실행
+        shutdown.wait(5) # 5초 슬립하면서 실행 (종료 요청 시 바로 반환)
         n += 1
         print("#" * 40)
 
+    worker.stop_worker()
+    print("> Shutdown")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
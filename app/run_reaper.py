@@ -0,0 +1,45 @@
+import traceback
+import time
+
+from utils import utils, worker
+
+
+# reaper 실행 주기(초)
+REAP_INTERVAL = 30
+
+
+
+def single_run():
+    """단일 실행, 예외처리 포함"""
+    try:
+        dead_ids, released = worker.reap_dead_workers()
+
+    # 에러 발생 시
+    except Exception as e:
+        print("-" * 60)
+        print("Error on - reaper")
+        print("-" * 30)
+        print(traceback.format_exc())
+        print("-" * 60)
+        return False
+
+    # 정상 종료 시
+    if dead_ids:
+        print(f"> dead workers: {', '.join(dead_ids)} / released claims: {released} / {utils.get_kst_datetime()}")
+    return True
+
+
+
+def main():
+    """heartbeat가 끊긴 컨테이너를 찾아 선점한 큐를 해제하는 것을 반복 실행
+    - 하나만 실행하면 됨 (여러개 실행해도 같은 행을 중복 처리하지 않음)
+    """
+    print("> Start reaper")
+    while True:
+        single_run()
+        time.sleep(REAP_INTERVAL)
+
+
+
+if __name__ == "__main__":
+    main()
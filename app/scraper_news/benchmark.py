@@ -0,0 +1,187 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import glob
+import time
+import argparse
+
+from charset_normalizer import from_bytes
+
+from scraper_news import news_content_scraper
+from utils import cpu, decoding, parse_pool, extraction, transport
+
+
+# 저장해 둔 기사 페이지로 파싱 방식별 속도와 결과를 비교하는 벤치마크
+# eg. (app 디렉토리에서) python -m scraper_news.benchmark ./pages -n 5
+# - 페이지는 기사 url의 응답 본문을 그대로 저장한 파일 (eg. curl -o ./pages/015_0004900000.html 기사url)
+# - --processes로 파싱 프로세스 수별 처리량도 비교 (eg. --processes 1 2 4, 컨테이너의 CPU 할당량 이상은 의미 없음)
+
+
+
+def detect_text(content):
+    """requests의 response.text에서 charset 헤더가 없을 때처럼 본문 전체로 인코딩을 검사해 디코딩 (비교용)"""
+    return str(content, from_bytes(content).best().encoding)
+
+
+def stream_extract(content, chunk_size=transport.STREAM_CHUNK_SIZE):
+    """NewsStream처럼 본문을 chunk_size씩 파싱하다가 #contents가 닫히면 멈춤 (UTF-8 페이지 기준)
+
+    Returns:
+        dict: 수집한 정보들의 딕셔너리
+        int: 파서에 넘긴 바이트 수
+    """
+    stream = extraction.StreamingExtraction(news_content_scraper.NEWS_SPEC, news_content_scraper.STREAM_STOP_IDS, tag="div", encoding="utf-8")
+    for i in range(0, len(content), chunk_size):
+        if stream.feed(content[i:i + chunk_size]):
+            break
+    return stream.extract(), stream.bytes_fed
+
+
+def get_parsers():
+    """비교할 파싱 함수 {이름: function(본문 bytes) > dict} (첫번째가 기준)
+    - DB 접속 없이 파싱만 하도록 __init__을 거치지 않은 NewsContentScraper를 사용
+    - 디코딩도 시간에 포함함 (text: response.text처럼 str로 디코딩 후 파싱 / bytes: decoding.resolve_encoding 후 bytes 그대로 파싱)
+    - lxml_stream: 본문을 받는 대로 파싱하다가 필드를 모두 찾으면 멈추는 방식 (news_stream_parse, 받지 않은 부분은 파싱하지 않음)
+    """
+    scraper = object.__new__(news_content_scraper.NewsContentScraper)
+    stats = decoding.DecodeStats()  # 벤치마크는 공용 통계에 기록하지 않음
+    content_type = "text/html; charset=UTF-8"
+    return {
+        "bs4 (text)": lambda content: scraper.parse_news_content_bs4(content.decode("utf-8")),
+        "lxml_spec (detect)": lambda content: scraper.parse_news_content(detect_text(content)),
+        "lxml_spec (text)": lambda content: scraper.parse_news_content(content.decode("utf-8")),
+        "lxml_spec (bytes)": lambda content: scraper.parse_news_content(content, decoding.resolve_encoding(content, content_type, stats=stats)[0]),
+        "lxml_stream (bytes)": lambda content: stream_extract(content)[0],
+    }
+
+
+def load_pages(paths):
+    """html 파일(또는 html 파일이 있는 디렉토리) 경로들에서 페이지를 읽는다
+
+    Returns:
+        list: [(파일명, 본문 bytes), ...]
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.html"))))
+        else:
+            files.append(path)
+
+    pages = []
+    for file in files:
+        with open(file, "rb") as f:
+            pages.append((os.path.basename(file), f.read()))
+    return pages
+
+
+def run_benchmark(pages, parsers, repeat=3):
+    """파싱 함수별로 모든 페이지를 repeat번 파싱한 시간을 재고, 기준 함수와 결과가 다른 페이지를 찾는다
+
+    Args:
+        pages(list): load_pages의 반환값
+        parsers(dict): get_parsers의 반환값
+        repeat(int): 반복 횟수 (가장 빠른 회차 사용)
+
+    Returns:
+        dict: {이름: {"seconds": 전체 페이지 1회 파싱 시간(초), "mismatches": [(파일명, 필드명), ...]}}
+    """
+    names = list(parsers)
+    expected = {name: parsers[names[0]](html) for name, html in pages}
+
+    results = {}
+    for parser_name, parse in parsers.items():
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _, html in pages:
+                parse(html)
+            best = min(best, time.perf_counter() - start)
+
+        mismatches = []
+        for page_name, html in pages:
+            output = parse(html)
+            for field in expected[page_name].keys() | output.keys():
+                if expected[page_name].get(field) != output.get(field):
+                    mismatches.append((page_name, field))
+        results[parser_name] = {"seconds": best, "mismatches": mismatches}
+    return results
+
+
+def run_pool_benchmark(pages, processes, repeat=3, copies=10):
+    """ParsePool의 프로세스 수별로 페이지들(copies번 복제)을 한번에 파싱하는 처리량을 잰다
+
+    Args:
+        pages(list): load_pages의 반환값
+        processes(list): 비교할 프로세스 수 리스트
+        repeat(int): 반복 횟수 (가장 빠른 회차 사용)
+        copies(int): 프로세스에 나눌 만큼 작업량을 늘리기 위해 페이지를 복제하는 횟수
+
+    Returns:
+        dict: {프로세스 수: 초당 파싱한 페이지 수}
+    """
+    contents = [content for _, content in pages] * copies
+    content_types = ["text/html; charset=UTF-8"] * len(contents)
+
+    results = {}
+    for n in processes:
+        pool = parse_pool.ParsePool(n)
+        try:
+            pool.map(news_content_scraper.parse_news_body, contents[:n], content_types[:n])  # 프로세스 시작 (측정 제외)
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                pool.map(news_content_scraper.parse_news_body, contents, content_types)
+                best = min(best, time.perf_counter() - start)
+        finally:
+            pool.close()
+        results[n] = len(contents) / best
+    return results
+
+
+def print_results(pages, parsers, results, repeat):
+    """run_benchmark 결과 출력 (파싱 함수별 페이지당 시간, 기준 대비 속도, 결과가 다른 페이지)"""
+    base_seconds = results[list(parsers)[0]]["seconds"]
+
+    print(f"## pages: {len(pages)} / {sum(len(content) for _, content in pages) / 1024:.0f}KB / repeat: {repeat}")
+    for name, result in results.items():
+        per_page_ms = result["seconds"] / len(pages) * 1000
+        speedup = base_seconds / result["seconds"] if result["seconds"] else 0
+        print(f"{name:>22}: {per_page_ms:8.2f}ms/page / x{speedup:.1f} / mismatches: {len(result['mismatches'])}")
+        for page_name, field in result["mismatches"][:10]:
+            print(f"{'':>24}- {page_name}: {field}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="기사 페이지 파싱 벤치마크")
+    parser.add_argument("paths", nargs="+", help="저장한 기사 html 파일 또는 디렉토리")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="반복 횟수 (가장 빠른 회차 사용)")
+    parser.add_argument("--processes", type=int, nargs="*", help="처리량을 비교할 파싱 프로세스 수들 (eg. --processes 1 2 4)")
+    args = parser.parse_args()
+
+    pages = load_pages(args.paths)
+    if not pages:
+        print("## no pages")
+        return
+
+    parsers = get_parsers()
+    results = run_benchmark(pages, parsers, args.repeat)
+    print_results(pages, parsers, results, args.repeat)
+
+    fed = sum(stream_extract(content)[1] for _, content in pages)
+    print(f"## stream: {fed / sum(len(content) for _, content in pages) * 100:.0f}% of bytes parsed "
+          f"(stop at #{', #'.join(news_content_scraper.STREAM_STOP_IDS)}, chunk {transport.STREAM_CHUNK_SIZE // 1024}KB)")
+
+    if args.processes:
+        print(f"## parse pool / usable cpus: {cpu.get_cpu_count()}")
+        base = None
+        for n, pages_per_second in run_pool_benchmark(pages, args.processes, args.repeat).items():
+            base = base or pages_per_second
+            print(f"{n:>20} proc: {pages_per_second:8.0f} pages/s / x{pages_per_second / base:.1f}")
+
+
+
+if __name__ == "__main__":
+    main()
@@ -6,16 +6,28 @@ sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 import time
 import datetime
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 
 from scraper_news import news_content_scraper
-from db import psql
-from utils import utils
+from db import psql, shard, backlog
+from utils import utils, transport, worker, shutdown, decoding, archive
+
+
+# 수집한 기사를 중간 저장하는 단위 기본값 (info.config의 news_flush_size로 덮어씀)
+NEWS_FLUSH_SIZE = 10
+NEWS_SAVE_TIMEOUT = 60  # 저장 쿼리 하나에 허용하는 시간(초) 기본값 (info.config의 news_save_timeout으로 덮어씀)
+
+# data.news_{year}에 저장하는 컬럼 (save_news의 데이터 순서)
+NEWS_COLUMNS = ["news_year_id", "news_id", "sid1", "sid2", "date", "page_url", "scraped",
+                "press", "title", "input_date", "modify_date", "writer", "content", "categories"]
 
 
 
 def get_not_collected_count(year):
     """해당 연도에 수집되지 않은 뉴스의 개수를 반환한다.
+    - COUNT(*) 대신 큐 추가/수집 완료 시 함께 갱신되는 queue.backlog에서 조회함
 
     Args:
         year(int): 대상 큐의 연도
@@ -23,38 +35,54 @@ def get_not_collected_count(year):
     Returns:
         int: 수집되지 않은 뉴스의 개수
     """
-    query = f"SELECT COUNT(*) FROM queue.news_{year} WHERE is_scraped = %s;"
-    raw = psql.query_select(query, (False,), fetchone=True)
-    not_collected_count = raw[0]
+    not_collected_count = backlog.get_unscraped_count(year)
     return not_collected_count
 
 
 
-def get_news_to_collect(year, size_n=100):
-    """아직 수집 되지 않은 채 queue에 있는 기사의 정보를 가져와서 반환한다.
-    # MEMO: 여러개 가져올 수 있도록 size_n으로 대응함, 랜덤으로 가져옴
-
+def get_news_to_collect(year, size_n=100, worker_id=None, lease_seconds=None):
+    """아직 수집 되지 않은 채 queue에 있는 기사를 size_n개 선점(claim)하여 반환한다
+    - FOR UPDATE SKIP LOCKED로 다른 컨테이너가 잠근 행은 건너뛰므로, 동시에 실행해도 같은 기사를 가져가지 않음
+    - 선점한 행은 claimed_by, lease_expires가 설정되고, lease_expires가 지나면 다시 수집 대상이 됨
+      (수집 도중 컨테이너가 종료된 경우 자동으로 큐에 반환됨)
+    - 미수집 부분 인덱스(news_{year}_to_scrape_idx) 순서로 가져오므로 전체 정렬이 없음
 
     Args:
-        year(int): 큐를 가져올 
-        size_n(int): 한번에 가져올 큐의 | default: 100
-    
+        year(int): 큐를 가져올 연도
+        size_n(int): 한번에 가져올 큐의 수 | default: 100
+        worker_id(str): 선점하는 컨테이너 아이디 | default: None (utils.get_worker_id())
+        lease_seconds(int): 선점 유지 시간(초) | default: None (info.config의 news_lease_seconds)
+
     Returns:
         list: list(tuple) in list 형태의 기사 정보
             [(news_year_id, news_id, sid1, sid2, date, url), ...]
             큐에 내용이 없을 경우 빈 리스트 반환 (if문으로 처리 예정)
         
     """
-    # is_scraped = False & news_id가 null이 아닌 큐 중 랜덤으로 정렬 후 n개 가져오는
+    worker_id = worker_id or utils.get_worker_id()
+    if lease_seconds is None:
+        lease_seconds = utils.get_config("news_lease_seconds", set_int=True, default=600)
+
+    # is_scraped = False & news_id가 null이 아니고 선점되지 않은(또는 선점이 만료된) 큐 n개를 잠그고 선점
     query = f"""
-    SELECT news_year_id, news_id, sid1, sid2, date, url FROM queue.news_{year}
-        WHERE is_scraped = %s AND news_id IS NOT NULL
-        ORDER BY RANDOM() LIMIT %s;"""
-    queue_info = psql.query_select(query, (False, size_n))
+    WITH claimable AS (
+        SELECT news_year_id FROM queue.news_{year}
+            WHERE is_scraped = false AND news_id IS NOT NULL
+                AND (lease_expires IS NULL OR lease_expires < now())
+            ORDER BY news_year_id LIMIT %s
+            FOR UPDATE SKIP LOCKED
+    )
+    UPDATE queue.news_{year} AS q
+        SET claimed_by = %s, lease_expires = now() + make_interval(secs => %s)
+        FROM claimable WHERE q.news_year_id = claimable.news_year_id
+        RETURNING q.news_year_id, q.news_id, q.sid1, q.sid2, q.date, q.url;"""
+    with psql.transaction(shard.get_shard(year)) as cur:
+        cur.execute(query, (size_n, worker_id, lease_seconds))
+        queue_info = cur.fetchall()
 
     if queue_info:
         # 큐가 존재할 경우
-        return queue_info  # [(news_year_id, news_id, sid1, sid2, date, url), ...]
+        return sorted(queue_info)  # [(news_year_id, news_id, sid1, sid2, date, url), ...]
     
     else:
         # 큐에 수집할 내용이 없을 경우
@@ -62,6 +90,26 @@ def get_news_to_collect(year, size_n=100):
 
 
 
+def release_news(year, news_year_ids, worker_id=None):
+    """선점한 큐를 수집하지 못한 경우 선점을 해제하여 바로 다른 컨테이너가 가져갈 수 있도록 한다
+    - 해당 worker_id가 선점 중인 행만 해제함 (만료 후 다른 컨테이너가 다시 선점한 행은 건드리지 않음)
+
+    Args:
+        year(int): 큐의 연도
+        news_year_ids(list): 해제할 news_year_id 리스트
+        worker_id(str): 선점한 컨테이너 아이디 | default: None (utils.get_worker_id())
+    """
+    if not news_year_ids:
+        return
+    worker_id = worker_id or utils.get_worker_id()
+
+    query = f"""
+    UPDATE queue.news_{year} SET claimed_by = NULL, lease_expires = NULL
+        WHERE news_year_id IN %s AND claimed_by = %s AND is_scraped = false;"""
+    psql.query_execute(query, (tuple(news_year_ids), worker_id), target_db=shard.get_shard(year))
+
+
+
 def save_news(year, news_datas):
     """수집한 뉴스 데이터를 저장한다
 
@@ -78,73 +126,114 @@ def save_news(year, news_datas):
         
     Returns:
         list: news_year_id 전체 리스트
-        list: 저장 대상 news_year_id 리스트
+        list: 저장 대상 news_year_id 리스트 (이미 다른 컨테이너가 수집한 뉴스 제외)
 
     """
-    # 1) 이미 수집된 news_year_id는 제외하기
+    target_db = shard.get_shard(year)  # 해당 연도의 테이블이 있는 DB
     news_year_ids = [news_data['news_year_id'] for news_data in news_datas]
-    query = f"SELECT news_year_id, is_scraped FROM queue.news_{year} WHERE news_year_id IN %s;"
-    raw = psql.query_select(query, (tuple(news_year_ids),))
-    collected_news_year_ids = [news_year_id for news_year_id, is_scraped in raw if is_scraped]
-    target_news_year_ids = [news_year_id for news_year_id, is_scraped in raw if not is_scraped]
 
-    # 2) 쿼리용 데이터 준비
-    # 뉴스 저장용 쿼리 데이터 준비
+    # 1) 쿼리용 데이터 준비
     news_datas_to_db = []
-    queue_datas_to_db = []
     for news in news_datas:
-        if news['news_year_id'] not in collected_news_year_ids:
-            # 뉴스 저장용 쿼리 데이터
-            data = (
-                news["news_year_id"], news["news_id"], news["sid1"], news["sid2"], news["date"], news["page_url"], news["kst_now"],
-                news["press"], news["title"], news["input"], news["modify"], news["writer"], news["content"], news["categories"]
-            )
-            news_datas_to_db.append(data)
-
-            # 큐 업데이트용 쿼리 데이터
-            data = (True, news["kst_now"], news["news_year_id"])
-            queue_datas_to_db.append(data)
-
-
-    # 3) 예외처리(롤백 사용하여 데이터 insert, update)
-    # 쿼리 실행 (예외처리(롤백) 적용)
-    error_flag = True 
-    try:
-        # 수집한 뉴스 저장
-        query = f"""INSERT INTO data.news_{year} (news_year_id, news_id, sid1, sid2, date, page_url, scraped, press, title, input_date, modify_date, writer, content, categories) 
-                                          VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);"""
-        psql.query_executemany(query, news_datas_to_db)
-
-        # 큐에서 수집한 뉴스들 is_scraped로 변경
-        query = f"UPDATE queue.news_{year} SET is_scraped = %s, scraped = %s WHERE news_year_id = %s;"
-        psql.query_executemany(query, queue_datas_to_db)
+        data = (
+            news["news_year_id"], news["news_id"], news["sid1"], news["sid2"], news["date"], news["page_url"], news["kst_now"],
+            news["press"], news["title"], news["input"], news["modify"], news["writer"], news["content"], news["categories"]
+        )
+        news_datas_to_db.append(data)
+
+    # 2) 단일 트랜잭션으로 저장 (에러 발생 시 전체 롤백 후 에러는 그대로 발생 > 에러는 run에서 한번에 처리)
+    # 저장은 배치 예산(Deadline)으로 중단하지 않고, 쿼리마다 statement_timeout으로 DB에서 취소 (멈춘 DB가 컨테이너를 막지 않도록)
+    save_timeout = utils.get_config("news_save_timeout", set_int=True, default=NEWS_SAVE_TIMEOUT)
+    with psql.transaction(target_db) as cur:
+        cur.execute("SET LOCAL statement_timeout = %s;", (save_timeout * 1000,))
+        # 스테이징 테이블에 COPY로 한번에 넣기 (커밋/롤백 시 삭제됨)
+        cur.execute(f"CREATE TEMP TABLE news_stage (LIKE data.news_{year}) ON COMMIT DROP;")
+        psql.copy_rows(cur, "news_stage", NEWS_COLUMNS, news_datas_to_db)
+
+        # 큐에서 아직 수집되지 않은 뉴스들만 is_scraped로 변경 & 미수집 개수(queue.backlog) 차감
+        # - 큐 행을 잠그므로, 다른 컨테이너가 같은 뉴스를 동시에 저장해도 한쪽만 저장됨
+        target_news_year_ids = backlog.set_scraped_from(cur, year, "news_stage")
+
+        # 수집 완료 처리된 뉴스만 저장
+        columns = ", ".join(NEWS_COLUMNS)
+        query = f"""
+        INSERT INTO data.news_{year} ({columns})
+            SELECT {columns} FROM news_stage WHERE news_year_id = ANY(%s);"""
+        cur.execute(query, (target_news_year_ids,))
 
         # TODO: 수집 완료 로깅하기
-
-        
-        # 에러 없이 종료된 경우 flag 설정
-        error_flag = False  
-        
-    finally:
-        # error_flag가 True일 경우에만 롤백 작업을 실시함
-        # try-except가 아니라 try-finally로 구현하여 에러는 그대로 발생시킨 채로 롤백만 실행함 > 에러는 run에서 한번에 처리
-        if error_flag:
-            # 데이터 롤백(삭제)
-            query = f"DELETE FROM data.news_{year} WHERE news_year_id = %s;"
-            query_datas = [(news_year_id,) for news_year_id in target_news_year_ids]
-            psql.query_executemany(query, query_datas)
-            
-            # 큐 롤백(False로 업데이트)
-            query = f"UPDATE queue.news_{year} SET is_scraped = %s WHERE news_year_id = %s;"
-            query_datas = [(False, news_year_id,) for news_year_id in target_news_year_ids]
-            psql.query_executemany(query, query_datas)
-
-            # TODO: 롤백 시 로깅하기
     
     return news_year_ids, target_news_year_ids
 
 
 
+class NewsWriter():
+    """수집이 끝난 기사를 배치가 끝나기를 기다리지 않고 flush_size개씩 저장하는 객체 (중간 저장)
+    - 저장은 별도 스레드 하나에서 순서대로 실행하므로 수집(이벤트 루프)을 막지 않음
+    - 배치 도중 timeout, 에러, 종료 요청이 발생해도 이미 수집한 기사는 close()로 저장되어 다시 수집하지 않음
+
+    Attributes:
+        year(int): 저장할 연도
+        flush_size(int): 한번에 저장할 기사 수
+        saved_news_year_ids(list): 저장된 news_year_id 리스트 (close 이후 확정)
+    """
+
+    def __init__(self, year, flush_size=None):
+        """
+        Args:
+            year(int): 저장할 연도
+            flush_size(int): 한번에 저장할 기사 수 | Default: None (info.config의 news_flush_size)
+        """
+        self.year = year
+        if flush_size is None:
+            flush_size = utils.get_config("news_flush_size", set_int=True, default=NEWS_FLUSH_SIZE)
+        self.flush_size = max(1, flush_size)
+        self.saved_news_year_ids = []
+        self._buffer = []
+        self._futures = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="news-writer")
+
+
+    def _submit(self):
+        # self._lock 안에서 호출
+        if self._buffer:
+            self._futures.append(self._executor.submit(save_news, self.year, self._buffer))
+            self._buffer = []
+
+
+    def add(self, news_data):
+        """수집한 기사 하나를 추가 (flush_size개가 모이면 저장 시작)"""
+        with self._lock:
+            self._buffer.append(news_data)
+            if len(self._buffer) >= self.flush_size:
+                self._submit()
+
+
+    def close(self):
+        """남은 기사를 저장하고 모든 저장이 끝날 때까지 기다린다 (저장 중 에러가 있었으면 모두 끝난 뒤 첫 에러를 발생)
+
+        Returns:
+            list: 저장된 news_year_id 리스트
+        """
+        with self._lock:
+            self._submit()
+            futures, self._futures = self._futures, []
+
+        error = None
+        for future in futures:
+            try:
+                _, saved_news_year_ids = future.result()
+                self.saved_news_year_ids.extend(saved_news_year_ids)
+            except Exception as e:
+                error = error or e
+        self._executor.shutdown()
+
+        if error is not None:
+            raise error
+        return self.saved_news_year_ids
+
+
 
 def main():
     """뉴스 데이터 수집 실행
@@ -157,14 +246,10 @@ def main():
     years = utils.get_years()
     print(f">> Start scraping news / batch: {batch_size}")
 
-    # 2) year 내림차순으로 내려오며 수집 대상 큐 남아있는 연도 체크
-    target_year = False
-    for year in years:
-        to_collect_count = get_not_collected_count(year)
-        print(f">> {year}'s not collected count = {to_collect_count}")
-        if to_collect_count > 0:
-            target_year = year  # 수집 대상 연도 설정 (count가 1이상 남아있는 경우)
-            break
+    # 2) 미수집 큐가 남아있는 가장 최근 연도 (queue.backlog 조회)
+    target_year = backlog.get_target_year(years)
+    if target_year:
+        print(f">> {target_year}'s not collected count = {get_not_collected_count(target_year)}")
     print(f">> Target year: {target_year}")
     
     # 모든 연도의 큐에서 미수집 뉴스가 없을 경우 > 종료
@@ -172,17 +257,50 @@ def main():
         print(">> All queue scraped")
         return False
 
-    # 3) 큐에서 정보 가져오기
+    # 3) 큐에서 정보 가져오기 (종료 요청을 받았으면 새로 선점하지 않음)
+    if shutdown.is_requested():
+        print(">> Shutdown requested - skip claiming")
+        return False
     queue_info = get_news_to_collect(target_year, batch_size)
 
-    # 4) 뉴스 데이터 수집
-    news = news_content_scraper.NewsContentScraper()
-    news_datas = news.collect_news(queue_info)
-    print(">> Scraped")
-
-    # 5) DB에 저장 & 로깅
-    save_news(target_year, news_datas)
-    print(">> Saved")
+    # 개수는 복제본에서 조회하므로, 그 사이에 다른 컨테이너가 모두 가져갔을 수 있음
+    if not queue_info:
+        print(f">> No queue to collect in {target_year}")
+        return True
 
+    # 4) 뉴스 데이터 수집 & 5) DB에 저장 & 로깅
+    # 수집이 끝난 기사는 NewsWriter로 news_flush_size개씩 바로 저장 (배치 도중 실패해도 수집한 기사는 남음)
+    # 에러(timeout 포함) 발생 시 저장하지 못한 기사의 선점을 해제하여 lease 만료를 기다리지 않고 다시 수집되도록 함
+    writer = NewsWriter(target_year)
+    try:
+        news = news_content_scraper.NewsContentScraper()
+        news.collect_news(queue_info, on_collected=writer.add)
+        print(">> Scraped")
+        print(f">> transport - {transport.shared_stats.summary(reset=True)}")
+        print(f">> decoding - {decoding.shared_stats.summary(reset=True)}")
+        if news_content_scraper.shared_stream_stats.articles:
+            print(f">> stream - {news_content_scraper.shared_stream_stats.summary(reset=True)}")
+        page_archive = archive.get_archive()
+        if page_archive is not None:
+            page_archive.flush()  # 배치에서 받은 페이지는 배치가 끝나면 저장
+            print(f">> archive - {page_archive.summary(reset=True)}")
+
+        saved_news_year_ids = writer.close()
+        print(f">> Saved {len(saved_news_year_ids)} / {len(queue_info)}")
+    except BaseException:
+        try:
+            saved_news_year_ids = writer.close()
+            print(f">> Saved before error {len(saved_news_year_ids)} / {len(queue_info)}")
+            worker.record(len(saved_news_year_ids), target=target_year)
+        except Exception as e:
+            print(f">> Save before error failed - {e}")
+        release_news(target_year, [info[0] for info in queue_info])  # 저장된(is_scraped) 기사는 해제 대상에서 제외됨
+        raise
+
+    # 종료 요청으로 수집하지 않은 기사는 바로 반환
+    if len(saved_news_year_ids) < len(queue_info):
+        release_news(target_year, [info[0] for info in queue_info])
+
+    worker.record(len(saved_news_year_ids), target=target_year)
     return True
 
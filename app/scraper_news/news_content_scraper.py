@@ -4,13 +4,220 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 
 import time
+import codecs
+import asyncio
 import datetime
+import threading
+from urllib.parse import urlsplit
 
-import requests
 from tqdm import tqdm
 from bs4 import BeautifulSoup
 from db import psql
-from utils import utils
+from utils import utils, transport, shutdown, deadline, extraction, decoding, parse_pool, archive
+
+
+# 호스트별 동시 요청 수 기본값 (info.config의 news_host_concurrency로 덮어씀)
+NEWS_HOST_CONCURRENCY = 10
+# 기사 본문을 받는 대로 파싱하다가 필드를 모두 찾으면 나머지를 받지 않을지 여부 기본값 (info.config의 news_stream_parse로 덮어씀)
+NEWS_STREAM_PARSE = 0
+
+
+def _parse_datetime(sdate):
+    """기사 페이지의 "%Y-%m-%d %H:%M:%S" 문자열을 datetime으로 변환 (빈 문자열은 None)"""
+    if sdate:
+        return datetime.datetime.strptime(sdate, "%Y-%m-%d %H:%M:%S")
+    return None
+
+
+# 기사 페이지에서 수집하는 필드 (필드명, CSS 선택자, attribute, 전체 여부, 후처리 함수)
+# - parse_news_content_bs4의 선택자와 같으며, import 시 한번만 XPath로 컴파일함
+NEWS_FIELDS = [
+    ("press", "#ct > div.media_end_head.go_trans > div.media_end_head_top > a > img.media_end_head_top_logo_img.light_type", "title", False, None),  # 언론사
+    ("title", "#ct > div.media_end_head.go_trans > div.media_end_head_title", "text", False, None),  # 제목
+    ("input", "#ct > div.media_end_head.go_trans > div.media_end_head_info.nv_notrans > div.media_end_head_info_datestamp > div:nth-child(1) > span", "data-date-time", False, _parse_datetime),  # 입력시간
+    ("modify", "#ct > div.media_end_head.go_trans > div.media_end_head_info.nv_notrans > div.media_end_head_info_datestamp > div:nth-child(2) > span", "data-modify-date-time", False, _parse_datetime),  # 수정시간 (없을 수 있음)
+    ("writer", "#contents > div.byline > p > span", "text", False, None),  # 기자 (없을 수 있음)
+    ("content", "#dic_area", "text", False, None),  # 본문
+    ("categories", "em.media_end_categorize_item", "text", True, None),  # 언론사에서 분류한 카테고리 (리스트)
+]
+NEWS_SPEC = extraction.ExtractionSpec(NEWS_FIELDS)
+
+
+def parse_news_body(content, content_type=None, host=None):
+    """NewsContentScraper.parse_response의 모듈 함수 버전 (파싱 프로세스(parse_pool.ParsePool)에서 실행하기 위함)
+    - 인코딩 판단(UTF-8 검증, 선언이 없으면 charset_normalizer)도 본문 전체를 보므로 파싱 프로세스에서 함
+
+    Args:
+        content(bytes): 응답 본문
+        content_type(str): Content-Type 헤더 | Default: None
+        host(str): 응답 호스트 | Default: None
+
+    Returns:
+        dict: 수집한 정보들의 딕셔너리 (NewsContentScraper.scrape_news_content 참고)
+        str: 인코딩을 정한 방법 (부모 프로세스의 decoding.shared_stats에 기록하기 위함)
+    """
+    encoding, method = decoding.resolve_encoding(content, content_type, host, stats=decoding.DecodeStats())
+    return NEWS_SPEC.extract(content, encoding), method
+
+
+
+# 본문을 받는 대로 파싱할 때(NewsStream) 이 element들이 닫히면 나머지(댓글 영역, 하단 스크립트 등)는 받지 않음
+# - NEWS_FIELDS는 모두 #ct의 헤더와 #contents(#dic_area, byline, 카테고리) 안에 있으므로 #contents가 닫히면 충분함
+STREAM_STOP_IDS = ("contents",)
+
+
+
+class StreamStats():
+    """NewsStream으로 수집한 기사들의 받은 바이트, 파싱 시간 통계 (스레드 안전)
+
+    Attributes:
+        articles(int): 기사 수
+        stopped(int): 본문을 끝까지 받기 전에 멈춘 기사 수
+        bytes(int): 받은 바이트 수 (압축 해제 후)
+        parse_seconds(float): 파싱에 걸린 누적 시간(초)
+        estimated(int): 파싱 시간 절약을 추정할 수 있었던 기사 수 (Content-Length가 있는 응답)
+        saved_seconds(float): 받지 않은 부분을 파싱하는 데 걸렸을 시간의 추정치(초)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+
+    def reset(self):
+        self.articles = self.stopped = self.bytes = self.estimated = 0
+        self.parse_seconds = self.saved_seconds = 0.0
+
+
+    def record(self, report):
+        """기사 하나의 결과(NewsStream.report)를 기록"""
+        with self._lock:
+            self.articles += 1
+            self.stopped += report["stopped"]
+            self.bytes += report["bytes"]
+            self.parse_seconds += report["parse_ms"] / 1000
+            if report["saved_ms"] is not None:
+                self.estimated += 1
+                self.saved_seconds += report["saved_ms"] / 1000
+
+
+    def summary(self, reset=False):
+        """출력용 한 줄 요약 (기사당 평균)"""
+        with self._lock:
+            n = self.articles or 1
+            line = (f"{self.articles} articles / stopped {self.stopped} / avg {self.bytes / n / 1024:.0f}KB received "
+                    f"/ parse {self.parse_seconds / n * 1000:.1f}ms")
+            if self.estimated:
+                line += f" / saved ~{self.saved_seconds / self.estimated * 1000:.1f}ms ({self.estimated} estimated)"
+            if reset:
+                self.reset()
+        return line
+
+
+# 프로세스 공용 통계
+shared_stream_stats = StreamStats()
+
+
+
+def _wire_bytes(response):
+    """응답에서 지금까지 받은(압축된 상태의) 바이트 수 (httpx.Response or requests.Response)"""
+    if hasattr(response, "num_bytes_downloaded"):
+        return response.num_bytes_downloaded
+    return response.raw.tell()
+
+
+
+class NewsStream():
+    """기사 페이지 하나의 본문을 받는 대로 파싱하는 객체 (feed를 transport의 get_streamed에 on_chunk로 넘김)
+    - 헤더(와 호스트)로 인코딩이 정해지면 StreamingExtraction으로 파싱하다가 STREAM_STOP_IDS가 닫히면 요청을 멈춤
+    - 본문이 선언된 인코딩과 맞지 않거나 선언이 없으면 끝까지 받아서 parse_response와 같은 방식으로 파싱함
+    - 파싱은 chunk를 받는 스레드(이벤트 루프 포함)에서 실행됨 (parse_pool을 사용하지 않음)
+
+    Attributes:
+        report(dict): finish 이후 기사 하나의 결과
+            {"bytes": 받은 바이트(압축 해제 후), "stopped": 중간에 멈췄는지(bool), "parse_ms": 파싱 시간(ms),
+             "saved_ms": 받지 않은 부분의 파싱 시간 추정치(ms, Content-Length를 모르면 None)}
+    """
+
+    def __init__(self):
+        self.response = None
+        self.report = None
+        self.chunks = []
+
+
+    def _start(self, response):
+        """첫 chunk(또는 fallback으로 다시 요청한 응답의 첫 chunk)에서 헤더로 인코딩을 정하고 파서를 만듦"""
+        self.response = response
+        self.chunks = []
+        self.extraction = None
+        self.host = urlsplit(str(response.url)).netloc
+        encoding, self.method = decoding.resolve_declared_encoding(response.headers.get("content-type"), self.host)
+        if encoding is not None:
+            self._decoder = codecs.getincrementaldecoder(encoding)()  # 본문이 선언된 인코딩과 맞는지 확인
+            self._feed_bytes = encoding == "utf-8"  # UTF-8은 bytes 그대로, 그 외(cp949 등)는 디코딩한 str을 파서에 넘김
+            self.extraction = extraction.StreamingExtraction(NEWS_SPEC, STREAM_STOP_IDS, tag="div",
+                                                             encoding="utf-8" if self._feed_bytes else None)
+
+
+    def feed(self, response, chunk):
+        """본문 일부를 파싱한다 (get_streamed의 on_chunk)
+
+        Returns:
+            bool: 필드를 모두 찾아서 나머지 본문은 받지 않아도 되는지 여부
+        """
+        if response is not self.response:
+            self._start(response)
+        self.chunks.append(chunk)
+        if self.extraction is None:
+            return False
+        try:
+            text = self._decoder.decode(chunk)
+        except UnicodeDecodeError:
+            self.extraction = None  # 선언과 다른 본문 > 끝까지 받아서 기존 방식으로
+            return False
+        return self.extraction.feed(chunk if self._feed_bytes else text)
+
+
+    def finish(self, response, stopped):
+        """받은 본문으로 필드를 추출하고 report를 기록한다
+
+        Args:
+            response: get_streamed가 반환한 응답
+            stopped(bool): get_streamed가 반환한 중간에 멈췄는지 여부
+
+        Returns:
+            dict: 수집한 정보들의 딕셔너리 (NewsContentScraper.scrape_news_content 참고)
+        """
+        if response is not self.response:
+            self._start(response)  # 본문이 없는 응답
+        if self.extraction is not None and not stopped:
+            try:
+                self._decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                self.extraction = None
+
+        if self.extraction is not None:
+            news = self.extraction.extract()
+            parse_seconds = self.extraction.parse_seconds
+            decoding.shared_stats.record(self.method)
+        else:
+            start = time.perf_counter()
+            content = b"".join(self.chunks)
+            encoding, _ = decoding.resolve_encoding(content, response.headers.get("content-type"), self.host)
+            news = NEWS_SPEC.extract(content, encoding)
+            parse_seconds = time.perf_counter() - start
+
+        # 받지 않은 부분의 파싱 시간 = 받은 부분의 파싱 시간 * (받지 않은 바이트 / 받은 바이트) (Content-Length는 압축된 크기)
+        saved_ms = None
+        content_length = response.headers.get("content-length")
+        wire_bytes = _wire_bytes(response)
+        if stopped and content_length and content_length.isdigit() and wire_bytes:
+            saved_ms = parse_seconds * 1000 * max(0, int(content_length) - wire_bytes) / wire_bytes
+
+        self.report = {"bytes": sum(len(chunk) for chunk in self.chunks), "stopped": stopped,
+                       "parse_ms": parse_seconds * 1000, "saved_ms": saved_ms}
+        shared_stream_stats.record(self.report)
+        return news
 
 
 
@@ -27,6 +234,12 @@ class NewsContentScraper():
         get_queue_size: 수집할 기사가 몇개 남았는지 DB에서 검색해 오는 것
         get_news_to_collect: 스크랩되지 않은 뉴스를 n개 가져오는것
         scrape_news_content: 뉴스 하나의 정보를 수집해오는 것
+        parse_response: 응답 객체의 본문(bytes)에서 정보를 수집하는 것 (parse_news_content 사용)
+        parse_news_content: 뉴스 페이지 html 하나에서 정보를 수집하는 것 (요청 없이 파싱만, 컴파일된 NEWS_SPEC 사용)
+        parse_news_content_bs4: parse_news_content의 BeautifulSoup 버전 (결과 비교, 벤치마크용)
+        (NewsStream: news_stream_parse일 때 본문을 받는 대로 파싱하다가 필드를 모두 찾으면 요청을 멈추는 것)
+        make_news_data: 큐 정보와 수집한 정보를 합치는 것
+        collect_news_async: collect_news의 비동기 버전 (동시 요청)
         collect_news: 수집할 기사의 목록을 받아서 모두 수집을 실행하고 수집한 정보를 반환함
         save_news: collect_news에서 수집한 데이터를 db에 저장하는 것
         
@@ -156,9 +369,75 @@ class NewsContentScraper():
                 {press: 언론사(str), title: 제목(str), input: 입력시간(datetime), modify: 수정시간(datetime), 
                  writer: 기자(str), content: 본문(str), categories: 기사 내에서 분류한 카테고리의 명칭(list)}
         """
-        response = requests.get(url, headers={"User-Agent": self.user_agent})
+        headers = {"User-Agent": self.user_agent}
+        if utils.get_config("news_stream_parse", set_int=True, default=NEWS_STREAM_PARSE):
+            # 본문을 받는 대로 파싱하다가 필드를 모두 찾으면 나머지는 받지 않음
+            stream = NewsStream()
+            response, stopped = transport.get_transport().get_streamed(url, stream.feed, headers=headers)
+            news = stream.finish(response, stopped)  # 받은 바이트, 파싱 시간은 shared_stream_stats에 모아 배치마다 출력
+            return response.url, news
+
+        response = transport.get_transport().get(url, headers=headers)
         page_url = response.url  # 리다이렉트된 페이지 url (추후 추가 필터링을 위함)
-        html = response.text
+        news = self.parse_response(response)
+        return page_url, news
+
+
+    def parse_response(self, response):
+        """응답 객체에서 정보를 수집해 반환한다 (response.text 대신 본문 bytes와 인코딩을 그대로 파서에 넘김)
+
+        Args:
+            response(requests.Response or httpx.Response): 기사 페이지 응답
+
+        Returns:
+            dict: 수집한 정보들의 딕셔너리 (scrape_news_content 참고)
+        """
+        return self.parse_news_content(*decoding.get_body(response))
+
+
+    async def parse_response_in_pool(self, response, pool):
+        """parse_response를 파싱 프로세스에서 실행한다 (이벤트 루프 안에서 await로 사용, 인코딩 판단도 파싱 프로세스에서)
+
+        Args:
+            response(httpx.Response or requests.Response): 기사 페이지 응답
+            pool(parse_pool.ParsePool): 파싱 프로세스 풀
+
+        Returns:
+            dict: 수집한 정보들의 딕셔너리 (scrape_news_content 참고)
+        """
+        news, method = await pool.run(parse_news_body, response.content, response.headers.get("content-type"),
+                                      urlsplit(str(response.url)).netloc)
+        decoding.shared_stats.record(method)
+        return news
+
+
+    def parse_news_content(self, html, encoding=None):
+        """뉴스 기사 페이지의 html에서 정보를 수집해 반환한다 (요청 없이 파싱만)
+        - lxml 트리에서 미리 컴파일한 XPath(NEWS_SPEC)로 추출함 (parse_news_content_bs4와 같은 결과, 벤치마크: python -m scraper_news.benchmark)
+        - 응답 본문(bytes)과 인코딩(decoding.get_body)을 받으면 str로 디코딩하지 않고 파싱함
+
+        Args:
+            html(str or bytes): 기사 페이지의 html
+            encoding(str): html이 bytes일 때의 인코딩 | Default: None
+
+        Returns:
+            dict: 수집한 정보들의 딕셔너리 (scrape_news_content 참고)
+        """
+        return NEWS_SPEC.extract(html, encoding)
+
+
+    def parse_news_content_bs4(self, html, encoding=None):
+        """parse_news_content의 BeautifulSoup + soupsieve 버전 (이전 방식, 결과 비교 및 벤치마크용)
+
+        Args:
+            html(str or bytes): 기사 페이지의 html
+            encoding(str): html이 bytes일 때의 인코딩 | Default: None
+
+        Returns:
+            dict: 수집한 정보들의 딕셔너리 (scrape_news_content 참고)
+        """
+        if isinstance(html, bytes) and encoding is not None:
+            html = decoding.decode(html, encoding)
         # soup = BeautifulSoup(html, "html.parser")
         soup = BeautifulSoup(html, "lxml")
 
@@ -214,15 +493,116 @@ class NewsContentScraper():
         news["writer"] = writer
         news["content"] = content
         news["categories"] = categories
-        return page_url, news
+        return news
+
+
+    def make_news_data(self, news_info, page_url, news):
+        """큐 정보와 수집한 정보를 save_news에 넘길 딕셔너리 하나로 합친다
+
+        Args:
+            news_info(tuple): (news_year_id, news_id, sid1, sid2, date, url)
+            page_url(str): 최종 페이지 링크
+            news(dict): parse_news_content의 반환값
+
+        Returns:
+            dict: collect_news 반환값의 원소 하나
+        """
+        news_year_id, news_id, sid1, sid2, date, url = news_info
+        news_data = {}
+        news_data["news_year_id"] = news_year_id
+        news_data["news_id"] = news_id
+        news_data["sid1"] = sid1
+        news_data["sid2"] = sid2
+        news_data["date"] = date
+        news_data["url"] = url
+        news_data["page_url"] = page_url
+
+        # 현재시간 (수집시간)
+        news_data["kst_now"] = utils.get_kst_datetime()
+
+        # 딕셔너리 하나로 합침
+            # {news_id: 뉴스아이디(int), sid1: 섹션아이디(int), sid2: 섹션아이디(int), date: 날짜(str), 
+            #  page_url: 최종 페이지 링크(str), kst_now: 수집 시 시간(datetime),
+            #  press: 언론사(str), title: 제목(str), input: 입력시간(datetime), modify: 수정시간(datetime), 
+            #  writer: 기자(str), content: 본문(str), categories: 기사 내에서 분류한 카테고리의 명칭(list)}
+        for k, v in news.items():
+            news_data[k] = v
+        return news_data
+
+
+    async def collect_news_async(self, to_collect_news_info, on_collected=None):
+        """collect_news의 비동기 버전 (AsyncTransport의 이벤트 루프에서 실행)
+        - 기사 요청들을 동시에 보내되, 호스트별 동시 요청 수는 info.config의 news_host_concurrency로 제한함
+        - 요청(네트워크)은 이벤트 루프에서, 파싱(CPU)은 파싱 프로세스(parse_pool.ParsePool)에서 실행함
+            - info.config의 news_stream_parse가 1일 경우 본문을 받는 대로 이벤트 루프에서 파싱하다가 필드를 모두 찾으면 나머지는 받지 않음 (NewsStream)
+        - info.config의 archive_dir이 설정된 경우 받은 본문을 그대로 아카이브에 저장함 (archive.PageArchive)
+        - 하나라도 실패하면 나머지 요청을 취소하고 예외를 발생시킴 (그 전에 완료된 기사는 on_collected로 이미 넘어감)
+        - 종료 요청(SIGTERM) 이후에는 아직 시작하지 않은 요청은 보내지 않고, 진행 중인 요청만 마무리함
+        - 요청과 파싱은 호출한 쪽의 Deadline(배치 예산) 안에서만 시작하며, 요청 하나는 http_request_budget초를 넘으면 취소됨
+
+        Args:
+            to_collect_news_info(list): collect_news와 같음
+            on_collected(function): 기사 하나가 수집될 때마다 수집한 데이터(dict)로 호출할 함수 | Default: None
+
+        Returns:
+            list: collect_news와 같음 (to_collect_news_info와 같은 순서, 종료 요청으로 건너뛴 기사는 제외)
+        """
+        async_transport = transport.get_async_transport()
+        host_concurrency = utils.get_config("news_host_concurrency", set_int=True, default=NEWS_HOST_CONCURRENCY)
+        headers = {"User-Agent": self.user_agent}
+        semaphores = {}  # {host: asyncio.Semaphore}
+        pool = parse_pool.get_parse_pool()
+        stream_parse = utils.get_config("news_stream_parse", set_int=True, default=NEWS_STREAM_PARSE)
+        page_archive = archive.get_archive()
+
+        async def collect_one(news_info):
+            url = news_info[-1]
+            host = urlsplit(url).netloc
+            if host not in semaphores:
+                semaphores[host] = asyncio.Semaphore(host_concurrency)
+
+            # 페이지 수집 (종료 요청 시 새 요청은 보내지 않음)
+            async with semaphores[host]:
+                if shutdown.is_requested():
+                    return None
+                if stream_parse:
+                    stream = NewsStream()
+                    response, stopped = await async_transport.get_streamed(url, stream.feed, headers=headers)
+                else:
+                    response, stopped = await async_transport.get(url, headers=headers), False
+
+            # 아카이브 (파싱에 실패한 페이지도 나중에 다시 파싱할 수 있도록 파싱 전에)
+            if page_archive is not None:
+                content = b"".join(stream.chunks) if stream_parse else response.content
+                page_archive.add(news_info[1], str(response.url), content, response.headers.get("content-type"), complete=not stopped)
+
+            # 파싱 (배치 예산이 남아 있을 때만, 본문은 bytes 그대로 파싱 프로세스에 넘기고 인코딩도 그쪽에서 판단)
+            deadline.check()
+            if stream_parse:
+                news = stream.finish(response, stopped)
+            else:
+                news = await self.parse_response_in_pool(response, pool)
+            news_data = self.make_news_data(news_info, str(response.url), news)
+            if on_collected is not None:
+                on_collected(news_data)
+            return news_data
+
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                tasks = [task_group.create_task(collect_one(news_info)) for news_info in to_collect_news_info]
+        except ExceptionGroup as e:
+            raise e.exceptions[0]  # 첫 번째 에러만 그대로 발생 (나머지 요청은 취소됨)
+        return [task.result() for task in tasks if task.result() is not None]
     
     
-    def collect_news(self, to_collect_news_info):
+    def collect_news(self, to_collect_news_info, on_collected=None):
         """수집할 기사의 정보를 받아온 뒤, 데이터를 수집하여 리스트로 반환한다.
+        - 기사들을 asyncio로 동시에 수집함 (collect_news_async)
         
         Args:
             to_collect_news_info(list): list in list 형태의 기사 정보
-                [(news_id, sid1, sid2, date, url), ...]
+                [(news_year_id, news_id, sid1, sid2, date, url), ...]
+            on_collected(function): 기사 하나가 수집될 때마다 호출할 함수 (중간 저장용) | Default: None
         
         Returns:
             list: 리스트 안의 딕셔너리 형태
@@ -232,36 +612,8 @@ class NewsContentScraper():
                      press: 언론사(str), title: 제목(str), input: 입력시간(datetime), modify: 수정시간(datetime), 
                      writer: 기자(str), content: 본문(str), categories: 기사 내에서 분류한 카테고리의 명칭(list)}
         """
-        news_datas = []
-        
-        for news_year_id, news_id, sid1, sid2, date, url in to_collect_news_info:
-            news_data = {}
-            news_data["news_year_id"] = news_year_id
-            news_data["news_id"] = news_id
-            news_data["sid1"] = sid1
-            news_data["sid2"] = sid2
-            news_data["date"] = date
-            news_data["url"] = url
-            
-            # 페이지 수집
-            page_url, news = self.scrape_news_content(url)
-            news_data["page_url"] = page_url
-            
-            # 현재시간 (수집시간)
-            news_data["kst_now"] = utils.get_kst_datetime()
-           
-            # 딕셔너리 하나로 합침
-                # {news_id: 뉴스아이디(int), sid1: 섹션아이디(int), sid2: 섹션아이디(int), date: 날짜(str), 
-                #  page_url: 최종 페이지 링크(str), kst_now: 수집 시 시간(datetime),
-                #  press: 언론사(str), title: 제목(str), input: 입력시간(datetime), modify: 수정시간(datetime), 
-                #  writer: 기자(str), content: 본문(str), categories: 기사 내에서 분류한 카테고리의 명칭(list)}
-            for k, v in news.items():
-                news_data[k] = v
-            
-            # 합침
-            news_datas.append(news_data)
-
-        # 반환
+        async_transport = transport.get_async_transport()
+        news_datas = async_transport.run(self.collect_news_async(to_collect_news_info, on_collected))
         return news_datas
 
 
@@ -0,0 +1,336 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import time
+import asyncio
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from db import backlog
+from scraper_news import main as scraper_news
+from scraper_news import news_content_scraper
+from utils import utils, transport, worker, shutdown, decoding, parse_pool, archive
+
+
+# 단계별 기본 설정 (info.config의 pipeline_* 값으로 덮어씀)
+CLAIM_SIZE = 50  # 한번에 선점하는 기사 수
+FETCH_CONCURRENCY = 10  # 동시에 요청하는 기사 수
+PARSE_WORKERS = 2  # 동시에 파싱을 맡기는 기사 수 (파싱 프로세스 수보다 적으면 프로세스 수만큼)
+WRITE_CONCURRENCY = 1  # 동시에 저장하는 배치 수
+QUEUE_SIZE = 100  # 단계 사이 큐의 최대 길이 (가득 차면 앞 단계가 기다림)
+WRITE_LINGER = 0.5  # 저장 배치를 채우기 위해 기다리는 최대 시간(초)
+IDLE_SECONDS = 10  # 수집할 큐가 없을 때 다시 확인하기까지 대기(초)
+REPORT_SECONDS = 30  # 단계별 통계 출력 주기(초)
+
+_STOP = object()  # 다음 단계에 종료를 알리는 값
+
+
+
+class StageMetrics():
+    """파이프라인 단계 하나의 처리량 통계 (스레드 안전)
+
+    Attributes:
+        name(str): 단계 이름
+        queue(asyncio.Queue): 단계의 입력 큐 (claim은 None)
+        processed(int): 처리한 개수
+        errors(int): 실패한 개수
+        busy(float): 처리에 걸린 누적 시간(초)
+        max_depth(int): 입력 큐의 최대 길이 (구간별)
+    """
+
+    def __init__(self, name, queue=None):
+        self.name = name
+        self.queue = queue
+        self.processed = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+
+    def record(self, n=1, elapsed=0.0, errors=0):
+        with self._lock:
+            self.processed += n
+            self.errors += errors
+            self.busy += elapsed
+
+
+    def sample(self):
+        """입력 큐 길이를 기록 (최대값 갱신)"""
+        if self.queue is not None:
+            with self._lock:
+                self.max_depth = max(self.max_depth, self.queue.qsize())
+
+
+    def summary(self, reset=False):
+        """출력용 한 줄 요약 (eg. fetch: 120 ok / 1 err / busy 35.2s / depth 12 (max 100))"""
+        with self._lock:
+            depth = self.queue.qsize() if self.queue is not None else "-"
+            line = f"{self.name}: {self.processed} ok / {self.errors} err / busy {self.busy:.1f}s / depth {depth} (max {self.max_depth})"
+            if reset:
+                self.processed = self.errors = self.max_depth = 0
+                self.busy = 0.0
+        return line
+
+
+
+class NewsPipeline():
+    """뉴스 수집을 claim > fetch > parse > write 단계로 나누어 계속 실행하는 객체
+    - 단계 사이는 길이가 제한된 asyncio.Queue로 연결되어, 뒤 단계가 밀리면 앞 단계가 기다림 (선점이 무한정 쌓이지 않음)
+    - 배치 단위로 실행할 때와 달리 파싱/저장하는 동안에도 다음 기사를 요청하므로 네트워크와 DB가 함께 사용됨
+    - 요청/파싱은 NewsContentScraper, 선점/저장/해제는 scraper_news.main의 함수를 그대로 사용
+    - 파싱은 CPU 할당량만큼의 프로세스(parse_pool.ParsePool)에서 실행하여 이벤트 루프의 요청과 GIL을 나눠 쓰지 않음
+    - 실패한 기사는 선점을 해제하여 다른 컨테이너(또는 다음 선점)에서 다시 수집됨
+    - 종료 요청(SIGTERM) 시 새로 선점하지 않고, 이미 선점한 기사를 모두 처리(저장 또는 해제)한 뒤 종료
+
+    Attributes:
+        claim_size(int): 한번에 선점하는 기사 수
+        fetch_concurrency(int): 동시에 요청하는 기사 수
+        parse_workers(int): 동시에 파싱을 맡기는 기사 수 (파싱은 parse_pool.ParsePool의 프로세스에서 실행)
+        write_concurrency(int): 동시에 저장하는 배치 수
+        write_batch_size(int): 한번에 저장하는 기사 수
+        queue_size(int): 단계 사이 큐의 최대 길이
+        stop_when_empty(bool): True일 경우 수집할 큐가 없으면 종료 (False일 경우 IDLE_SECONDS마다 다시 확인)
+        metrics(dict): {단계 이름: StageMetrics}
+        parse_pool(ParsePool): 파싱을 실행하는 프로세스 풀 (parse_pool.get_parse_pool)
+        archive(PageArchive): 받은 본문을 저장할 아카이브 (info.config의 archive_dir이 없으면 None)
+    """
+
+    def __init__(self, claim_size=None, fetch_concurrency=None, parse_workers=None, write_concurrency=None,
+                 write_batch_size=None, queue_size=None, stop_when_empty=False):
+        """단계별 설정 초기화 (None일 경우 info.config 값 사용)"""
+        self.claim_size = claim_size or utils.get_config("pipeline_claim_size", set_int=True, default=CLAIM_SIZE)
+        self.fetch_concurrency = fetch_concurrency or utils.get_config("pipeline_fetch_concurrency", set_int=True, default=FETCH_CONCURRENCY)
+        self.parse_pool = parse_pool.get_parse_pool()
+        self.archive = archive.get_archive()
+        self.parse_workers = parse_workers or utils.get_config("pipeline_parse_workers", set_int=True, default=PARSE_WORKERS)
+        self.parse_workers = max(self.parse_workers, self.parse_pool.processes)
+        self.write_concurrency = write_concurrency or utils.get_config("pipeline_write_concurrency", set_int=True, default=WRITE_CONCURRENCY)
+        self.write_batch_size = write_batch_size or utils.get_config("news_flush_size", set_int=True, default=scraper_news.NEWS_FLUSH_SIZE)
+        self.queue_size = queue_size or utils.get_config("pipeline_queue_size", set_int=True, default=QUEUE_SIZE)
+        self.stop_when_empty = stop_when_empty
+
+        self.scraper = news_content_scraper.NewsContentScraper()
+        self.worker_id = utils.get_worker_id()
+        self.metrics = {}
+        self._failed = {}  # {year: [선점 해제할 news_year_id, ...]}
+        self._failed_lock = threading.Lock()
+
+
+    def _fail(self, year, news_year_id):
+        """처리하지 못한 기사를 선점 해제 대상으로 추가 (claim 단계에서 모아서 해제)"""
+        with self._failed_lock:
+            self._failed.setdefault(year, []).append(news_year_id)
+
+
+    def _release_failed(self):
+        """실패한 기사의 선점을 연도별로 한번에 해제 (해제에 실패하면 다음 호출 때 다시 해제하도록 되돌림)"""
+        with self._failed_lock:
+            failed, self._failed = self._failed, {}
+        years = list(failed)
+        for i, year in enumerate(years):
+            try:
+                scraper_news.release_news(year, failed[year], self.worker_id)
+            except Exception:
+                with self._failed_lock:
+                    for y in years[i:]:
+                        self._failed.setdefault(y, []).extend(failed[y])
+                raise
+
+
+    async def _claim(self, loop, out_queue):
+        """claim 단계: 미수집 큐가 남은 가장 최근 연도에서 claim_size개씩 선점해 fetch 큐에 넣음"""
+        metrics = self.metrics["claim"]
+        while not shutdown.is_requested():
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(self._db_executor, self._release_failed)
+                target_year = await loop.run_in_executor(self._db_executor, lambda: backlog.get_target_year(utils.get_years()))
+                queue_info = []
+                if target_year:
+                    queue_info = await loop.run_in_executor(self._db_executor, scraper_news.get_news_to_collect,
+                                                            target_year, self.claim_size, self.worker_id)
+            except Exception:
+                metrics.record(0, errors=1)
+                print(f">> pipeline claim error\n{traceback.format_exc()}")
+                await self._idle(IDLE_SECONDS)
+                continue
+            metrics.record(len(queue_info), time.perf_counter() - start)
+
+            if not queue_info:
+                if self.stop_when_empty:
+                    print(">> pipeline - all queue scraped")
+                    break
+                await self._idle(IDLE_SECONDS)
+                continue
+
+            for news_info in queue_info:
+                await out_queue.put((target_year, news_info))  # fetch 큐가 가득 차면 여기서 기다림 (backpressure)
+
+
+    async def _idle(self, seconds):
+        """seconds초 동안 대기하되 종료 요청 시 바로 반환"""
+        end = time.monotonic() + seconds
+        while not shutdown.is_requested() and time.monotonic() < end:
+            await asyncio.sleep(min(1, end - time.monotonic()))
+
+
+    async def _fetch(self, async_transport, in_queue, out_queue):
+        """fetch 단계: 기사 페이지를 요청해 응답을 parse 큐에 넣음"""
+        metrics = self.metrics["fetch"]
+        headers = {"User-Agent": self.scraper.user_agent}
+        while True:
+            item = await in_queue.get()
+            if item is _STOP:
+                return
+            year, news_info = item
+            if shutdown.is_requested():
+                self._fail(year, news_info[0])  # 종료 요청 후에는 새 요청을 보내지 않고 바로 선점 해제
+                continue
+            start = time.perf_counter()
+            try:
+                response = await async_transport.get(news_info[-1], headers=headers)
+            except Exception as e:
+                metrics.record(0, errors=1, elapsed=time.perf_counter() - start)
+                print(f">> pipeline fetch error - {news_info[0]} / {type(e).__name__}: {e}")
+                self._fail(year, news_info[0])
+                continue
+            metrics.record(elapsed=time.perf_counter() - start)
+            await out_queue.put((year, news_info, response))
+
+
+    async def _parse(self, in_queue, out_queue):
+        """parse 단계: 파싱 프로세스에서 html을 파싱해 저장할 데이터를 write 큐에 넣음"""
+        metrics = self.metrics["parse"]
+        while True:
+            item = await in_queue.get()
+            if item is _STOP:
+                return
+            year, news_info, response = item
+            start = time.perf_counter()
+            # 아카이브 (파싱에 실패한 페이지도 나중에 다시 파싱할 수 있도록 파싱 전에)
+            if self.archive is not None:
+                self.archive.add(news_info[1], str(response.url), response.content, response.headers.get("content-type"))
+            try:
+                news = await self.scraper.parse_response_in_pool(response, self.parse_pool)
+                news_data = self.scraper.make_news_data(news_info, str(response.url), news)
+            except Exception as e:
+                metrics.record(0, errors=1, elapsed=time.perf_counter() - start)
+                print(f">> pipeline parse error - {news_info[0]} / {type(e).__name__}: {e}")
+                self._fail(year, news_info[0])
+                continue
+            metrics.record(elapsed=time.perf_counter() - start)
+            await out_queue.put((year, news_data))
+
+
+    async def _write(self, loop, in_queue):
+        """write 단계: write_batch_size개(또는 WRITE_LINGER초 동안 모인 만큼)씩 연도별로 save_news로 저장"""
+        metrics = self.metrics["write"]
+        stopped = False
+        while not stopped:
+            # 첫 기사는 계속 기다리고, 이후는 WRITE_LINGER초 안에 모인 만큼만
+            item = await in_queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            linger_end = loop.time() + WRITE_LINGER
+            while len(batch) < self.write_batch_size:
+                try:
+                    item = await asyncio.wait_for(in_queue.get(), timeout=max(0, linger_end - loop.time()))
+                except TimeoutError:
+                    break
+                if item is _STOP:
+                    stopped = True
+                    break
+                batch.append(item)
+
+            news_datas_by_year = {}
+            for year, news_data in batch:
+                news_datas_by_year.setdefault(year, []).append(news_data)
+
+            for year, news_datas in news_datas_by_year.items():
+                start = time.perf_counter()
+                try:
+                    _, saved_news_year_ids = await loop.run_in_executor(self._db_executor, scraper_news.save_news, year, news_datas)
+                except Exception as e:
+                    metrics.record(0, errors=len(news_datas), elapsed=time.perf_counter() - start)
+                    worker.record(errors=1)
+                    print(f">> pipeline write error - {year} / {len(news_datas)} news / {type(e).__name__}: {e}")
+                    for news_data in news_datas:
+                        self._fail(year, news_data["news_year_id"])
+                    continue
+                metrics.record(len(news_datas), time.perf_counter() - start)
+                worker.record(len(saved_news_year_ids), target=year)
+
+
+    async def _report(self):
+        """REPORT_SECONDS마다 단계별 처리량, 큐 길이를 출력"""
+        next_report = time.monotonic() + REPORT_SECONDS
+        while True:
+            await asyncio.sleep(1)
+            for metrics in self.metrics.values():
+                metrics.sample()
+            if time.monotonic() >= next_report:
+                next_report += REPORT_SECONDS
+                self.report(reset=True)
+
+
+    def report(self, reset=False):
+        """단계별 통계 출력"""
+        print(">> pipeline - " + " | ".join(metrics.summary(reset) for metrics in self.metrics.values()))
+        print(f">> transport - {transport.shared_stats.summary(reset=reset)}")
+        print(f">> decoding - {decoding.shared_stats.summary(reset=reset)}")
+        if self.archive is not None:
+            print(f">> archive - {self.archive.summary(reset=reset)}")
+
+
+    async def run_async(self):
+        """모든 단계를 실행하고, claim 단계가 끝나면(종료 요청 등) 남은 기사를 모두 처리한 뒤 반환
+        - AsyncTransport의 이벤트 루프에서 실행해야 함 (run 참고)
+        - 취소된 경우(두번째 종료 신호 등)에는 남은 기사를 처리하지 않고 바로 종료 (선점은 lease 만료 또는 reaper가 해제)
+        """
+        loop = asyncio.get_running_loop()
+        async_transport = transport.get_async_transport()
+        fetch_queue = asyncio.Queue(self.queue_size)
+        parse_queue = asyncio.Queue(self.queue_size)
+        write_queue = asyncio.Queue(self.queue_size)
+        self.metrics = {
+            "claim": StageMetrics("claim"),
+            "fetch": StageMetrics("fetch", fetch_queue),
+            "parse": StageMetrics("parse", parse_queue),
+            "write": StageMetrics("write", write_queue),
+        }
+
+        # 블로킹 작업(DB)은 스레드, 파싱은 파싱 프로세스에서 실행 (이벤트 루프를 막지 않도록)
+        self._db_executor = ThreadPoolExecutor(max_workers=self.write_concurrency + 1, thread_name_prefix="pipeline-db")
+
+        reporter = asyncio.create_task(self._report())
+        fetchers = [asyncio.create_task(self._fetch(async_transport, fetch_queue, parse_queue)) for _ in range(self.fetch_concurrency)]
+        parsers = [asyncio.create_task(self._parse(parse_queue, write_queue)) for _ in range(self.parse_workers)]
+        writers = [asyncio.create_task(self._write(loop, write_queue)) for _ in range(self.write_concurrency)]
+
+        try:
+            await self._claim(loop, fetch_queue)
+
+            # 앞 단계부터 차례로 종료 (큐에 남은 기사는 모두 처리됨)
+            for tasks, queue in ((fetchers, fetch_queue), (parsers, parse_queue), (writers, write_queue)):
+                for _ in tasks:
+                    await queue.put(_STOP)
+                await asyncio.gather(*tasks, return_exceptions=True)
+            await loop.run_in_executor(self._db_executor, self._release_failed)
+            self.report()
+
+        finally:
+            for task in [reporter] + fetchers + parsers + writers:
+                task.cancel()
+            self._db_executor.shutdown(wait=False)
+
+
+    def run(self):
+        """파이프라인을 AsyncTransport의 이벤트 루프에서 실행 (종료 요청을 받거나 stop_when_empty일 때 큐가 비면 반환)"""
+        print(f">> Start news pipeline / claim: {self.claim_size} / fetch: {self.fetch_concurrency} / parse: {self.parse_workers} ({self.parse_pool.processes} processes) "
+              f"/ write: {self.write_concurrency} x {self.write_batch_size} / queue: {self.queue_size}")
+        transport.get_async_transport().run(self.run_async())
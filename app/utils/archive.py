@@ -0,0 +1,425 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import time
+import sqlite3
+import hashlib
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:  # 선택 의존성 (archive_dir을 설정해 아카이브를 사용할 때만 필요)
+    zstandard = None
+
+from utils import utils
+
+
+# 기본 설정 (info.config의 archive_dir, archive_batch_size, archive_segment_mb, archive_dict_samples, archive_level로 덮어씀)
+ARCHIVE_DIR = ""  # 수집한 응답 원본을 저장할 디렉토리 ("": 저장하지 않음)
+BATCH_SIZE = 50  # 한번에 압축해서 세그먼트에 쓰는 페이지 수
+BATCH_LINGER = 60  # 배치가 차지 않아도 이 시간(초)이 지나면 씀
+SEGMENT_MB = 256  # 세그먼트 파일 하나의 최대 크기(MB) (넘으면 다음 세그먼트에 씀)
+DICT_SAMPLES = 300  # zstd 사전을 학습할 때 사용하는 페이지 수 (사전이 없을 때 이만큼 모이면 학습)
+DICT_SIZE = 112 * 1024  # zstd 사전 크기(바이트)
+LEVEL = 3  # zstd 압축 레벨
+
+INDEX_FILE = "index.sqlite3"
+
+_shared_archive = None
+_shared_archive_lock = threading.Lock()
+
+
+
+class PageArchive():
+    """수집한 기사 페이지 응답 원본(bytes)을 압축해서 보관하는 객체 (선택자 수정 후 다시 요청하지 않고 재파싱하기 위함)
+    - 페이지는 zstd 프레임 하나로 압축해 세그먼트 파일(archive_dir/{worker_id}-{n}.zst)에 이어서 씀 (append-only, 컨테이너마다 다른 파일)
+    - 색인(archive_dir/index.sqlite3)으로 news_id의 세그먼트, 위치를 찾아 바로 읽음
+        - blobs: 본문 해시(blake2b) > 세그먼트, 위치, 크기, 사전 아이디 (같은 본문은 한번만 저장)
+        - pages: news_id > 본문 해시, url, Content-Type, 끝까지 받았는지 여부, 저장 시각 (다시 수집하면 덮어씀)
+        - dicts: zstd 사전 아이디 > 사전
+    - 기사 페이지는 구조가 거의 같으므로 처음 DICT_SAMPLES개로 zstd 사전을 학습해 이후 페이지를 압축함 (학습 전에는 사전 없이)
+    - add는 메모리에 모으기만 하고, batch_size개가 모이거나 BATCH_LINGER초가 지나면(별도 스레드에서 확인) 전용 스레드에서 압축 > 세그먼트에 쓰기 > 색인 순으로 저장
+        - 중간에 종료되어도 색인에는 다 쓴 프레임만 남음 (색인이 없는 세그먼트 끝부분은 읽지 않음)
+    - 저장 실패는 출력만 하고 수집을 멈추지 않음
+
+    Attributes:
+        path(str): 아카이브 디렉토리
+        batch_size(int): 한번에 저장하는 페이지 수
+        segment_bytes(int): 세그먼트 파일 하나의 최대 크기(바이트)
+        dict_samples(int): 사전 학습에 사용하는 페이지 수
+        level(int): zstd 압축 레벨
+        stats(dict): {"pages": 저장한 페이지 수, "duplicates": 같은 본문이 있어 새로 쓰지 않은 수,
+                      "bytes": 원본 바이트, "compressed": 압축 후 바이트, "errors": 저장 실패한 배치 수}
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE, segment_mb=SEGMENT_MB, dict_samples=DICT_SAMPLES, level=LEVEL):
+        """
+        Args:
+            path(str): 아카이브 디렉토리 (없으면 생성)
+            batch_size(int): 한번에 저장하는 페이지 수
+            segment_mb(int): 세그먼트 파일 하나의 최대 크기(MB)
+            dict_samples(int): 사전 학습에 사용하는 페이지 수
+            level(int): zstd 압축 레벨
+        """
+        if zstandard is None:
+            raise ImportError("zstandard is required for the page archive (pip install zstandard)")
+
+        self.path = path
+        self.batch_size = batch_size
+        self.segment_bytes = segment_mb * 1024 * 1024
+        self.dict_samples = dict_samples
+        self.level = level
+        self.stats = dict.fromkeys(["pages", "duplicates", "bytes", "compressed", "errors"], 0)
+        os.makedirs(path, exist_ok=True)
+
+        self._worker_id = utils.get_worker_id()
+        self._buffer = []  # [(news_id, url, content_type, complete, content), ...]
+        self._buffer_since = None
+        self._samples = []  # 사전 학습용 페이지 (사전이 생기면 비움)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")  # 세그먼트, 색인에 쓰는 스레드 하나 (배치 순서대로)
+        self._closed = threading.Event()
+        self._linger_thread = threading.Thread(target=self._linger, name="archive-linger", daemon=True)
+
+        # 아래는 저장 스레드에서만 사용
+        self._db = None
+        self._segment = None  # (세그먼트 파일명, 파일 객체)
+        self._segment_n = 0
+        self._compressor = None
+        self._dict_id = 0
+
+        with self._connect() as db:
+            self._init_index(db)
+        db.close()
+        self._linger_thread.start()
+
+
+    def _connect(self):
+        db = sqlite3.connect(os.path.join(self.path, INDEX_FILE), timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")  # 여러 컨테이너가 같은 색인에 쓰고, 읽는 동안에도 쓸 수 있도록
+        return db
+
+
+    def _init_index(self, db):
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY, segment TEXT NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL,
+                size INTEGER NOT NULL, dict_id INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS pages (
+                news_id INTEGER PRIMARY KEY, digest TEXT NOT NULL, url TEXT, content_type TEXT,
+                complete INTEGER NOT NULL, archived_at TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS dicts (
+                dict_id INTEGER PRIMARY KEY, data BLOB NOT NULL, samples INTEGER NOT NULL, created_at TEXT NOT NULL);
+        """)
+
+
+    def add(self, news_id, url, content, content_type=None, complete=True):
+        """페이지 하나를 저장 대상에 추가 (batch_size개가 모이면 저장 스레드에 넘김)
+
+        Args:
+            news_id(int): 뉴스아이디
+            url(str): 최종 페이지 url
+            content(bytes): 응답 본문 (압축 해제 후)
+            content_type(str): Content-Type 헤더 (재파싱 시 인코딩 판단용) | Default: None
+            complete(bool): 본문을 끝까지 받았는지 여부 (news_stream_parse로 중간에 멈춘 경우 False) | Default: True
+        """
+        with self._lock:
+            if not self._buffer:
+                self._buffer_since = time.monotonic()
+            self._buffer.append((news_id, url, content_type, int(complete), content))
+            if len(self._buffer) >= self.batch_size or time.monotonic() - self._buffer_since >= BATCH_LINGER:
+                self._submit()
+
+
+    def _linger(self):
+        """모아둔 페이지가 BATCH_LINGER초 넘게 남아 있으면 저장 (다음 페이지가 오지 않아도 메모리에 오래 두지 않도록)"""
+        while not self._closed.wait(max(1, BATCH_LINGER / 4)):
+            with self._lock:
+                if self._buffer and time.monotonic() - self._buffer_since >= BATCH_LINGER:
+                    self._submit()
+
+
+    def flush(self):
+        """모아둔 페이지를 저장 스레드에 넘김 (기다리지 않음)"""
+        with self._lock:
+            self._submit()
+
+
+    def _submit(self):
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        self._executor.submit(self._write_batch, batch)
+
+
+    def _write_batch(self, batch):
+        """저장 스레드: 새 본문만 압축해 세그먼트 끝에 한번에 쓰고, 색인을 한 트랜잭션으로 기록"""
+        try:
+            if self._db is None:
+                self._db = self._connect()
+                self._load_dictionary()
+
+            digests = [hashlib.blake2b(content, digest_size=16).hexdigest() for *_, content in batch]
+            placeholders = ",".join("?" * len(digests))
+            existing = {row[0] for row in self._db.execute(f"SELECT digest FROM blobs WHERE digest IN ({placeholders})", digests)}
+
+            # 압축 (같은 배치 안의 중복도 한번만)
+            frames = {}
+            for digest, (*_, content) in zip(digests, batch):
+                if digest not in existing and digest not in frames:
+                    frames[digest] = (self._compressor.compress(content), len(content))
+
+            # 세그먼트에 한번에 쓰기
+            blob_rows = []
+            if frames:
+                segment, file = self._get_segment(sum(len(frame) for frame, _ in frames.values()))
+                offset = file.tell()
+                for digest, (frame, size) in frames.items():
+                    blob_rows.append((digest, segment, offset, len(frame), size, self._dict_id))
+                    offset += len(frame)
+                file.write(b"".join(frame for frame, _ in frames.values()))
+                file.flush()
+                os.fsync(file.fileno())
+
+            now = datetime.datetime.now().isoformat(timespec="seconds")
+            with self._db:
+                self._db.executemany("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows)
+                self._db.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                                     [(news_id, digest, url, content_type, complete, now)
+                                      for digest, (news_id, url, content_type, complete, _) in zip(digests, batch)])
+
+            # 사전이 없으면 학습용으로 모음 (색인까지 쓴 뒤에)
+            if not self._dict_id and self.dict_samples:
+                self._samples.extend(content for digest, (*_, content) in zip(digests, batch) if digest in frames)
+                if len(self._samples) >= self.dict_samples:
+                    self._train_dictionary()
+
+            with self._lock:
+                self.stats["pages"] += len(batch)
+                self.stats["duplicates"] += len(batch) - len(frames)
+                self.stats["bytes"] += sum(size for _, size in frames.values())
+                self.stats["compressed"] += sum(len(frame) for frame, _ in frames.values())
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            print(f">> archive error - {len(batch)} pages / {type(e).__name__}: {e}")
+
+
+    def _get_segment(self, n_bytes):
+        """이번 배치를 쓸 세그먼트 (현재 세그먼트가 segment_bytes를 넘게 되면 다음 세그먼트)"""
+        if self._segment is not None:
+            name, file = self._segment
+            if file.tell() == 0 or file.tell() + n_bytes <= self.segment_bytes:
+                return self._segment
+            file.close()
+
+        # 이 컨테이너의 다음 세그먼트 번호 (재시작한 경우에도 기존 파일에 이어 쓰지 않음)
+        prefix = f"{self._worker_id}-"
+        numbers = [int(name[len(prefix):-4]) for name in os.listdir(self.path)
+                   if name.startswith(prefix) and name.endswith(".zst") and name[len(prefix):-4].isdigit()]
+        self._segment_n = max(numbers + [self._segment_n]) + 1
+        name = f"{prefix}{self._segment_n:05d}.zst"
+        self._segment = (name, open(os.path.join(self.path, name), "ab"))
+        return self._segment
+
+
+    def _load_dictionary(self):
+        """색인에 저장된 가장 최근 사전으로 압축 (없으면 사전 없이 압축하며 학습용 페이지를 모음)"""
+        row = self._db.execute("SELECT dict_id, data FROM dicts ORDER BY created_at DESC LIMIT 1").fetchone()
+        if row is None:
+            self._compressor = zstandard.ZstdCompressor(level=self.level)
+            self._dict_id = 0
+            return
+        self._dict_id = row[0]
+        self._compressor = zstandard.ZstdCompressor(level=self.level, dict_data=zstandard.ZstdCompressionDict(row[1]))
+        self._samples = []
+
+
+    def _train_dictionary(self):
+        """저장 스레드: 모아둔 학습용 페이지로 zstd 사전을 학습해서 색인에 저장하고 이후 압축에 사용
+        - 학습에 실패하면 이 컨테이너에서는 사전 없이 계속 압축함
+        """
+        samples, self._samples = self._samples, []
+        start = time.perf_counter()
+        try:
+            dictionary = zstandard.train_dictionary(DICT_SIZE, samples, level=self.level)
+        except zstandard.ZstdError as e:
+            self.dict_samples = 0
+            print(f">> archive - dictionary training failed, compressing without dictionary / {e}")
+            return
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO dicts VALUES (?, ?, ?, ?)",
+                             (dictionary.dict_id(), dictionary.as_bytes(), len(samples), datetime.datetime.now().isoformat()))
+        self._dict_id = dictionary.dict_id()
+        self._compressor = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+        print(f">> archive - trained dictionary {self._dict_id} from {len(samples)} pages / {time.perf_counter() - start:.1f}s")
+
+
+    def summary(self, reset=False):
+        """출력용 한 줄 요약"""
+        with self._lock:
+            stats = dict(self.stats)
+            if reset:
+                self.stats = dict.fromkeys(self.stats, 0)
+        ratio = stats["bytes"] / stats["compressed"] if stats["compressed"] else 0
+        return (f"{stats['pages']} pages (dup {stats['duplicates']}) / {stats['bytes'] / 1024:.0f}KB > {stats['compressed'] / 1024:.0f}KB "
+                f"(x{ratio:.1f}, dict {self._dict_id or '-'}) / err {stats['errors']}")
+
+
+    def close(self):
+        """모아둔 페이지를 저장하고 저장 스레드 종료 (앞서 넘긴 배치까지 모두 저장될 때까지 기다림)"""
+        self._closed.set()
+        self.flush()
+        self._executor.submit(self._close_files).result()
+        self._executor.shutdown()
+
+
+    def _close_files(self):
+        if self._segment is not None:
+            self._segment[1].close()
+            self._segment = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+
+class ArchiveReader():
+    """PageArchive에 저장한 페이지를 읽는 객체 (재파싱, 확인용)
+
+    Attributes:
+        path(str): 아카이브 디렉토리
+    """
+
+    def __init__(self, path):
+        if zstandard is None:
+            raise ImportError("zstandard is required for the page archive (pip install zstandard)")
+        self.path = path
+        self.db = sqlite3.connect(f"file:{os.path.join(path, INDEX_FILE)}?mode=ro", uri=True)
+        self._decompressors = {}  # {dict_id: ZstdDecompressor}
+
+
+    def _decompress(self, segment, offset, length, dict_id):
+        if dict_id not in self._decompressors:
+            if dict_id:
+                data = self.db.execute("SELECT data FROM dicts WHERE dict_id = ?", (dict_id,)).fetchone()[0]
+                self._decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=zstandard.ZstdCompressionDict(data))
+            else:
+                self._decompressors[dict_id] = zstandard.ZstdDecompressor()
+        with open(os.path.join(self.path, segment), "rb") as f:
+            f.seek(offset)
+            frame = f.read(length)
+        return self._decompressors[dict_id].decompress(frame)
+
+
+    def get(self, news_id):
+        """news_id의 페이지를 읽는다
+
+        Returns:
+            dict: {"news_id", "url", "content_type", "complete", "archived_at", "content": 본문(bytes)} | None (없는 경우)
+        """
+        row = self.db.execute("""
+            SELECT p.news_id, p.url, p.content_type, p.complete, p.archived_at, b.segment, b.offset, b.length, b.dict_id
+            FROM pages p JOIN blobs b ON b.digest = p.digest WHERE p.news_id = ?
+        """, (news_id,)).fetchone()
+        if row is None:
+            return None
+        return self._make_page(row)
+
+
+    def iter_pages(self):
+        """모든 페이지를 세그먼트, 위치 순서로 읽는다 (전체 재파싱용)
+
+        Yields:
+            dict: get과 같음
+        """
+        rows = self.db.execute("""
+            SELECT p.news_id, p.url, p.content_type, p.complete, p.archived_at, b.segment, b.offset, b.length, b.dict_id
+            FROM pages p JOIN blobs b ON b.digest = p.digest ORDER BY b.segment, b.offset
+        """)
+        for row in rows:
+            yield self._make_page(row)
+
+
+    def _make_page(self, row):
+        news_id, url, content_type, complete, archived_at, segment, offset, length, dict_id = row
+        return {"news_id": news_id, "url": url, "content_type": content_type, "complete": bool(complete),
+                "archived_at": archived_at, "content": self._decompress(segment, offset, length, dict_id)}
+
+
+    def close(self):
+        self.db.close()
+
+
+
+def get_archive():
+    """프로세스에서 공유하는 PageArchive를 반환한다 (info.config의 archive_dir이 비어 있으면 None)
+    - zstandard가 설치되지 않은 경우 한번 출력하고 None (아카이브 없이 수집은 계속함)
+
+    Returns:
+        PageArchive: 공용 아카이브 | None
+    """
+    global _shared_archive
+
+    path = utils.get_config("archive_dir", default=ARCHIVE_DIR)
+    if not path:
+        return None
+    with _shared_archive_lock:
+        if _shared_archive is None:
+            if zstandard is None:
+                print(">> archive disabled - zstandard is not installed (pip install zstandard)")
+                _shared_archive = False
+            else:
+                _shared_archive = PageArchive(
+                    path,
+                    batch_size=utils.get_config("archive_batch_size", set_int=True, default=BATCH_SIZE),
+                    segment_mb=utils.get_config("archive_segment_mb", set_int=True, default=SEGMENT_MB),
+                    dict_samples=utils.get_config("archive_dict_samples", set_int=True, default=DICT_SAMPLES),
+                    level=utils.get_config("archive_level", set_int=True, default=LEVEL),
+                )
+        return _shared_archive or None
+
+
+def close_archive():
+    """공용 PageArchive가 있으면 남은 페이지를 저장하고 닫음 (컨테이너 종료 시)"""
+    global _shared_archive
+
+    with _shared_archive_lock:
+        archive, _shared_archive = _shared_archive, None
+    if archive:
+        archive.close()
+
+
+
+if __name__ == "__main__":
+    # 직접 실행 시 저장한 페이지 확인
+    # eg. (app 디렉토리에서) python -m utils.archive /data/archive 2023000012345 -o ./page.html
+    import argparse
+
+    parser = argparse.ArgumentParser(description="기사 페이지 아카이브 확인")
+    parser.add_argument("path", help="아카이브 디렉토리 (info.config의 archive_dir)")
+    parser.add_argument("news_id", type=int, nargs="?", help="읽을 뉴스아이디 (없으면 전체 통계)")
+    parser.add_argument("-o", "--output", help="본문을 저장할 파일")
+    args = parser.parse_args()
+
+    reader = ArchiveReader(args.path)
+    if args.news_id is None:
+        pages, blobs = reader.db.execute("SELECT COUNT(*), COUNT(DISTINCT digest) FROM pages").fetchone()
+        size, length = reader.db.execute("SELECT COALESCE(SUM(size), 0), COALESCE(SUM(length), 0) FROM blobs").fetchone()
+        dicts = [row[0] for row in reader.db.execute("SELECT dict_id FROM dicts")]
+        print(f"## pages: {pages} / blobs: {blobs} / {size / 1024 / 1024:.1f}MB > {length / 1024 / 1024:.1f}MB / dicts: {dicts}")
+    else:
+        page = reader.get(args.news_id)
+        if page is None:
+            print(f"## {args.news_id} not archived")
+        else:
+            print(f"## {page['news_id']} / {page['url']} / {page['content_type']} / complete: {page['complete']} "
+                  f"/ {page['archived_at']} / {len(page['content'])} bytes")
+            if args.output:
+                with open(args.output, "wb") as f:
+                    f.write(page["content"])
+    reader.close()
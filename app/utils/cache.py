@@ -0,0 +1,150 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import time
+import select
+import threading
+
+from psycopg2 import extensions
+
+from db import psql
+
+
+# 캐시 유지 시간(초) - 변경 알림(LISTEN/NOTIFY)을 받지 못하는 경우에도 이 시간 안에는 반영됨
+REFERENCE_TTL = 60
+
+# info 스키마 테이블이 변경될 때 트리거가 보내는 알림 채널 (payload: 테이블명)
+NOTIFY_CHANNEL = "info_changed"
+LISTEN_POLL_SECONDS = 30  # 알림 대기 중 커넥션 상태를 확인하는 주기(초)
+LISTEN_RETRY_SECONDS = 10  # 알림 커넥션이 끊겼을 때 다시 접속하기까지 대기(초)
+
+
+
+class ReferenceCache():
+    """info.config, info.years, info.sids 등 자주 읽고 가끔 바뀌는 테이블의 프로세스 내 캐시 (스레드 안전)
+    - 테이블명 단위로 캐시하며, ttl초가 지나거나 invalidate되면 다음 조회 시 다시 가져옴
+        - 가져오는 도중에 invalidate된 값은 캐시하지 않음 (알림 이전의 값이 ttl 동안 남지 않도록)
+    - start_listener 이후에는 별도 커넥션에서 LISTEN하여, 테이블이 바뀌는 즉시 해당 캐시를 비움
+
+    Attributes:
+        ttl(float): 캐시 유지 시간(초)
+        listening(bool): 변경 알림을 받는 중인지 여부
+    """
+
+    def __init__(self, ttl=REFERENCE_TTL):
+        self.ttl = ttl
+        self.listening = False
+        self._values = {}  # {테이블명: (가져온 시간, 값)}
+        self._generations = {}  # {테이블명: invalidate된 횟수} (가져오는 동안 invalidate되면 캐시하지 않기 위함)
+        self._epoch = 0  # 전체 invalidate된 횟수
+        self._callbacks = {}  # {테이블명: [변경 시 호출할 함수, ...]}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_pid = None
+
+
+    def get(self, name, loader):
+        """캐시된 값을 반환한다 (없거나 만료됐으면 loader()로 가져와서 캐시)
+
+        Args:
+            name(str): 테이블명 (알림의 payload와 같은 이름)
+            loader(function): 값을 가져오는 함수
+
+        Returns:
+            loader의 반환값
+        """
+        self.start_listener()
+
+        with self._lock:
+            cached = self._values.get(name)
+            if cached is not None and time.monotonic() - cached[0] < self.ttl:
+                return cached[1]
+            generation = (self._epoch, self._generations.get(name, 0))
+
+        # loader는 lock 밖에서 실행하므로, 그 사이 변경 알림이 오면 가져온 값은 이전 값일 수 있음 > 반환만 하고 캐시하지 않음
+        value = loader()
+        with self._lock:
+            if generation == (self._epoch, self._generations.get(name, 0)):
+                self._values[name] = (time.monotonic(), value)
+        return value
+
+
+    def invalidate(self, name=None):
+        """캐시를 비운다
+
+        Args:
+            name(str): 비울 테이블명 | Default: None (전체)
+        """
+        with self._lock:
+            if name is None:
+                names = list(self._values) + list(self._callbacks)
+                self._values = {}
+                self._epoch += 1
+            else:
+                names = [name]
+                self._values.pop(name, None)
+                self._generations[name] = self._generations.get(name, 0) + 1
+            callbacks = [callback for n in set(names) for callback in self._callbacks.get(n, [])]
+
+        for callback in callbacks:
+            callback()
+
+
+    def subscribe(self, name, callback):
+        """name 테이블의 캐시가 비워질 때 호출할 함수 등록 (다른 모듈의 자체 캐시를 함께 비우는 용도)"""
+        with self._lock:
+            self._callbacks.setdefault(name, []).append(callback)
+
+
+    def start_listener(self):
+        """변경 알림을 받는 스레드를 시작 (이미 실행 중이면 무시, fork된 자식 프로세스에서는 다시 시작)"""
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            self._values = {}  # fork 전 부모의 캐시는 알림을 못 받았을 수 있으므로 비움
+            self._epoch += 1
+            self._listener = threading.Thread(target=self._listen, name="reference-cache-listener", daemon=True)
+            self._listener.start()
+
+
+    def _listen(self):
+        """LISTEN 커넥션을 유지하며 알림이 오면 캐시를 비운다 (끊기면 재접속, 그 사이에는 ttl로만 갱신)"""
+        while True:
+            conn = None
+            try:
+                conn = psql.create_connection("default")
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {NOTIFY_CHANNEL};")
+                self.listening = True
+                self.invalidate()  # 알림을 받지 못한 사이의 변경 반영
+
+                while True:
+                    if select.select([conn], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                        # 알림이 없어도 커넥션 상태 확인
+                        with conn.cursor() as cur:
+                            cur.execute("SELECT 1;")
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.invalidate(notify.payload or None)
+
+            except Exception as e:
+                print(f"# reference cache listener error - {e}")
+            finally:
+                self.listening = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            time.sleep(LISTEN_RETRY_SECONDS)
+
+
+# 프로세스 공용 캐시
+reference_cache = ReferenceCache()
@@ -0,0 +1,77 @@
+import os
+import math
+
+
+# 컨테이너의 CPU 할당량(docker run --cpus, k8s limits.cpu)은 os.cpu_count()에 반영되지 않으므로 cgroup에서 직접 읽음
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_v2_path():
+    """/proc/self/cgroup에서 현재 프로세스의 cgroup v2 경로 (eg. "/" 또는 "/system.slice/docker-...scope")"""
+    content = _read("/proc/self/cgroup") or ""
+    for line in content.splitlines():
+        if line.startswith("0::"):
+            return line[3:] or "/"
+    return None
+
+
+def get_cpu_quota():
+    """cgroup의 CPU 할당량을 코어 수로 반환한다 (제한이 없으면 None)
+    - cgroup v2: cpu.max ("quota period" or "max period")
+    - cgroup v1: cpu.cfs_quota_us / cpu.cfs_period_us (quota -1이면 제한 없음)
+
+    Returns:
+        float: 할당된 코어 수 (eg. 1.5) | None
+    """
+    # cgroup v2 (컨테이너 안에서는 보통 CGROUP_ROOT/cpu.max, 호스트에서는 프로세스의 cgroup 경로 아래)
+    v2_path = _cgroup_v2_path()
+    candidates = [os.path.join(CGROUP_ROOT, "cpu.max")]
+    if v2_path and v2_path != "/":
+        candidates.insert(0, os.path.join(CGROUP_ROOT, v2_path.lstrip("/"), "cpu.max"))
+    for path in candidates:
+        content = _read(path)
+        if content:
+            quota, _, period = content.partition(" ")
+            if quota == "max":
+                return None
+            return int(quota) / int(period or 100000)
+
+    # cgroup v1
+    for cpu_dir in ("cpu,cpuacct", "cpu"):
+        quota = _read(os.path.join(CGROUP_ROOT, cpu_dir, "cpu.cfs_quota_us"))
+        period = _read(os.path.join(CGROUP_ROOT, cpu_dir, "cpu.cfs_period_us"))
+        if quota is not None and period:
+            return None if int(quota) <= 0 else int(quota) / int(period)
+    return None
+
+
+def get_cpu_count():
+    """이 프로세스가 실제로 사용할 수 있는 코어 수 (cpuset/affinity와 cgroup 할당량 중 작은 값, 할당량은 올림)
+
+    Returns:
+        int: 1 이상의 코어 수
+    """
+    try:
+        count = len(os.sched_getaffinity(0))  # cpuset (docker run --cpuset-cpus)
+    except AttributeError:
+        count = os.cpu_count() or 1
+
+    quota = get_cpu_quota()
+    if quota is not None:
+        count = min(count, math.ceil(quota))
+    return max(1, count)
+
+
+
+if __name__ == "__main__":
+    # 직접 실행 시 확인 (eg. docker run --cpus 2.5 ... python -m utils.cpu)
+    print(f"## os.cpu_count: {os.cpu_count()} / quota: {get_cpu_quota()} / usable: {get_cpu_count()}")
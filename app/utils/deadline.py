@@ -0,0 +1,153 @@
+import time
+import asyncio
+import contextvars
+from contextlib import contextmanager
+
+
+# 현재 실행 흐름(스레드, asyncio task)에 적용되는 Deadline
+# - asyncio task는 생성 시점의 값을 물려받고, 스레드/executor에는 wrap()으로 넘김
+_current = contextvars.ContextVar("deadline", default=None)
+
+
+
+class DeadlineExceeded(TimeoutError):
+    # 작업 시간(예산)을 초과했을 때 발생 (내장 TimeoutError이므로 기존의 except TimeoutError에서 함께 처리됨)
+    pass
+
+
+
+class Deadline():
+    """작업 하나(배치, 요청 등)에 허용된 만료 시각
+    - signal(SIGALRM)처럼 실행 중인 코드를 강제로 끊지 않고, 각 단계가 check(), timeout(), wait_for()로 남은 시간을 확인함
+        - 따라서 DB 쓰기 도중에는 중단되지 않고, 다음 요청/파싱을 시작하기 전에 DeadlineExceeded가 발생함
+    - 안쪽 scope의 만료 시각은 바깥 scope보다 늦을 수 없음 (요청 예산은 배치의 남은 시간으로 잘림)
+
+    Attributes:
+        name(str): 출력용 이름 (eg. "news batch")
+        expires(float): 만료 시각 (time.monotonic 기준)
+        parent(Deadline): 바깥 Deadline | None
+    """
+
+    def __init__(self, seconds, name="deadline", parent=None):
+        """
+        Args:
+            seconds(float): 지금부터 허용할 시간(초) (None일 경우 바깥 Deadline만 적용)
+            name(str): 출력용 이름
+            parent(Deadline): 바깥 Deadline | Default: None
+        """
+        self.name = name
+        self.parent = parent
+        self.expires = float("inf") if seconds is None else time.monotonic() + seconds
+        if parent is not None:
+            self.expires = min(self.expires, parent.expires)
+
+
+    def remaining(self):
+        """남은 시간(초) (만료 시 0, 제한이 없으면 inf)"""
+        return max(0.0, self.expires - time.monotonic())
+
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+    def check(self):
+        """만료됐으면 DeadlineExceeded 발생 (각 단계를 시작하기 전에 호출)"""
+        if self.expired():
+            raise DeadlineExceeded(f"{self.name} deadline exceeded")
+
+
+    def timeout(self, cap=None):
+        """요청 라이브러리에 넘길 timeout을 남은 시간으로 자른다 (만료됐으면 DeadlineExceeded 발생)
+
+        Args:
+            cap(float or tuple): 원래 timeout (eg. (connect, read)) | Default: None (남은 시간 그대로)
+
+        Returns:
+            float or tuple: cap과 같은 형태로, 각 값이 남은 시간을 넘지 않도록 한 timeout (제한이 없으면 cap 그대로)
+        """
+        self.check()
+        remaining = self.remaining()
+        if remaining == float("inf"):
+            return cap
+        if cap is None:
+            return remaining
+        if isinstance(cap, tuple):
+            return tuple(remaining if c is None else min(c, remaining) for c in cap)
+        return min(cap, remaining)
+
+
+    def __repr__(self):
+        return f"<Deadline {self.name} remaining={self.remaining():.2f}s>"
+
+
+
+def current():
+    """현재 실행 흐름의 Deadline (없으면 None)"""
+    return _current.get()
+
+
+@contextmanager
+def scope(seconds, name="deadline"):
+    """with 블록 안에서 seconds초 예산의 Deadline을 적용한다 (바깥 Deadline이 있으면 둘 중 먼저 만료되는 시각)
+
+    Args:
+        seconds(float): 허용할 시간(초) (None일 경우 바깥 Deadline만 적용)
+        name(str): 출력용 이름
+
+    Returns:
+        Deadline: with 블록 안에서 적용되는 Deadline
+    """
+    deadline = Deadline(seconds, name=name, parent=current())
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def remaining():
+    """현재 Deadline의 남은 시간(초) (Deadline이 없으면 inf)"""
+    deadline = current()
+    return float("inf") if deadline is None else deadline.remaining()
+
+
+def check():
+    """현재 Deadline이 만료됐으면 DeadlineExceeded 발생 (Deadline이 없으면 무시)"""
+    deadline = current()
+    if deadline is not None:
+        deadline.check()
+
+
+def timeout(cap=None):
+    """현재 Deadline의 남은 시간으로 자른 timeout (Deadline.timeout 참고, Deadline이 없으면 cap 그대로)"""
+    deadline = current()
+    return cap if deadline is None else deadline.timeout(cap)
+
+
+async def wait_for(awaitable):
+    """현재 Deadline 안에서 awaitable을 기다린다 (만료 시 awaitable을 취소하고 DeadlineExceeded 발생)
+    - 응답이 멈춘 소켓도 남은 시간이 지나면 취소되므로 배치 전체가 멈추지 않음
+    """
+    deadline = current()
+    if deadline is None or deadline.remaining() == float("inf"):
+        return await awaitable
+
+    deadline.check()
+    try:
+        return await asyncio.wait_for(awaitable, timeout=deadline.remaining())
+    except TimeoutError as e:
+        if isinstance(e, DeadlineExceeded):
+            raise
+        raise DeadlineExceeded(f"{deadline.name} deadline exceeded") from None
+
+
+def wrap(func):
+    """현재 Deadline을 다른 스레드(ThreadPoolExecutor, run_in_executor)에서도 적용되도록 func를 감싼다
+    - 스레드는 contextvars를 물려받지 않으므로, 감싸는 시점의 context를 호출마다 복사해서 실행함
+    """
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
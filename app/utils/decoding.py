@@ -0,0 +1,173 @@
+import re
+import codecs
+import threading
+from urllib.parse import urlsplit
+
+from charset_normalizer import from_bytes
+
+
+# 항상 UTF-8로 응답하는 것이 확인된 호스트 (헤더/meta를 보지 않고 UTF-8 검증만 함)
+UTF8_HOSTS = {"n.news.naver.com"}
+
+# 브라우저와 같이 euc-kr 라벨은 상위 집합인 cp949로 디코딩 (euc-kr에 없는 확장 한글이 섞여 있어도 깨지지 않도록)
+CHARSET_ALIASES = {"euc-kr": "cp949", "ks_c_5601-1987": "cp949", "x-windows-949": "cp949"}
+
+META_SNIFF_BYTES = 4096  # meta charset을 찾는 앞부분 바이트 수
+_HEADER_CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+
+# 인코딩을 정한 방법
+# - utf8_fast: UTF8_HOSTS이거나 헤더가 UTF-8 (검증만)
+# - header: 헤더의 charset (UTF-8 외)
+# - meta: html 앞부분의 <meta charset>
+# - utf8_valid: 선언은 없지만 UTF-8로 올바름
+# - detected: 선언이 없거나 틀려서 charset_normalizer로 전체 본문을 검사함 (느림)
+# - replaced: 검사로도 정하지 못해 UTF-8로 디코딩하며 깨진 문자를 대체함
+METHODS = ("utf8_fast", "header", "meta", "utf8_valid", "detected", "replaced")
+
+
+
+class DecodeStats():
+    """인코딩을 정한 방법별 응답 수 (스레드 안전)
+
+    Attributes:
+        counts(dict): {방법: 응답 수} (METHODS 참고)
+    """
+
+    def __init__(self):
+        self.counts = dict.fromkeys(METHODS, 0)
+        self._lock = threading.Lock()
+
+
+    def record(self, method):
+        with self._lock:
+            self.counts[method] += 1
+
+
+    def summary(self, reset=False):
+        """출력용 한 줄 요약 (0인 방법 제외)"""
+        with self._lock:
+            counts = self.counts
+            if reset:
+                self.counts = dict.fromkeys(METHODS, 0)
+        total = sum(counts.values())
+        return f"{total} responses / " + ", ".join(f"{method} {n}" for method, n in counts.items() if n)
+
+
+# 프로세스 공용 통계
+shared_stats = DecodeStats()
+
+
+
+def normalize_charset(charset):
+    """charset 라벨을 파이썬 코덱 이름으로 변환 (알 수 없는 라벨은 None)"""
+    if not charset:
+        return None
+    charset = charset.strip().lower()
+    charset = CHARSET_ALIASES.get(charset, charset)
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return None
+
+
+def _is_utf8(content):
+    try:
+        content.decode("utf-8")
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _can_decode(content, encoding):
+    try:
+        content.decode(encoding)
+    except (UnicodeDecodeError, LookupError):
+        return False
+    return True
+
+
+def sniff_meta_charset(content):
+    """html 앞부분(META_SNIFF_BYTES)의 <meta charset>, <meta http-equiv content="...charset=..."> 값 (없으면 None)"""
+    match = _META_CHARSET.search(content[:META_SNIFF_BYTES])
+    return normalize_charset(match.group(1).decode("ascii", "ignore")) if match else None
+
+
+def resolve_declared_encoding(content_type=None, host=None):
+    """본문을 받기 전에 헤더(와 호스트)만으로 인코딩을 정한다 (본문을 받는 대로 파싱할 때 사용, 본문 검증은 호출한 쪽에서)
+
+    Args:
+        content_type(str): Content-Type 헤더 | Default: None
+        host(str): 응답 호스트 (UTF8_HOSTS 확인용) | Default: None
+
+    Returns:
+        str: 파이썬 코덱 이름 | None (선언이 없음 > 본문을 모두 받은 뒤 resolve_encoding으로)
+        str: 인코딩을 정한 방법 ("utf8_fast" or "header") | None
+    """
+    match = _HEADER_CHARSET.search(content_type or "")
+    header_charset = normalize_charset(match.group(1)) if match else None
+    if host in UTF8_HOSTS or header_charset == "utf-8":
+        return "utf-8", "utf8_fast"
+    if header_charset:
+        return header_charset, "header"
+    return None, None
+
+
+def resolve_encoding(content, content_type=None, host=None, stats=None):
+    """응답 본문(bytes)의 인코딩을 정한다 (requests의 response.text처럼 본문 전체를 검사하는 것은 마지막 수단)
+
+    Args:
+        content(bytes): 응답 본문
+        content_type(str): Content-Type 헤더 | Default: None
+        host(str): 응답 호스트 (UTF8_HOSTS 확인용) | Default: None
+        stats(DecodeStats): 방법을 기록할 객체 | Default: None (shared_stats)
+
+    Returns:
+        str: 파이썬 코덱 이름 (eg. "utf-8", "cp949")
+        str: 인코딩을 정한 방법 (METHODS 참고)
+    """
+    stats = stats or shared_stats
+    match = _HEADER_CHARSET.search(content_type or "")
+    header_charset = normalize_charset(match.group(1)) if match else None
+
+    # 1) 빠른 경로: UTF-8로 알려진 호스트이거나 헤더가 UTF-8 > 검증만
+    if (host in UTF8_HOSTS or header_charset == "utf-8") and _is_utf8(content):
+        method, encoding = "utf8_fast", "utf-8"
+
+    # 2) 헤더, meta에 선언된 charset
+    elif header_charset and header_charset != "utf-8" and _can_decode(content, header_charset):
+        method, encoding = "header", header_charset
+    elif (meta_charset := sniff_meta_charset(content)) and _can_decode(content, meta_charset):
+        method, encoding = "meta", meta_charset
+
+    # 3) 선언이 없거나 틀린 경우
+    elif _is_utf8(content):
+        method, encoding = "utf8_valid", "utf-8"
+    else:
+        best = from_bytes(content).best()
+        encoding = normalize_charset(best.encoding) if best is not None else None
+        method = "detected" if encoding else "replaced"
+        encoding = encoding or "utf-8"
+
+    stats.record(method)
+    return encoding, method
+
+
+def get_body(response, stats=None):
+    """응답 객체의 본문(bytes)과 인코딩을 반환한다 (response.text 대신 사용, 파서에 bytes를 그대로 넘기기 위함)
+
+    Args:
+        response(requests.Response or httpx.Response): 본문을 모두 받은 응답
+
+    Returns:
+        bytes: 본문
+        str: 인코딩 (resolve_encoding 참고)
+    """
+    content = response.content
+    encoding, _ = resolve_encoding(content, response.headers.get("content-type"), urlsplit(str(response.url)).netloc, stats)
+    return content, encoding
+
+
+def decode(content, encoding):
+    """resolve_encoding으로 정한 인코딩으로 디코딩 (깨진 문자는 대체)"""
+    return content.decode(encoding, errors="replace")
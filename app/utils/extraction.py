@@ -0,0 +1,181 @@
+import time
+import threading
+
+import lxml.html
+from lxml import etree
+from cssselect import HTMLTranslator
+
+from utils import decoding
+
+
+# BeautifulSoup의 .text와 같이 script, style, template 안의 문자열과 주석은 제외한 텍스트 노드
+_TEXT_XPATH = etree.XPath("descendant-or-self::text()[not(ancestor::script or ancestor::style or ancestor::template)]")
+
+
+_parsers = threading.local()  # 스레드별 UTF-8 HTMLParser (lxml 파서는 스레드 간에 공유하지 않음)
+
+
+
+def _get_utf8_parser():
+    parser = getattr(_parsers, "utf8", None)
+    if parser is None:
+        parser = _parsers.utf8 = lxml.html.HTMLParser(encoding="utf-8")
+    return parser
+
+
+def get_text(element):
+    """element의 텍스트 (BeautifulSoup의 element.text와 같은 결과)"""
+    return "".join(_TEXT_XPATH(element))
+
+
+def parse_html(html, encoding=None):
+    """html을 lxml 트리로 파싱한다 (빈 문서일 경우 None)
+    - bytes와 인코딩(decoding.resolve_encoding)을 받으면, UTF-8은 str로 바꾸지 않고 lxml에 그대로 넘김
+
+    Args:
+        html(str or bytes): 페이지 html
+        encoding(str): html이 bytes일 때의 인코딩 | Default: None (lxml이 meta 등으로 판단)
+
+    Returns:
+        lxml.html.HtmlElement: 문서의 루트(html) element | None
+    """
+    if isinstance(html, bytes) and encoding is not None:
+        if encoding == "utf-8":
+            try:
+                return lxml.html.document_fromstring(html, parser=_get_utf8_parser())
+            except etree.ParserError:
+                return None
+        html = decoding.decode(html, encoding)  # 그 외 인코딩은 파이썬 코덱으로 디코딩 (cp949 등 libxml2가 모를 수 있는 이름 대비)
+
+    try:
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # 인코딩 선언(<?xml encoding=...?>)이 있는 str은 lxml이 받지 않으므로 bytes로 다시 파싱
+        if isinstance(html, str):
+            return parse_html(html.encode("utf-8"))
+        raise
+    except etree.ParserError:
+        return None  # 빈 문서 (BeautifulSoup에서는 모든 select 결과가 빈 리스트)
+
+
+
+class ExtractionSpec():
+    """필드별 CSS 선택자를 한번만 XPath로 컴파일해두고, 페이지마다 lxml 트리에서 값을 추출하는 객체
+    - BeautifulSoup(html, "lxml") + soup.select로 추출한 결과와 같은 값을 반환함
+        - 선택된 element가 없으면 None, attribute가 없으면 KeyError (bs4의 element[attribute]와 같음)
+
+    Attributes:
+        fields(list): [(필드명, CSS 선택자, attribute, 전체 여부, 후처리 함수), ...]
+            - attribute: "text"일 경우 텍스트, 그 외에는 해당 attribute 값 (앞뒤 공백 제거)
+            - 전체 여부: False일 경우 첫번째 element의 값, True일 경우 모든 element의 값 리스트
+            - 후처리 함수: element가 있을 때 값에 적용할 함수 (eg. 문자열 > datetime) | None
+    """
+
+    def __init__(self, fields):
+        """
+        Args:
+            fields(list): Attributes의 fields 참고
+        """
+        self.fields = fields
+        translator = HTMLTranslator()
+        self._compiled = [(name, etree.XPath(translator.css_to_xpath(selector)), attribute, many, convert)
+                          for name, selector, attribute, many, convert in fields]
+
+
+    def _value(self, element, attribute):
+        value = get_text(element) if attribute == "text" else element.attrib[attribute]
+        return value.strip()
+
+
+    def extract(self, html, encoding=None):
+        """html에서 모든 필드를 추출한다
+
+        Args:
+            html(str or bytes or lxml element): 페이지 html (이미 파싱한 트리도 가능)
+            encoding(str): html이 bytes일 때의 인코딩 (parse_html 참고) | Default: None
+
+        Returns:
+            dict: {필드명: 값}
+        """
+        root = html if isinstance(html, etree._Element) else parse_html(html, encoding)
+
+        result = {}
+        for name, xpath, attribute, many, convert in self._compiled:
+            elements = xpath(root) if root is not None else []
+            if not elements:
+                result[name] = None
+                continue
+
+            if many:
+                value = [self._value(element, attribute) for element in elements]
+            else:
+                value = self._value(elements[0], attribute)
+            if convert is not None:
+                value = convert(value)
+            result[name] = value
+        return result
+
+
+
+class StreamingExtraction():
+    """응답 본문을 받는 대로 조금씩 파싱하다가, 필드가 있는 element들이 모두 닫히면 더 받지 않아도 된다고 알려주는 객체 (페이지 하나용)
+    - lxml의 HTMLPullParser에 chunk를 넘기고, stop_ids의 element가 닫히는 이벤트만 확인함
+    - 중간에 멈춘 경우 아직 열려 있는 element는 닫힌 것으로 처리한 트리에서 추출하므로,
+      spec의 필드가 모두 stop_ids element 안(또는 그 앞)에 있어야 끝까지 파싱한 결과와 같음
+    - 끝까지 받아도 stop_ids가 없는 페이지(에러 페이지 등)는 전체를 파싱한 결과와 같음
+
+    Attributes:
+        spec(ExtractionSpec): 추출할 필드
+        done(bool): stop_ids의 element가 모두 닫혔는지 여부 (True 이후에는 feed하지 않아도 됨)
+        bytes_fed(int): 파서에 넘긴 바이트(str일 경우 문자) 수
+        parse_seconds(float): feed, extract에 걸린 누적 시간(초)
+    """
+
+    def __init__(self, spec, stop_ids, tag=None, encoding=None):
+        """
+        Args:
+            spec(ExtractionSpec): 추출할 필드
+            stop_ids(list): 모두 닫히면 멈출 element의 id 리스트
+            tag(str): stop_ids element의 태그 이름 (이벤트를 해당 태그로만 제한) | Default: None (모든 태그)
+            encoding(str): bytes로 넘길 때의 인코딩 | Default: None (str로 넘기거나 lxml이 meta 등으로 판단)
+        """
+        self.spec = spec
+        self.done = False
+        self.bytes_fed = 0
+        self.parse_seconds = 0.0
+        self._pending = set(stop_ids)
+        self._parser = etree.HTMLPullParser(events=("end",), tag=tag, encoding=encoding)
+
+
+    def feed(self, chunk):
+        """본문 일부를 파싱한다
+
+        Args:
+            chunk(bytes or str): 본문 일부 (한 페이지 안에서는 같은 타입으로)
+
+        Returns:
+            bool: stop_ids의 element가 모두 닫혔는지 여부 (done)
+        """
+        start = time.perf_counter()
+        self._parser.feed(chunk)
+        for _, element in self._parser.read_events():
+            self._pending.discard(element.get("id"))
+        self.done = not self._pending
+        self.bytes_fed += len(chunk)
+        self.parse_seconds += time.perf_counter() - start
+        return self.done
+
+
+    def extract(self):
+        """지금까지 넘긴 본문으로 트리를 닫고 모든 필드를 추출한다 (ExtractionSpec.extract와 같은 dict)"""
+        start = time.perf_counter()
+        try:
+            root = self._parser.close()
+        except etree.XMLSyntaxError:
+            root = None  # 빈 문서
+        if root is None:
+            result = {field[0]: None for field in self.spec.fields}
+        else:
+            result = self.spec.extract(root)
+        self.parse_seconds += time.perf_counter() - start
+        return result
@@ -0,0 +1,121 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils import utils, cpu
+
+
+# 파싱 프로세스 수 기본값 (info.config의 parse_processes로 덮어씀, 0일 경우 컨테이너의 CPU 할당량만큼)
+PARSE_PROCESSES = 0
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+
+class ParsePool():
+    """html 파싱 같은 CPU 작업을 요청(네트워크)과 분리해 별도 프로세스들에서 실행하는 객체
+    - 스레드로는 GIL 때문에 한 코어만 사용하므로, 코어 수만큼의 프로세스에 나눠서 실행함
+    - 프로세스 수는 cgroup의 CPU 할당량(utils.cpu)에 맞춤 (1개일 경우 프로세스 대신 스레드 하나에서 실행)
+    - 부모 프로세스의 스레드(이벤트 루프, heartbeat 등)를 복제하지 않도록 forkserver로 프로세스를 만듦
+    - 실행할 함수는 프로세스로 넘길 수 있도록 모듈 최상위 함수여야 하고, 인자와 결과는 pickle 가능한 값이어야 함
+      (eg. news_content_scraper.parse_news_body: 본문 bytes, Content-Type, 호스트 > dict, 인코딩 판단 방법)
+
+    Attributes:
+        processes(int): 파싱 프로세스 수
+    """
+
+    def __init__(self, processes=None):
+        """
+        Args:
+            processes(int): 파싱 프로세스 수 | Default: None (info.config의 parse_processes, 0일 경우 utils.cpu.get_cpu_count())
+        """
+        if processes is None:
+            processes = utils.get_config("parse_processes", set_int=True, default=PARSE_PROCESSES)
+        self.processes = processes if processes > 0 else cpu.get_cpu_count()
+        self._executor = None
+        self._lock = threading.Lock()
+
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.processes <= 1:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="parse")
+                else:
+                    context = multiprocessing.get_context("forkserver")
+                    self._executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=context)
+            return self._executor
+
+
+    def _reset(self, executor):
+        """프로세스가 비정상 종료되어(OOM 등) 풀을 쓸 수 없게 된 경우 다음 호출 시 다시 생성"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+
+    async def run(self, func, *args):
+        """func(*args)를 파싱 프로세스에서 실행하고 결과를 반환한다 (이벤트 루프 안에서 await로 사용)
+
+        Args:
+            func(function): 모듈 최상위 함수
+            *args: func의 인자
+
+        Returns:
+            func의 반환값
+
+        Raises:
+            BrokenProcessPool: 파싱 프로세스가 비정상 종료된 경우 (풀은 다음 호출 시 다시 생성됨)
+        """
+        executor = self._get_executor()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise
+
+
+    def map(self, func, *iterables):
+        """executor.map과 같음 (벤치마크 등 동기 코드용, 프로세스마다 여러 개씩 묶어서 넘김)
+
+        Returns:
+            list: iterables 순서대로 func의 반환값
+        """
+        executor = self._get_executor()
+        iterables = [list(iterable) for iterable in iterables]
+        chunksize = max(1, len(iterables[0]) // (self.processes * 4)) if iterables else 1
+        if self.processes <= 1:
+            chunksize = 1  # ThreadPoolExecutor는 chunksize를 사용하지 않음
+        return list(executor.map(func, *iterables, chunksize=chunksize))
+
+
+    def close(self):
+        """파싱 프로세스 종료"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+
+def get_parse_pool():
+    """프로세스에서 공유하는 ParsePool을 반환한다 (처음 호출 시 info.config 설정으로 생성)
+
+    Returns:
+        ParsePool: 공용 파싱 풀
+    """
+    global _shared_pool
+
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ParsePool()
+        return _shared_pool
@@ -0,0 +1,44 @@
+import signal
+import threading
+
+
+# 종료 요청(SIGTERM, SIGINT)을 받았는지 여부
+_requested = threading.Event()
+
+
+
+def _handle_signal(signum, frame):
+    """종료 요청 시 플래그만 설정하고, 실행 중인 작업은 중단하지 않음 (각 루프에서 확인 후 정리하고 종료)
+    - 두번째 요청 시에는 바로 종료 (KeyboardInterrupt)
+    """
+    if _requested.is_set():
+        raise KeyboardInterrupt(f"signal {signum}")
+    print(f"> shutdown requested (signal {signum}) - finishing in-flight work")
+    _requested.set()
+
+
+def install():
+    """SIGTERM, SIGINT를 받으면 바로 죽지 않고 종료 요청 상태가 되도록 설정 (메인 스레드에서 호출)
+    - docker stop은 SIGTERM 후 기본 10초 뒤 SIGKILL을 보내므로, 진행 중인 배치가 끝날 수 있도록 --stop-timeout을 늘려서 실행
+    """
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+
+
+def request():
+    """종료 요청 (시그널 없이 코드에서 종료할 때)"""
+    _requested.set()
+
+
+def is_requested():
+    """종료 요청을 받았는지 여부 (True일 경우 새 작업을 선점하지 않음)"""
+    return _requested.is_set()
+
+
+def wait(seconds):
+    """seconds초 동안 대기하되, 종료 요청을 받으면 바로 반환
+
+    Returns:
+        bool: 종료 요청을 받았는지 여부
+    """
+    return _requested.wait(seconds)
@@ -0,0 +1,474 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import time
+import asyncio
+import threading
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from utils import utils, deadline
+
+
+# 기본 설정 (info.config의 http_connect_timeout, http_read_timeout, http_request_budget, http_pool_maxsize로 덮어씀)
+CONNECT_TIMEOUT = 5  # TCP/TLS 연결까지 기다리는 시간(초)
+READ_TIMEOUT = 20  # 응답 데이터를 기다리는 시간(초)
+REQUEST_BUDGET = 30  # 요청 하나에 허용하는 전체 시간(초) (리다이렉트, 본문 수신 포함 / 배치의 남은 시간으로 다시 잘림)
+DEADLINE_GRACE = 1  # AsyncTransport.run에서 Deadline 만료 후 코루틴이 스스로 정리하기를 기다리는 시간(초)
+POOL_MAXSIZE = 10  # 호스트별로 유지하는 keep-alive 커넥션 수
+HTTP_VERSION = "1.1"  # 기사 페이지 요청에 사용할 HTTP 버전 ("1.1" or "2", info.config의 http_version)
+STREAM_CHUNK_SIZE = 16 * 1024  # get_streamed에서 본문을 넘기는 단위(바이트, 압축 해제 후)
+# AsyncTransport(httpx)가 보내는 Accept-Encoding (httpx 0.25는 zstd를 풀지 못하므로, zstandard가 설치되면 zstd가 붙는 urllib3의 값을 쓰지 않음)
+ASYNC_ACCEPT_ENCODING = "gzip, deflate, br"
+
+_shared_transport = None
+_shared_async_transport = None
+_shared_transport_lock = threading.Lock()
+
+
+
+class TransportStats():
+    """호스트별 요청 수, 바이트, 소요 시간을 누적하는 객체 (스레드 안전)
+
+    Attributes:
+        hosts(dict): {host: {"requests": 요청 수, "bytes": 압축 해제 후 바이트, "wire_bytes": 전송된(압축된) 바이트,
+                             "elapsed": 요청 시작부터 본문 수신 완료까지 누적 시간(초), "errors": 실패한 요청 수,
+                             "versions": {HTTP 버전: 요청 수}}}
+    """
+
+    def __init__(self):
+        self.hosts = {}
+        self._lock = threading.Lock()
+
+
+    def _host_stats(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = {"requests": 0, "bytes": 0, "wire_bytes": 0, "elapsed": 0.0, "errors": 0, "versions": {}}
+        return self.hosts[host]
+
+
+    def record(self, host, n_bytes, wire_bytes, elapsed, http_version="HTTP/1.1"):
+        """요청 하나의 결과를 기록"""
+        with self._lock:
+            stats = self._host_stats(host)
+            stats["requests"] += 1
+            stats["bytes"] += n_bytes
+            stats["wire_bytes"] += wire_bytes
+            stats["elapsed"] += elapsed
+            stats["versions"][http_version] = stats["versions"].get(http_version, 0) + 1
+
+
+    def record_error(self, host):
+        """실패한 요청을 기록"""
+        with self._lock:
+            self._host_stats(host)["errors"] += 1
+
+
+    def snapshot(self, reset=False):
+        """현재까지의 통계를 복사해서 반환한다
+
+        Args:
+            reset(bool): True일 경우 반환 후 통계를 초기화함 (구간별 통계용)
+
+        Returns:
+            dict: hosts와 같은 형태
+        """
+        with self._lock:
+            snapshot = {host: dict(stats, versions=dict(stats["versions"])) for host, stats in self.hosts.items()}
+            if reset:
+                self.hosts = {}
+        return snapshot
+
+
+    def summary(self, reset=False):
+        """출력용 한 줄 요약"""
+        parts = []
+        for host, stats in self.snapshot(reset).items():
+            n = stats["requests"]
+            avg_ms = stats["elapsed"] / n * 1000 if n else 0
+            versions = ", ".join(f"{v} {c}" for v, c in stats["versions"].items())
+            parts.append(f"{host}: {n} req ({versions}) / {stats['bytes'] / 1024:.0f}KB (wire {stats['wire_bytes'] / 1024:.0f}KB) / avg {avg_ms:.0f}ms / err {stats['errors']}")
+        return " | ".join(parts)
+
+
+# 모든 전송 객체가 함께 기록하는 프로세스 공용 통계
+shared_stats = TransportStats()
+
+
+
+class Transport():
+    """스크래퍼들이 공유하는 HTTP 전송 객체
+    - requests.Session으로 호스트별 keep-alive 커넥션을 재사용함 (매 요청마다 TCP+TLS 핸드셰이크 하지 않도록)
+    - 연결/읽기 timeout을 항상 지정하고, 요청 예산(request_budget)과 현재 Deadline(배치 등)의 남은 시간으로 자름
+    - 설치된 디코더(gzip, deflate, br 등)에 맞춰 Accept-Encoding을 보냄
+    - 요청마다 바이트와 소요 시간을 stats에 기록함
+
+    Attributes:
+        session(requests.Session): 커넥션 풀을 가진 세션
+        timeout(tuple): (connect timeout, read timeout)
+        request_budget(float): 요청 하나에 허용하는 전체 시간(초)
+        stats(TransportStats): 호스트별 통계
+    """
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, pool_maxsize=POOL_MAXSIZE,
+                 request_budget=REQUEST_BUDGET, stats=None):
+        """세션과 커넥션 풀 초기화
+
+        Args:
+            connect_timeout(float): 연결 timeout(초)
+            read_timeout(float): 읽기 timeout(초)
+            pool_maxsize(int): 호스트별 keep-alive 커넥션 수 (동시 요청 수보다 작으면 초과분은 사용 후 닫힘)
+            request_budget(float): 요청 하나에 허용하는 전체 시간(초)
+            stats(TransportStats): 통계를 기록할 객체 | Default: None (shared_stats)
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.request_budget = request_budget
+        self.stats = stats or shared_stats
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        """GET 요청 후 본문까지 모두 받은 응답을 반환한다
+        - requests의 timeout은 소켓 대기 시간 단위이므로, 연결/읽기 timeout을 요청 예산의 남은 시간으로 잘라서 넘김
+        - 현재 Deadline이 이미 만료됐으면 요청하지 않고 DeadlineExceeded 발생
+
+        Args:
+            url(str): 요청할 url
+            params(dict): 쿼리 파라미터
+            headers(dict): 추가 헤더 (User-Agent 등)
+            timeout(float or tuple): 이번 요청에만 사용할 timeout | Default: None (객체의 timeout 사용)
+
+        Returns:
+            requests.Response: 응답 (content를 이미 읽은 상태)
+        """
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        try:
+            with deadline.scope(self.request_budget, name=f"request {host}") as request_deadline:
+                try:
+                    response = self.session.get(url, params=params, headers=headers,
+                                                timeout=request_deadline.timeout(timeout or self.timeout))
+                    content = response.content
+                except requests.Timeout as e:
+                    # 남은 시간으로 잘린 timeout에 걸린 경우 > 예산 초과로 처리
+                    if request_deadline.expired():
+                        raise deadline.DeadlineExceeded(f"{request_deadline.name} deadline exceeded") from e
+                    raise
+        except (requests.RequestException, deadline.DeadlineExceeded):
+            self.stats.record_error(host)
+            raise
+
+        elapsed = time.perf_counter() - start
+        wire_bytes = response.raw.tell() or len(content)  # 압축된 상태로 받은 바이트 수
+        self.stats.record(host, len(content), wire_bytes, elapsed)
+        return response
+
+
+    def get_streamed(self, url, on_chunk, params=None, headers=None, chunk_size=STREAM_CHUNK_SIZE):
+        """GET 요청 후 본문을 받는 대로 on_chunk에 넘기고, on_chunk가 True를 반환하면 나머지 본문은 받지 않고 응답을 닫는다
+        - 중간에 닫은 HTTP/1.1 커넥션은 keep-alive로 재사용되지 않음 (남은 본문이 소켓에 있으므로)
+        - timeout, 요청 예산, Deadline은 get과 같음 (chunk 사이마다 요청 예산도 확인)
+
+        Args:
+            url(str): 요청할 url
+            on_chunk(function): on_chunk(response, chunk) > bool (True일 경우 그만 받음)
+            params(dict): 쿼리 파라미터
+            headers(dict): 추가 헤더 (User-Agent 등)
+            chunk_size(int): 본문을 넘기는 단위(바이트)
+
+        Returns:
+            requests.Response: 응답 (본문은 on_chunk로만 넘어감, 헤더와 url만 사용)
+            bool: 본문을 끝까지 받기 전에 멈췄는지 여부
+        """
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        n_bytes, stopped = 0, False
+        try:
+            with deadline.scope(self.request_budget, name=f"request {host}") as request_deadline:
+                try:
+                    with self.session.get(url, params=params, headers=headers, stream=True,
+                                          timeout=request_deadline.timeout(self.timeout)) as response:
+                        for chunk in response.iter_content(chunk_size):
+                            n_bytes += len(chunk)
+                            if on_chunk(response, chunk):
+                                stopped = True
+                                break
+                            request_deadline.check()
+                        wire_bytes = response.raw.tell() or n_bytes
+                except requests.Timeout as e:
+                    if request_deadline.expired():
+                        raise deadline.DeadlineExceeded(f"{request_deadline.name} deadline exceeded") from e
+                    raise
+        except (requests.RequestException, deadline.DeadlineExceeded):
+            self.stats.record_error(host)
+            raise
+
+        self.stats.record(host, n_bytes, wire_bytes, time.perf_counter() - start)
+        return response, stopped
+
+
+    def close(self):
+        """세션의 커넥션을 모두 닫음"""
+        self.session.close()
+
+
+
+class AsyncTransport():
+    """httpx.AsyncClient 기반의 비동기 HTTP 전송 객체 (기사 페이지를 동시에 여러 개 요청할 때 사용)
+    - http2=True일 경우 같은 호스트의 요청들을 소수의 커넥션에 HTTP/2 스트림으로 다중화함
+        - 서버가 ALPN으로 h2를 지원하지 않으면 같은 클라이언트에서 HTTP/1.1 keep-alive로 동작함
+        - HTTP/2 프로토콜 에러가 난 요청은 fallback(HTTP/1.1 Transport)으로 한번 더 요청함
+    - 커넥션이 이벤트 루프에 묶이므로, 전용 스레드의 이벤트 루프 하나를 계속 사용함 (배치마다 핸드셰이크 하지 않도록)
+        - 동기 코드에서는 run(coroutine)으로 이 루프에서 실행한 결과를 받음
+    - 요청 하나는 요청 예산(request_budget)과 현재 Deadline 중 먼저 만료되는 시각에 취소됨 (응답이 멈춘 소켓이 배치를 막지 않음)
+
+    Attributes:
+        http2(bool): HTTP/2 사용 여부
+        client(httpx.AsyncClient): 이벤트 루프 스레드에서 생성된 클라이언트
+        fallback(Transport): HTTP/1.1 fallback용 동기 전송 객체
+        stats(TransportStats): 호스트별 통계
+    """
+
+    def __init__(self, http2=True, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, pool_maxsize=POOL_MAXSIZE,
+                 request_budget=REQUEST_BUDGET, verify=True, fallback=None, stats=None):
+        """이벤트 루프 스레드를 시작하고 클라이언트를 생성
+
+        Args:
+            http2(bool): HTTP/2 사용 여부 | Default: True
+            connect_timeout(float): 연결 timeout(초)
+            read_timeout(float): 읽기 timeout(초)
+            pool_maxsize(int): 전체 커넥션 수 상한 (HTTP/2에서는 호스트당 1개로 대부분 충분함)
+            request_budget(float): 요청 하나에 허용하는 전체 시간(초)
+            verify(bool or str): TLS 인증서 검증 (로컬 테스트 서버의 자체 서명 인증서는 CA 파일 경로를 넘김)
+            fallback(Transport): HTTP/2 실패 시 사용할 전송 객체 | Default: None (get_transport())
+            stats(TransportStats): 통계를 기록할 객체 | Default: None (shared_stats)
+        """
+        self.http2 = http2
+        self.request_budget = request_budget
+        self.fallback = fallback
+        self.stats = stats or shared_stats
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-transport", daemon=True)
+        self._thread.start()
+
+        async def create_client():
+            return httpx.AsyncClient(
+                http2=http2, verify=verify, follow_redirects=True,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+                headers={"Accept-Encoding": ASYNC_ACCEPT_ENCODING},
+            )
+        self.client = self.run(create_client())
+
+
+    def run(self, coroutine):
+        """코루틴을 이벤트 루프 스레드에서 실행하고 결과를 기다린다
+        - 호출한 쪽의 Deadline은 코루틴에도 그대로 적용됨 (run_coroutine_threadsafe가 호출 시점의 context를 복사)
+        - 기다리는 중 예외(timeout 등)가 발생하거나 Deadline을 넘기면 실행 중인 코루틴을 취소함
+
+        Args:
+            coroutine: 실행할 코루틴
+
+        Returns:
+            코루틴의 반환값
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        remaining = deadline.remaining()
+        try:
+            # 코루틴 안에서 Deadline을 확인하지 않더라도 만료 후 DEADLINE_GRACE초 안에는 반환
+            return future.result(timeout=None if remaining == float("inf") else remaining + DEADLINE_GRACE)
+        except TimeoutError:
+            if future.done():
+                raise  # 코루틴에서 발생한 에러 (DeadlineExceeded 포함)
+            future.cancel()
+            raise deadline.DeadlineExceeded("async transport run deadline exceeded") from None
+        except BaseException:
+            future.cancel()
+            raise
+
+
+    async def get(self, url, params=None, headers=None):
+        """GET 요청 후 본문까지 모두 받은 응답을 반환한다 (이벤트 루프 안에서 await로 사용)
+        - 요청 예산과 현재 Deadline 중 먼저 만료되는 시각에 요청을 취소하고 DeadlineExceeded 발생
+
+        Args:
+            url(str): 요청할 url
+            params(dict): 쿼리 파라미터
+            headers(dict): 추가 헤더 (User-Agent 등)
+
+        Returns:
+            httpx.Response or requests.Response: 응답 (fallback 시 requests.Response)
+                - 둘 다 str(response.url), response.text, response.content로 사용 가능
+        """
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        try:
+            with deadline.scope(self.request_budget, name=f"request {host}"):
+                response = await deadline.wait_for(self.client.get(url, params=params, headers=headers))
+        except (httpx.RemoteProtocolError, httpx.LocalProtocolError):
+            if not self.http2:
+                self.stats.record_error(host)
+                raise
+            # HTTP/2 연결 문제 > HTTP/1.1 keep-alive로 한번 더 (executor 스레드에도 Deadline 적용)
+            fallback = self.fallback or get_transport()
+            fallback_get = deadline.wrap(lambda: fallback.get(url, params=params, headers=headers))
+            return await asyncio.get_running_loop().run_in_executor(None, fallback_get)
+        except (httpx.HTTPError, deadline.DeadlineExceeded):
+            self.stats.record_error(host)
+            raise
+
+        elapsed = time.perf_counter() - start
+        wire_bytes = response.num_bytes_downloaded or len(response.content)  # 압축된 상태로 받은 바이트 수
+        self.stats.record(host, len(response.content), wire_bytes, elapsed, response.http_version)
+        return response
+
+
+    async def get_streamed(self, url, on_chunk, params=None, headers=None):
+        """Transport.get_streamed의 비동기 버전 (이벤트 루프 안에서 await로 사용)
+        - on_chunk는 이벤트 루프에서 호출되므로 chunk 하나를 오래 처리하지 않아야 함
+        - HTTP/2에서는 멈춘 스트림만 취소(RST_STREAM)되고 커넥션은 계속 사용됨
+        - HTTP/2 프로토콜 에러 시 fallback으로 처음부터 다시 요청하므로, on_chunk는 다른 response 객체가 오면 새로 시작해야 함
+
+        Returns:
+            httpx.Response or requests.Response: 응답 (본문은 on_chunk로만 넘어감, 헤더와 url만 사용)
+            bool: 본문을 끝까지 받기 전에 멈췄는지 여부
+        """
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+
+        async def stream():
+            n_bytes = 0
+            async with self.client.stream("GET", url, params=params, headers=headers) as response:
+                async for chunk in response.aiter_bytes():
+                    n_bytes += len(chunk)
+                    if on_chunk(response, chunk):
+                        return response, True, n_bytes
+            return response, False, n_bytes
+
+        try:
+            with deadline.scope(self.request_budget, name=f"request {host}"):
+                response, stopped, n_bytes = await deadline.wait_for(stream())
+        except (httpx.RemoteProtocolError, httpx.LocalProtocolError):
+            if not self.http2:
+                self.stats.record_error(host)
+                raise
+            fallback = self.fallback or get_transport()
+            fallback_get = deadline.wrap(lambda: fallback.get_streamed(url, on_chunk, params=params, headers=headers))
+            return await asyncio.get_running_loop().run_in_executor(None, fallback_get)
+        except (httpx.HTTPError, deadline.DeadlineExceeded):
+            self.stats.record_error(host)
+            raise
+
+        wire_bytes = response.num_bytes_downloaded or n_bytes
+        self.stats.record(host, n_bytes, wire_bytes, time.perf_counter() - start, response.http_version)
+        return response, stopped
+
+
+    async def get_all(self, urls, headers=None, concurrency=POOL_MAXSIZE * 10):
+        """여러 url을 동시에 요청해 응답을 url 순서대로 반환한다 (이벤트 루프 안에서 await로 사용)
+
+        Args:
+            urls(list): 요청할 url 목록
+            headers(dict): 추가 헤더
+            concurrency(int): 동시에 요청하는 최대 개수
+
+        Returns:
+            list: urls와 같은 순서의 응답 목록
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def get_one(url):
+            async with semaphore:
+                return await self.get(url, headers=headers)
+
+        return await asyncio.gather(*[get_one(url) for url in urls])
+
+
+    def close(self):
+        """클라이언트를 닫고 이벤트 루프 스레드를 종료"""
+        self.run(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+
+def get_transport():
+    """프로세스에서 공유하는 Transport를 반환한다 (처음 호출 시 info.config 설정으로 생성)
+
+    Returns:
+        Transport: 공용 전송 객체
+    """
+    global _shared_transport
+
+    with _shared_transport_lock:
+        if _shared_transport is None:
+            _shared_transport = Transport(**get_transport_config())
+        return _shared_transport
+
+
+def get_async_transport():
+    """프로세스에서 공유하는 AsyncTransport를 반환한다 (info.config의 http_version이 "2"일 경우 HTTP/2 사용)
+    - HTTP/1.1에서는 요청 하나가 커넥션 하나를 차지하므로, 커넥션 수 상한을 news_host_concurrency 이상으로 맞춤
+
+    Returns:
+        AsyncTransport: 공용 비동기 전송 객체
+    """
+    global _shared_async_transport
+
+    # fallback용 Transport를 먼저 생성 (lock 중복 획득 방지)
+    fallback = get_transport()
+    with _shared_transport_lock:
+        if _shared_async_transport is None:
+            http2 = utils.get_config("http_version", default=HTTP_VERSION) == "2"
+            config = get_transport_config()
+            if not http2:
+                host_concurrency = utils.get_config("news_host_concurrency", set_int=True, default=config["pool_maxsize"])
+                config["pool_maxsize"] = max(config["pool_maxsize"], host_concurrency)
+            _shared_async_transport = AsyncTransport(http2=http2, fallback=fallback, **config)
+        return _shared_async_transport
+
+
+def get_transport_config():
+    """info.config에서 전송 객체 설정을 가져온다
+
+    Returns:
+        dict: Transport, AsyncTransport의 생성 인자 (connect_timeout, read_timeout, request_budget, pool_maxsize)
+    """
+    return {
+        "connect_timeout": utils.get_config("http_connect_timeout", set_int=True, default=CONNECT_TIMEOUT),
+        "read_timeout": utils.get_config("http_read_timeout", set_int=True, default=READ_TIMEOUT),
+        "request_budget": utils.get_config("http_request_budget", set_int=True, default=REQUEST_BUDGET),
+        "pool_maxsize": utils.get_config("http_pool_maxsize", set_int=True, default=POOL_MAXSIZE),
+    }
+
+
+
+if __name__ == "__main__":
+    # 직접 실행 시 전송 테스트 (로컬 HTTP/2 테스트 서버 등에 요청해 협상된 버전과 통계 확인)
+    # eg. (app 디렉토리에서) python -m utils.transport https://localhost:8443/ --http2 --verify ./cert.pem -n 50
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AsyncTransport 요청 테스트")
+    parser.add_argument("url", help="요청할 url")
+    parser.add_argument("-n", type=int, default=20, help="동시에 보낼 요청 수")
+    parser.add_argument("--http2", action="store_true", help="HTTP/2 사용")
+    parser.add_argument("--verify", default=None, help="TLS 검증용 CA 파일 경로 ('false'일 경우 검증 안 함)")
+    args = parser.parse_args()
+
+    verify = True if args.verify is None else (False if args.verify == "false" else args.verify)
+    async_transport = AsyncTransport(http2=args.http2, verify=verify, fallback=Transport())
+    responses = async_transport.run(async_transport.get_all([args.url] * args.n))
+    print("## status:", sorted({r.status_code for r in responses}))
+    print("## stats:", shared_stats.summary())
+    async_transport.close()
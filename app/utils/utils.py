@@ -3,9 +3,14 @@ import sys
 # 현재 파일의 상위 디렉토리를 sys.path에 추가
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 
+import re
 import datetime
+import socket
+import uuid
+from urllib.parse import urlsplit, parse_qs
 
 from db import psql
+from utils import cache
 
 
 
@@ -15,15 +20,72 @@ def get_kst_datetime():
     return kst_now
 
 
-def get_config(key, set_int=False):
+# 기사 url에서 언론사 아이디(oid), 기사 아이디(aid)를 찾는 패턴
+# eg. https://n.news.naver.com/mnews/article/001/0014231234?sid=101
+ARTICLE_PATH_PATTERN = re.compile(r"/article/(\d+)/(\d+)")
+
+
+def get_article_key(url):
+    """네이버 뉴스 기사 url을 (oid, aid)로 변환한다 (같은 기사의 여러 url 형태를 하나로 묶기 위함)
+    - /mnews/article/{oid}/{aid}, /article/{oid}/{aid} 등의 경로 형태
+    - read.naver?oid={oid}&aid={aid} 등의 쿼리 형태
+
+    Args:
+        url(str): 기사 url
+
+    Returns:
+        tuple: (oid(str), aid(str)) / 기사 url이 아닐 경우 None
+    """
+    match = ARTICLE_PATH_PATTERN.search(url)
+    if match:
+        return match.group(1), match.group(2)
+
+    query = parse_qs(urlsplit(url).query)
+    if "oid" in query and "aid" in query:
+        return query["oid"][0], query["aid"][0]
+    return None
+
+
+_worker_id = None
+_worker_id_pid = None
+
+
+def get_worker_id():
+    """실행 중인 프로세스를 구분하는 아이디 - "호스트명-pid-랜덤8자리"
+    - 호스트명-pid만으로는 고유하지 않음 (--network host, 고정 hostname을 쓰는 컨테이너끼리 호스트명이 같고, pid는 모두 1)
+      - 재시작한 컨테이너가 이전 컨테이너의 아이디(선점)를 물려받지 않도록, 프로세스마다 랜덤 값을 붙임
+    - 프로세스 안에서는 한번 만든 값을 계속 사용함 (fork된 자식 프로세스는 새로 만듦)
+    """
+    global _worker_id, _worker_id_pid
+
+    pid = os.getpid()
+    if _worker_id is None or _worker_id_pid != pid:
+        _worker_id = f"{socket.gethostname()}-{pid}-{uuid.uuid4().hex[:8]}"
+        _worker_id_pid = pid
+    return _worker_id
+
+
+def _load_config():
+    """info.config 전체를 dict로 가져온다 (reference_cache의 "config")"""
+    raw = psql.query_select("SELECT key, value FROM info.config;")
+    return {key: value for key, value in raw}
+
+
+def get_config(key, set_int=False, default=None):
     """info.config 에서 key로 value 값을 가져온다
+    - info.config 전체를 프로세스 내에 캐시하므로 호출마다 DB에 조회하지 않음 (변경 시 알림으로 바로 갱신, utils/cache.py)
 
     Args:
         key(str): kv로 가져올 값 중 key에 해당하는 값
         set_int(bool): 가져온 값을 int형으로 변환할지 여부
+        default: info.config에 key가 없을 경우 반환할 값 | Default: None (없으면 에러 발생)
     """
-    query = "SELECT value FROM info.config WHERE key = %s;"
-    value = psql.query_select(query, (key,), fetchone=True)[0]
+    config = cache.reference_cache.get("config", _load_config)
+    if key not in config:
+        if default is not None:
+            return default
+        raise KeyError(f"info.config has no key: {key}")
+    value = config[key]
     if set_int:
         value = int(value)
     return value
@@ -32,14 +94,20 @@ def get_config(key, set_int=False):
 def get_user_agent():
     """info.config 에서 User-Agent를 가져온다
     """
-    query = "SELECT value FROM info.config WHERE key = %s;"
-    raw = psql.query_select(query, ("user_agent",), fetchone=True)
-    user_agent = raw[0]
+    user_agent = get_config("user_agent")
     return user_agent
 
 
+def _load_years():
+    """info.years의 전체 연도 (reference_cache의 "years")
+    - 참조 테이블은 primary에서 가져옴 (변경 알림 직후 지연된 replica에서 이전 값을 가져와 ttl 동안 캐시하지 않도록)
+    """
+    raw = psql.query_select("SELECT year FROM info.years;")
+    return [r[0] for r in raw]
+
+
 def get_years(order_by_desc=True):
-    """info에서 전체 연도를 역순 정렬로 가져옴
+    """info에서 전체 연도를 역순 정렬로 가져옴 (캐시 사용)
 
     Args:
         order_by_desc(bool): True일 경우 역순정렬, False일 경우 순방향 정렬
@@ -47,9 +115,7 @@ def get_years(order_by_desc=True):
     Returns:
         list: 연도의 리스트
     """
-    query = "SELECT year FROM info.years;"
-    raw = psql.query_select(query)
-    years = [r[0] for r in raw]
+    years = cache.reference_cache.get("years", _load_years)
     if order_by_desc:
         years = sorted(years, reverse=True)
     else:
@@ -58,8 +124,14 @@ def get_years(order_by_desc=True):
 
 
 
+def _load_sids():
+    """info.sids 전체 (reference_cache의 "sids")"""
+    query = "SELECT sid1, sid1_name, sid2, sid2_name FROM info.sids;"
+    return psql.query_select(query)
+
+
 def get_sids(sid1_only=False):
-    """전체 sid1, sid2를 가져옮 (수집 여부 구분 없음)
+    """전체 sid1, sid2를 가져옮 (수집 여부 구분 없음, 캐시 사용)
 
     Args:
         sid1_only(bool): sid1만 반환할지 여부 | Default: False
@@ -69,22 +141,21 @@ def get_sids(sid1_only=False):
     Returns:
         list: [(sid1, sid2), ...] or [sid1, ...]
     """
-    query = "SELECT sid1, sid2 FROM info.sids;"
-    sids = psql.query_select(query)
+    raw = cache.reference_cache.get("sids", _load_sids)
+    sids = [(sid1, sid2) for sid1, _, sid2, _ in raw]
     return sids
 
 
 
 def get_sid_name_mapper():
-    """sid1, sid2의 코드에 이름을 매핑한 딕셔너리를 생성하여 반환
+    """sid1, sid2의 코드에 이름을 매핑한 딕셔너리를 생성하여 반환 (캐시 사용)
     - sid1, sid2의 조합(포함여부)는 고려하지 않고, 단순 이름 변환용
 
     Reutrns:
         dict: sid1에 sid1_name을 매핑한 딕셔너리
         dict: sid2에 sid2_name을 매핑한 딕셔너리
     """
-    query = "SELECT sid1, sid1_name, sid2, sid2_name FROM info.sids;"
-    raw = psql.query_select(query)
+    raw = cache.reference_cache.get("sids", _load_sids)
 
     sid1_name_mapper = {}
     sid2_name_mapper = {}
@@ -93,4 +164,4 @@ def get_sid_name_mapper():
         sid1_name_mapper[sid1] = sid1_name
         sid2_name_mapper[sid2] = sid2_name
 
-    return sid1_name_mapper, sid2_name_mapper
\ No newline at end of file
+    return sid1_name_mapper, sid2_name_mapper
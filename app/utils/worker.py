@@ -0,0 +1,253 @@
+import os
+import sys
+# 현재 파일의 상위 디렉토리를 sys.path에 추가
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+import socket
+import threading
+import time
+
+from db import psql, shard
+from utils import utils
+
+
+# 기본 설정 (info.config의 worker_heartbeat_seconds, worker_dead_seconds로 덮어씀)
+HEARTBEAT_SECONDS = 10  # heartbeat 기록 주기(초)
+DEAD_SECONDS = 60  # heartbeat가 이 시간(초) 이상 없으면 종료된 컨테이너로 판단
+
+_registry = None  # 현재 프로세스의 WorkerRegistry (start_worker로 설정)
+
+
+
+class WorkerRegistry():
+    """info.workers에 현재 컨테이너를 등록하고, 백그라운드 스레드로 heartbeat와 처리량을 기록하는 객체
+    - worker_id는 큐 선점(claimed_by)에 쓰이는 utils.get_worker_id()와 같으므로, reaper가 종료된 컨테이너의 선점을 해제할 수 있음
+    - 처리량은 heartbeat 사이 구간의 처리 개수(interval_items)와 구간 길이(interval_seconds)로 기록함
+
+    Attributes:
+        worker_id(str): 컨테이너 아이디 (utils.get_worker_id(), 호스트명-pid-랜덤8자리)
+        kind(str): 컨테이너 종류 ("news" or "queue")
+        heartbeat_seconds(float): heartbeat 주기(초)
+    """
+
+    def __init__(self, kind, heartbeat_seconds=None):
+        """
+        Args:
+            kind(str): 컨테이너 종류 ("news" or "queue")
+            heartbeat_seconds(float): heartbeat 주기(초) | Default: None (info.config의 worker_heartbeat_seconds)
+        """
+        self.worker_id = utils.get_worker_id()
+        self.kind = kind
+        if heartbeat_seconds is None:
+            heartbeat_seconds = utils.get_config("worker_heartbeat_seconds", set_int=True, default=HEARTBEAT_SECONDS)
+        self.heartbeat_seconds = heartbeat_seconds
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._runs = 0  # 마지막 heartbeat 이후 실행 수
+        self._items = 0  # 마지막 heartbeat 이후 처리 개수
+        self._errors = 0  # 마지막 heartbeat 이후 에러 수
+        self._target = None
+        self._last_beat = time.monotonic()
+
+
+    def start(self):
+        """info.workers에 등록(같은 worker_id가 있으면 초기화) 후 heartbeat 스레드 시작"""
+        query = """
+        INSERT INTO info.workers (worker_id, kind, hostname, pid, status, started, last_heartbeat)
+            VALUES (%s, %s, %s, %s, 'running', now(), now())
+            ON CONFLICT (worker_id) DO UPDATE SET
+                kind = EXCLUDED.kind, status = 'running', started = now(), last_heartbeat = now(),
+                runs = 0, items = 0, errors = 0, interval_items = 0, interval_seconds = NULL, current_target = NULL;"""
+        psql.query_execute(query, (self.worker_id, self.kind, socket.gethostname(), os.getpid()))
+        self._last_beat = time.monotonic()
+
+        self._thread = threading.Thread(target=self._run, name="worker-heartbeat", daemon=True)
+        self._thread.start()
+
+
+    def record(self, items=0, errors=0, target=None):
+        """실행 한번의 결과를 기록 (다음 heartbeat 때 DB에 반영)
+
+        Args:
+            items(int): 처리한 개수 (news: 저장한 기사 수, queue: 추가한 링크 수)
+            errors(int): 에러 수
+            target(str): 현재 작업 대상 (eg. date_queue_id, 연도) | Default: None (이전 값 유지)
+        """
+        with self._lock:
+            self._runs += 1
+            self._items += items
+            self._errors += errors
+            if target is not None:
+                self._target = str(target)
+
+
+    def heartbeat(self, status="running"):
+        """누적된 처리량을 info.workers에 기록"""
+        with self._lock:
+            runs, items, errors, target = self._runs, self._items, self._errors, self._target
+            self._runs = self._items = self._errors = 0
+            now = time.monotonic()
+            interval_seconds = now - self._last_beat
+            self._last_beat = now
+
+        query = """
+        UPDATE info.workers SET
+            status = %s, last_heartbeat = now(), runs = runs + %s, items = items + %s, errors = errors + %s,
+            interval_items = %s, interval_seconds = %s, current_target = COALESCE(%s, current_target)
+            WHERE worker_id = %s;"""
+        try:
+            psql.query_execute(query, (status, runs, items, errors, items, interval_seconds, target, self.worker_id))
+        except Exception as e:
+            # 기록 실패 시 다음 heartbeat에 다시 반영되도록 되돌림
+            with self._lock:
+                self._runs += runs
+                self._items += items
+                self._errors += errors
+            print(f">> worker heartbeat failed - {e}")
+
+
+    def _run(self):
+        while not self._stop.wait(self.heartbeat_seconds):
+            self.heartbeat()
+
+
+    def stop(self):
+        """heartbeat 스레드 종료 후 상태를 stopped로 기록"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.heartbeat(status="stopped")
+
+
+
+def start_worker(kind):
+    """현재 프로세스의 WorkerRegistry를 생성하고 시작한다 (run_*.py의 main에서 한번 호출)
+
+    Args:
+        kind(str): 컨테이너 종류 ("news" or "queue")
+
+    Returns:
+        WorkerRegistry: 시작된 객체
+    """
+    global _registry
+
+    _registry = WorkerRegistry(kind)
+    _registry.start()
+    return _registry
+
+
+def record(items=0, errors=0, target=None):
+    """현재 프로세스의 WorkerRegistry에 실행 결과를 기록 (start_worker 전이면 무시)"""
+    if _registry is not None:
+        _registry.record(items, errors, target)
+
+
+
+def stop_worker():
+    """현재 프로세스의 WorkerRegistry를 종료 (정상 종료 시 호출, 상태를 stopped로 기록)"""
+    if _registry is not None:
+        _registry.stop()
+
+
+def reap_dead_workers(dead_seconds=None):
+    """heartbeat가 끊긴 컨테이너를 dead로 표시하고, 해당 컨테이너가 선점한 큐를 해제한다
+    - queue.date_pages: 완료되지 않은 선점 해제
+    - queue.news_{year}: 연도별 샤드에서 수집되지 않은 선점 해제
+
+    Args:
+        dead_seconds(int): heartbeat가 끊긴 뒤 dead로 판단할 시간(초) | Default: None (info.config의 worker_dead_seconds)
+
+    Returns:
+        list: dead로 표시된 worker_id 리스트
+        int: 해제한 선점 수 (date_pages + news)
+    """
+    if dead_seconds is None:
+        dead_seconds = utils.get_config("worker_dead_seconds", set_int=True, default=DEAD_SECONDS)
+
+    # 1) dead 표시
+    query = """
+    UPDATE info.workers SET status = 'dead'
+        WHERE status = 'running' AND last_heartbeat < now() - make_interval(secs => %s)
+        RETURNING worker_id;"""
+    with psql.transaction() as cur:
+        cur.execute(query, (dead_seconds,))
+        dead_ids = [r[0] for r in cur.fetchall()]
+
+    if not dead_ids:
+        return [], 0
+
+    # 2) 선점 해제
+    released = 0
+    query = """
+    UPDATE queue.date_pages SET claimed_by = NULL, claimed_at = NULL, lease_expires = NULL
+        WHERE claimed_by = ANY(%s) AND page_added = false;"""
+    with psql.transaction() as cur:
+        cur.execute(query, (dead_ids,))
+        released += cur.rowcount
+
+    for year in utils.get_years():
+        query = f"""
+        UPDATE queue.news_{year} SET claimed_by = NULL, lease_expires = NULL
+            WHERE claimed_by = ANY(%s) AND is_scraped = false;"""
+        with psql.transaction(shard.get_shard(year)) as cur:
+            cur.execute(query, (dead_ids,))
+            released += cur.rowcount
+
+    return dead_ids, released
+
+
+
+def get_fleet(include_stopped=False):
+    """info.workers의 컨테이너별 상태와 처리량을 가져온다
+
+    Args:
+        include_stopped(bool): True일 경우 stopped, dead 상태도 포함
+
+    Returns:
+        list: [(worker_id, kind, status, heartbeat 경과 초, runs, items, errors, 구간 처리량(개/분), current_target), ...]
+    """
+    where = "" if include_stopped else "WHERE status = 'running'"
+    query = f"""
+    SELECT worker_id, kind, status, EXTRACT(EPOCH FROM now() - last_heartbeat)::float, runs, items, errors,
+           CASE WHEN interval_seconds > 0 THEN interval_items * 60 / interval_seconds ELSE 0 END, current_target
+        FROM info.workers {where}
+        ORDER BY kind, worker_id;"""
+    return psql.query_select(query, read_only=True)
+
+
+def format_fleet(fleet):
+    """get_fleet의 결과를 출력용 문자열로 변환 (종류별 합계 포함)"""
+    lines = [f"{'worker_id':<28} {'kind':<6} {'status':<8} {'beat':>6} {'runs':>7} {'items':>9} {'errors':>6} {'items/min':>10}  target"]
+    totals = {}
+    for worker_id, kind, status, beat_age, runs, items, errors, per_min, target in fleet:
+        lines.append(f"{worker_id:<28} {kind:<6} {status:<8} {beat_age:>5.0f}s {runs:>7} {items:>9} {errors:>6} {per_min:>10.1f}  {target or ''}")
+        if status == "running":
+            count, total_per_min = totals.get(kind, (0, 0.0))
+            totals[kind] = (count + 1, total_per_min + per_min)
+
+    lines.append("-" * len(lines[0]))
+    for kind, (count, total_per_min) in totals.items():
+        per_worker = total_per_min / count if count else 0
+        lines.append(f"{kind}: {count} running / {total_per_min:.1f} items/min ({per_worker:.1f} per worker)")
+    return "\n".join(lines)
+
+
+
+if __name__ == "__main__":
+    # 직접 실행 시 실행 중인 컨테이너들의 처리량 출력
+    # eg. (app 디렉토리에서) python -m utils.worker --watch 10
+    import argparse
+
+    parser = argparse.ArgumentParser(description="info.workers의 컨테이너별 heartbeat, 처리량 조회")
+    parser.add_argument("--all", action="store_true", help="stopped, dead 상태의 컨테이너도 출력")
+    parser.add_argument("--watch", type=float, default=0, help="n초마다 다시 출력 (0일 경우 한번만)")
+    args = parser.parse_args()
+
+    while True:
+        print(format_fleet(get_fleet(include_stopped=args.all)))
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+        print()